@@ -0,0 +1,34 @@
+"""users: keyset index for admin listing and trigram search indexes
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # GET /users: WHERE is_active ORDER BY created_at DESC, id DESC + keyset cursor
+    op.execute(
+        "CREATE INDEX ix_users_active_created_id ON users (created_at DESC, id DESC) WHERE is_active"
+    )
+
+    # GET /users?q=...: ILIKE '%...%' по имени, логину и телефону
+    op.execute("CREATE INDEX ix_users_full_name_trgm ON users USING gin (full_name gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_users_username_trgm ON users USING gin (username gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_users_phone_trgm ON users USING gin (phone gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_phone_trgm", table_name="users")
+    op.drop_index("ix_users_username_trgm", table_name="users")
+    op.drop_index("ix_users_full_name_trgm", table_name="users")
+    op.drop_index("ix_users_active_created_id", table_name="users")
@@ -0,0 +1,26 @@
+"""chat_messages: partial index on live (not deleted) messages for history paging
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # История и последнее сообщение комнаты читают только неудалённые сообщения
+    op.execute(
+        "CREATE INDEX ix_chat_messages_room_live ON chat_messages (room_id, id) WHERE NOT is_deleted"
+    )
+    op.drop_index("ix_chat_messages_room", table_name="chat_messages")
+
+
+def downgrade() -> None:
+    op.create_index("ix_chat_messages_room", "chat_messages", ["room_id", "id"])
+    op.drop_index("ix_chat_messages_room_live", table_name="chat_messages")
@@ -0,0 +1,76 @@
+"""sheets sync: change log on reports/brigadier_reports, cursor and row map
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Журнал изменений: триггер пишет сюда каждую вставку/правку/удаление отчёта,
+    # синхронизация читает его по возрастанию id (курсор) и удаляет обработанное
+    op.create_table(
+        "sheets_changes",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column("kind", sa.String(20), nullable=False),
+        sa.Column("record_id", sa.Integer, nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_sheets_changes_kind_id", "sheets_changes", ["kind", "id"])
+
+    op.create_table(
+        "sheets_sync_state",
+        sa.Column("kind", sa.String(20), primary_key=True),
+        sa.Column("cursor", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("next_row", sa.Integer, nullable=False, server_default="2"),
+        sa.Column("synced_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    op.create_table(
+        "sheets_sync_rows",
+        sa.Column("kind", sa.String(20), primary_key=True),
+        sa.Column("record_id", sa.Integer, primary_key=True),
+        sa.Column("sheet_row", sa.Integer, nullable=False),
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION sheets_changes_log() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO sheets_changes (kind, record_id)
+            VALUES (TG_ARGV[0], CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER reports_sheets_changes AFTER INSERT OR UPDATE OR DELETE ON reports "
+        "FOR EACH ROW EXECUTE FUNCTION sheets_changes_log('otd')"
+    )
+    op.execute(
+        "CREATE TRIGGER brigadier_reports_sheets_changes AFTER INSERT OR UPDATE OR DELETE ON brigadier_reports "
+        "FOR EACH ROW EXECUTE FUNCTION sheets_changes_log('brig')"
+    )
+
+    # Первая синхронизация выгрузит все уже существующие отчёты
+    op.execute("INSERT INTO sheets_changes (kind, record_id) SELECT 'otd', id FROM reports ORDER BY id")
+    op.execute("INSERT INTO sheets_changes (kind, record_id) SELECT 'brig', id FROM brigadier_reports ORDER BY id")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS brigadier_reports_sheets_changes ON brigadier_reports")
+    op.execute("DROP TRIGGER IF EXISTS reports_sheets_changes ON reports")
+    op.execute("DROP FUNCTION IF EXISTS sheets_changes_log()")
+    op.drop_table("sheets_sync_rows")
+    op.drop_table("sheets_sync_state")
+    op.drop_index("ix_sheets_changes_kind_id", table_name="sheets_changes")
+    op.drop_table("sheets_changes")
@@ -0,0 +1,65 @@
+"""telemetry: Traccar devices, monthly-partitioned positions, per-day machine hour rollups
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "telemetry_devices",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("unique_id", sa.String(64), nullable=False, unique=True),
+        sa.Column("name", sa.String(255), nullable=True),
+        sa.Column("machine_name", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_telemetry_devices_machine_name", "telemetry_devices", ["machine_name"])
+
+    # Компактная строка (~40 байт): координаты в микроградусах, скорость в 0.1 км/ч,
+    # flags: 1 — зажигание, 2 — движение. Партиции по месяцам создаёт приложение при записи.
+    op.execute(
+        """
+        CREATE TABLE telemetry_positions (
+            device_id integer NOT NULL,
+            fix_time timestamptz NOT NULL,
+            lat_e6 integer NOT NULL,
+            lon_e6 integer NOT NULL,
+            speed smallint NOT NULL DEFAULT 0,
+            course smallint NOT NULL DEFAULT 0,
+            flags smallint NOT NULL DEFAULT 0
+        ) PARTITION BY RANGE (fix_time)
+        """
+    )
+    op.execute("CREATE TABLE telemetry_positions_default PARTITION OF telemetry_positions DEFAULT")
+    op.execute("CREATE INDEX ix_telemetry_positions_device_time ON telemetry_positions (device_id, fix_time)")
+
+    op.create_table(
+        "telemetry_daily",
+        sa.Column("device_id", sa.Integer, sa.ForeignKey("telemetry_devices.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("day", sa.Date, primary_key=True),
+        sa.Column("engine_seconds", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("motion_seconds", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("positions", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("first_fix", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_fix", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_telemetry_daily_day", "telemetry_daily", ["day"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_telemetry_daily_day", table_name="telemetry_daily")
+    op.drop_table("telemetry_daily")
+    op.execute("DROP TABLE telemetry_positions CASCADE")
+    op.drop_index("ix_telemetry_devices_machine_name", table_name="telemetry_devices")
+    op.drop_table("telemetry_devices")
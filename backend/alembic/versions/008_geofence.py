@@ -0,0 +1,38 @@
+"""geofence: field geometry on locations, per-day dwell segments of machines in fields
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GeoJSON Polygon / MultiPolygon поля (lon, lat); индекс строится в памяти воркера
+    op.add_column("locations", sa.Column("geometry", sa.JSON, nullable=True))
+
+    op.create_table(
+        "telemetry_dwell",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column("device_id", sa.Integer, sa.ForeignKey("telemetry_devices.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("location_id", sa.Integer, sa.ForeignKey("locations.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("day", sa.Date, nullable=False),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("engine_seconds", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("motion_seconds", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.create_index("ix_telemetry_dwell_device_day", "telemetry_dwell", ["device_id", "day"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_telemetry_dwell_device_day", table_name="telemetry_dwell")
+    op.drop_table("telemetry_dwell")
+    op.drop_column("locations", "geometry")
@@ -0,0 +1,51 @@
+"""chat_rooms: canonical (low, high) user pair for DMs with a unique index
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("chat_rooms", sa.Column("dm_user_low", sa.BigInteger, nullable=True))
+    op.add_column("chat_rooms", sa.Column("dm_user_high", sa.BigInteger, nullable=True))
+
+    # Ключ получают существующие личные чаты из двух участников (или чат с собой);
+    # если одна пара уже дублировалась, ключ достаётся самому старому чату
+    op.execute(
+        """
+        WITH pairs AS (
+            SELECT r.id, MIN(m.user_id) AS low, MAX(m.user_id) AS high
+            FROM chat_rooms r
+            JOIN chat_room_members m ON m.room_id = r.id
+            WHERE r.type = 'dm'
+            GROUP BY r.id
+            HAVING COUNT(*) BETWEEN 1 AND 2
+        ), ranked AS (
+            SELECT id, low, high, ROW_NUMBER() OVER (PARTITION BY low, high ORDER BY id) AS rn
+            FROM pairs
+        )
+        UPDATE chat_rooms r
+        SET dm_user_low = ranked.low, dm_user_high = ranked.high
+        FROM ranked
+        WHERE ranked.id = r.id AND ranked.rn = 1
+        """
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX ux_chat_rooms_dm_pair ON chat_rooms (dm_user_low, dm_user_high) "
+        "WHERE dm_user_low IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_chat_rooms_dm_pair", table_name="chat_rooms")
+    op.drop_column("chat_rooms", "dm_user_high")
+    op.drop_column("chat_rooms", "dm_user_low")
@@ -0,0 +1,137 @@
+"""reports, form_responses, chat_messages: monthly range partitions
+
+Таблицы пересоздаются секционированными (reports по work_date, form_responses по
+submitted_at, chat_messages по created_at) и данные переносятся одним INSERT ... SELECT —
+на время миграции запись в эти таблицы остановить. Секции создаются под месяцы, где
+уже есть строки, и на PARTITION_AHEAD месяцев вперёд; дальше их создаёт воркер
+(app/services/partitions.py). Строки вне созданных секций попадают в *_default.
+
+Первичный ключ секционированной таблицы обязан включать ключ секционирования:
+(id, work_date) и т.п. id по-прежнему выдаёт одна последовательность. Пустой
+work_date заполняется датой created_at.
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+"""
+from datetime import date, timedelta
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+PARTITION_AHEAD = 3
+
+# таблица -> (ключ секционирования, тип ключа, внешние ключи, индексы)
+TABLES = {
+    "reports": (
+        "work_date",
+        "date",
+        ["FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE SET NULL"],
+        [
+            "CREATE INDEX ix_reports_user_date ON reports (user_id, work_date)",
+            "CREATE INDEX ix_reports_work_date ON reports (work_date)",
+        ],
+    ),
+    "form_responses": (
+        "submitted_at",
+        "timestamptz",
+        [
+            "FOREIGN KEY (form_id) REFERENCES form_templates (id) ON DELETE CASCADE",
+            "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE",
+        ],
+        [],
+    ),
+    "chat_messages": (
+        "created_at",
+        "timestamptz",
+        [
+            "FOREIGN KEY (room_id) REFERENCES chat_rooms (id) ON DELETE CASCADE",
+            "FOREIGN KEY (sender_id) REFERENCES users (id) ON DELETE SET NULL",
+        ],
+        ["CREATE INDEX ix_chat_messages_room_live ON chat_messages (room_id, id) WHERE NOT is_deleted"],
+    ),
+}
+
+SHEETS_TRIGGER = (
+    "CREATE TRIGGER reports_sheets_changes AFTER INSERT OR UPDATE OR DELETE ON reports "
+    "FOR EACH ROW EXECUTE FUNCTION sheets_changes_log('otd')"
+)
+
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _bound(month: date, key_type: str) -> str:
+    # Границы секций по timestamptz — в UTC, как у telemetry_positions
+    return f"'{month.isoformat()}+00'" if key_type == "timestamptz" else f"'{month.isoformat()}'"
+
+
+def _data_months(table: str, key: str, key_type: str) -> set[date]:
+    month_expr = f"date_trunc('month', {key} AT TIME ZONE 'UTC')" if key_type == "timestamptz" else f"date_trunc('month', {key})"
+    rows = op.get_bind().execute(sa.text(f"SELECT DISTINCT ({month_expr})::date FROM {table} WHERE {key} IS NOT NULL"))
+    return {r[0] for r in rows}
+
+
+def _create_partitions(table: str, key_type: str, months: set[date]) -> None:
+    current = date.today().replace(day=1)
+    for _ in range(PARTITION_AHEAD + 1):
+        months.add(current)
+        current = _next_month(current)
+    for month in sorted(months):
+        op.execute(
+            f"CREATE TABLE {table}_{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ({_bound(month, key_type)}) TO ({_bound(_next_month(month), key_type)})"
+        )
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def _rebuild(table: str, partitioned: bool) -> None:
+    key, key_type, foreign_keys, indexes = TABLES[table]
+    old = f"{table}_old"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey")
+    if partitioned and table == "reports":
+        op.execute("UPDATE reports_old SET work_date = created_at::date WHERE work_date IS NULL")
+    months = _data_months(old, key, key_type) if partitioned else set()
+
+    suffix = f" PARTITION BY RANGE ({key})" if partitioned else ""
+    op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS){suffix}")
+    if partitioned:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {key} SET NOT NULL")
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})")
+    else:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+        if table == "reports":
+            op.execute("ALTER TABLE reports ALTER COLUMN work_date DROP NOT NULL")
+    for fk in foreign_keys:
+        op.execute(f"ALTER TABLE {table} ADD {fk}")
+    # Последовательность id переходит к новой таблице, иначе DROP старой удалит её
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    if partitioned:
+        _create_partitions(table, key_type, months)
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old}")
+    for index in indexes:
+        op.execute(index)
+    if table == "reports":
+        op.execute(SHEETS_TRIGGER)
+    op.execute(f"ANALYZE {table}")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        _rebuild(table, partitioned=True)
+
+
+def downgrade() -> None:
+    # Секции, уже отсоединённые в схему archive, обратно не возвращаются
+    for table in TABLES:
+        _rebuild(table, partitioned=False)
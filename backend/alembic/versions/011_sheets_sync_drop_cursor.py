@@ -0,0 +1,28 @@
+"""sheets_sync_state: drop the id cursor over sheets_changes
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # id журнала выдаются в транзакциях пишущих и коммитятся не по порядку: курсор
+    # «id > последнего обработанного» терял записи, закоммиченные позже. Синхронизация
+    # теперь удаляет ровно обработанные записи, а необработанные остаются в журнале
+    op.drop_column("sheets_sync_state", "cursor")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "sheets_sync_state",
+        sa.Column("cursor", sa.BigInteger, nullable=False, server_default="0"),
+    )
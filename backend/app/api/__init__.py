@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api import auth, users, reports, dictionaries, forms, groups, chat, export, admin_tenant
+from app.api import auth, users, reports, dictionaries, forms, groups, chat, export, admin_tenant, telemetry, profiling
 
 api_router = APIRouter()
 api_router.include_router(auth.router)
@@ -11,3 +11,5 @@ api_router.include_router(groups.router)
 api_router.include_router(chat.router)
 api_router.include_router(export.router)
 api_router.include_router(admin_tenant.router)
+api_router.include_router(telemetry.router)
+api_router.include_router(profiling.router)
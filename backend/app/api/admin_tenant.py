@@ -12,6 +12,7 @@ from app.core.config import settings
 from app.models.tenant import InviteLink, TenantSettings
 from app.models.chat import ChatRoom, ChatRoomMember, ChatMessage
 from app.schemas.tenant import CompanyProfileOut, InviteLinkCreate, InviteLinkOut
+from app.services.tenant_settings import get_tenant_settings, notify_changed
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -27,11 +28,8 @@ async def get_company_profile(
     admin=Depends(require_admin),
 ):
     _user, _role = admin
-    result = await db.execute(select(TenantSettings).where(TenantSettings.id == 1))
-    row = result.scalar_one_or_none()
-    if not row:
-        return CompanyProfileOut(company_name="")
-    return CompanyProfileOut(company_name=row.company_name or "")
+    ts = await get_tenant_settings(db)
+    return CompanyProfileOut(company_name=ts.company_name if ts else "")
 
 
 @router.post("/invite-links", response_model=InviteLinkOut, status_code=201)
@@ -88,6 +86,7 @@ async def create_invite_link(
     )
 
     await db.commit()
+    await notify_changed()
     await db.refresh(link)
 
     base = _join_base_url()
@@ -1,21 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import get_db
-from app.core.security import hash_password, verify_password, create_access_token, create_refresh_token
-from app.core.redis import get_redis
-from app.core.config import settings
+from app.core.rate_limit import client_ip, enforce
+from app.core.security import (
+    create_access_token,
+    hash_password_async,
+    password_hash_stats,
+    password_needs_rehash,
+    verify_password_async,
+)
 from app.models.user import User, AuthCredential, UserRole
 from app.schemas.auth import LoginRequest, RegisterRequest, TokenResponse, RefreshRequest, ChangePasswordRequest
-from app.api.deps import get_current_user
-from datetime import timedelta
-import redis.asyncio as aioredis
+from app.api.deps import get_current_user, require_admin
+from app.services import refresh_tokens
+from app.services.active_users import mark_active
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-REFRESH_TTL = settings.JWT_REFRESH_EXPIRE_DAYS * 86400
-
-
 async def _get_user_role(db: AsyncSession, user_id: int) -> str:
     result = await db.execute(select(UserRole).where(UserRole.user_id == user_id))
     row = result.scalar_one_or_none()
@@ -32,31 +34,33 @@ async def register(body: RegisterRequest, db: AsyncSession = Depends(get_db)):
     db.add(user)
     await db.flush()
 
-    cred = AuthCredential(user_id=user.id, login=body.login, password_hash=hash_password(body.password))
+    cred = AuthCredential(user_id=user.id, login=body.login, password_hash=await hash_password_async(body.password))
     db.add(cred)
     await db.commit()
     await db.refresh(user)
-    from app.services.reports_feed_chat import add_user_to_reports_feed_if_exists
-
-    await add_user_to_reports_feed_if_exists(db, user.id)
+    await mark_active(user.id)
 
     role = "user"
     access = create_access_token(user.id, role)
-    refresh = create_refresh_token()
-
-    redis = await get_redis()
-    await redis.setex(f"refresh:{refresh}", REFRESH_TTL, str(user.id))
+    refresh = await refresh_tokens.issue(user.id)
 
     return TokenResponse(access_token=access, refresh_token=refresh, user_id=user.id, role=role)
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(body: LoginRequest, db: AsyncSession = Depends(get_db)):
+async def login(
+    body: LoginRequest,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    # Лимит на пару IP + логин: перебор пароля упирается в него, а соседи по NAT — нет
+    await enforce("login", request, response, key=f"ip:{client_ip(request)}:{body.login.strip().lower()[:64]}")
     result = await db.execute(
         select(AuthCredential).where(AuthCredential.login == body.login)
     )
     cred = result.scalar_one_or_none()
-    if not cred or not verify_password(body.password, cred.password_hash):
+    if not cred or not await verify_password_async(body.password, cred.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     result2 = await db.execute(select(User).where(User.id == cred.user_id))
@@ -64,43 +68,40 @@ async def login(body: LoginRequest, db: AsyncSession = Depends(get_db)):
     if not user or not user.is_active:
         raise HTTPException(status_code=403, detail="Account inactive")
 
+    # Стоимость bcrypt поменялась — пароль в руках, перехэшируем незаметно для пользователя
+    if password_needs_rehash(cred.password_hash):
+        cred.password_hash = await hash_password_async(body.password)
+        await db.commit()
+
     role = await _get_user_role(db, user.id)
     access = create_access_token(user.id, role)
-    refresh = create_refresh_token()
-
-    redis = await get_redis()
-    await redis.setex(f"refresh:{refresh}", REFRESH_TTL, str(user.id))
+    refresh = await refresh_tokens.issue(user.id)
 
     return TokenResponse(access_token=access, refresh_token=refresh, user_id=user.id, role=role)
 
 
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_token(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
-    redis = await get_redis()
-    user_id_str = await redis.get(f"refresh:{body.refresh_token}")
-    if not user_id_str:
+    rotated = await refresh_tokens.rotate(body.refresh_token)
+    if not rotated:
         raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
 
-    user_id = int(user_id_str)
+    user_id, new_refresh = rotated
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if not user or not user.is_active:
+        await refresh_tokens.revoke_all(user_id)
         raise HTTPException(status_code=401, detail="User not found")
 
-    await redis.delete(f"refresh:{body.refresh_token}")
-
     role = await _get_user_role(db, user.id)
     access = create_access_token(user.id, role)
-    new_refresh = create_refresh_token()
-    await redis.setex(f"refresh:{new_refresh}", REFRESH_TTL, str(user.id))
 
     return TokenResponse(access_token=access, refresh_token=new_refresh, user_id=user.id, role=role)
 
 
 @router.post("/logout")
 async def logout(body: RefreshRequest):
-    redis = await get_redis()
-    await redis.delete(f"refresh:{body.refresh_token}")
+    await refresh_tokens.revoke(body.refresh_token)
     return {"ok": True}
 
 
@@ -112,9 +113,27 @@ async def change_password(
 ):
     result = await db.execute(select(AuthCredential).where(AuthCredential.user_id == current_user.id))
     cred = result.scalar_one_or_none()
-    if not cred or not verify_password(body.old_password, cred.password_hash):
+    if not cred or not await verify_password_async(body.old_password, cred.password_hash):
         raise HTTPException(status_code=400, detail="Wrong current password")
 
-    cred.password_hash = hash_password(body.new_password)
+    cred.password_hash = await hash_password_async(body.new_password)
     await db.commit()
-    return {"ok": True}
+
+    # Все прочие входы отзываем; текущему клиенту выдаём новую пару токенов
+    await refresh_tokens.revoke_all(current_user.id)
+    role = await _get_user_role(db, current_user.id)
+    return {
+        "ok": True,
+        **TokenResponse(
+            access_token=create_access_token(current_user.id, role),
+            refresh_token=await refresh_tokens.issue(current_user.id),
+            user_id=current_user.id,
+            role=role,
+        ).model_dump(),
+    }
+
+
+@router.get("/hash-stats")
+async def get_hash_stats(_auth: tuple = Depends(require_admin)):
+    """Пул bcrypt этого воркера: очередь, занятые потоки, время ожидания."""
+    return password_hash_stats()
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.core.database import get_db, AsyncSessionLocal
+from app.core.fast_json import fast_json, orm_dicts
 from app.core.redis import get_redis
 from app.models.chat import ChatRoom, ChatRoomMember, ChatMessage
 from app.models.user import User
-from app.models.tenant import TenantSettings
 from app.schemas.chat import (
     ChatAddMembersBody,
     ChatRoomCreate,
@@ -16,7 +17,22 @@ from app.schemas.chat import (
     WSMessage,
 )
 from app.api.deps import get_current_user, ws_get_current_user, require_admin
-from app.realtime.chat_hub import connections as _connections, broadcast_chat_message, push_offline_room_members
+from app.realtime.chat_hub import (
+    broadcast_chat_message,
+    push_offline_room_members,
+    hub_stats,
+    register_socket,
+    replay_to_socket,
+    send_json,
+    socket_rooms,
+    subscribe,
+    unregister_socket,
+    unsubscribe,
+)
+from app.realtime import message_buffer, presence
+from app.services.active_users import count_active_users
+from app.services.tenant_settings import get_tenant_settings
+from app.services.user_names import get_user_names
 import json
 from datetime import datetime, timezone
 
@@ -24,33 +40,37 @@ router = APIRouter(prefix="/chat", tags=["chat"])
 
 
 async def _reports_feed_room_id(db: AsyncSession) -> int | None:
-    ts = (await db.execute(select(TenantSettings).where(TenantSettings.id == 1))).scalar_one_or_none()
+    ts = await get_tenant_settings(db)
     return ts.reports_feed_room_id if ts else None
 
 
+async def _can_access_room(db: AsyncSession, room_id: int, user_id: int, feed_room_id: int | None = None) -> bool:
+    """Участник комнаты или лента отчётов (она открыта всем активным пользователям)."""
+    if feed_room_id is None:
+        feed_room_id = await _reports_feed_room_id(db)
+    if feed_room_id is not None and room_id == feed_room_id:
+        return True
+    member_check = await db.execute(
+        select(ChatRoomMember.id).where(
+            ChatRoomMember.room_id == room_id, ChatRoomMember.user_id == user_id
+        )
+    )
+    return member_check.scalar_one_or_none() is not None
+
+
 @router.get("/feed-room", response_model=ChatRoomOut | None)
 async def get_feed_room(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Создаёт (если нужно) и возвращает комнату «Отчётность».
-    Автоматически добавляет текущего пользователя в участники."""
+    Участники ленты — все активные пользователи, отдельная запись membership не нужна."""
     from app.services.reports_feed_chat import get_or_create_reports_feed_room
     room_id = await get_or_create_reports_feed_room(db)
     if not room_id:
         return None
-    # Убедиться что текущий пользователь — участник
-    member_check = await db.execute(
-        select(ChatRoomMember).where(
-            ChatRoomMember.room_id == room_id, ChatRoomMember.user_id == current_user.id
-        )
-    )
-    if not member_check.scalar_one_or_none():
-        db.add(ChatRoomMember(room_id=room_id, user_id=current_user.id))
-        await db.commit()
-    room_result = await db.execute(select(ChatRoom).where(ChatRoom.id == room_id))
-    room = room_result.scalar_one_or_none()
-    return await _room_out(db, room) if room else None
+    room = await db.get(ChatRoom, room_id)
+    return await _room_out(db, room, feed_room_id=room_id) if room else None
 
 
 @router.get("/rooms", response_model=list[ChatRoomOut])
@@ -63,20 +83,28 @@ async def list_rooms(
             ChatRoomMember.user_id == current_user.id
         ).order_by(ChatRoom.created_at.desc())
     )
-    rooms = result.scalars().all()
+    rooms = list(result.scalars().all())
     feed_rid = await _reports_feed_room_id(db)
+    if feed_rid is not None and all(r.id != feed_rid for r in rooms):
+        feed_room = await db.get(ChatRoom, feed_rid)
+        if feed_room:
+            rooms.append(feed_room)
+            rooms.sort(key=lambda r: r.created_at, reverse=True)
     out = []
     for room in rooms:
-        member_count_result = await db.execute(
-            select(ChatRoomMember).where(ChatRoomMember.room_id == room.id)
-        )
-        members = member_count_result.scalars().all()
+        if room.id == feed_rid:
+            member_count = await count_active_users()
+        else:
+            member_count_result = await db.execute(
+                select(func.count()).where(ChatRoomMember.room_id == room.id)
+            )
+            member_count = member_count_result.scalar() or 0
 
         last_msg_result = await db.execute(
             select(ChatMessage).where(
                 ChatMessage.room_id == room.id,
                 ChatMessage.is_deleted == False
-            ).order_by(ChatMessage.created_at.desc()).limit(1)
+            ).order_by(ChatMessage.id.desc()).limit(1)
         )
         last_msg = last_msg_result.scalar_one_or_none()
 
@@ -86,7 +114,7 @@ async def list_rooms(
             type=room.type,
             created_by=room.created_by,
             created_at=room.created_at,
-            member_count=len(members),
+            member_count=member_count,
             last_message=last_msg.content if last_msg else None,
             is_reports_feed=feed_rid is not None and room.id == feed_rid,
         ))
@@ -94,27 +122,30 @@ async def list_rooms(
 
 
 async def _room_out(db: AsyncSession, room: ChatRoom, feed_room_id: int | None = None) -> ChatRoomOut:
-    member_count_result = await db.execute(
-        select(ChatRoomMember).where(ChatRoomMember.room_id == room.id)
-    )
-    members = member_count_result.scalars().all()
+    if feed_room_id is None:
+        feed_room_id = await _reports_feed_room_id(db)
+    is_feed = feed_room_id is not None and room.id == feed_room_id
+    if is_feed:
+        member_count = await count_active_users()
+    else:
+        member_count_result = await db.execute(
+            select(func.count()).where(ChatRoomMember.room_id == room.id)
+        )
+        member_count = member_count_result.scalar() or 0
     last_msg_result = await db.execute(
         select(ChatMessage).where(
             ChatMessage.room_id == room.id,
             ChatMessage.is_deleted == False,
-        ).order_by(ChatMessage.created_at.desc()).limit(1)
+        ).order_by(ChatMessage.id.desc()).limit(1)
     )
     last_msg = last_msg_result.scalar_one_or_none()
-    if feed_room_id is None:
-        feed_room_id = await _reports_feed_room_id(db)
-    is_feed = feed_room_id is not None and room.id == feed_room_id
     return ChatRoomOut(
         id=room.id,
         name=room.name,
         type=room.type,
         created_by=room.created_by,
         created_at=room.created_at,
-        member_count=len(members),
+        member_count=member_count,
         last_message=last_msg.content if last_msg else None,
         is_reports_feed=is_feed,
     )
@@ -151,20 +182,19 @@ async def list_room_members(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    member_check = await db.execute(
-        select(ChatRoomMember).where(
-            ChatRoomMember.room_id == room_id, ChatRoomMember.user_id == current_user.id
-        )
-    )
-    if not member_check.scalar_one_or_none():
+    feed_rid = await _reports_feed_room_id(db)
+    if not await _can_access_room(db, room_id, current_user.id, feed_rid):
         raise HTTPException(403, "Not a member")
 
-    q = (
-        select(ChatRoomMember.user_id, User.full_name, User.username)
-        .join(User, User.id == ChatRoomMember.user_id)
-        .where(ChatRoomMember.room_id == room_id)
-        .order_by(User.id)
-    )
+    if room_id == feed_rid:
+        q = select(User.id, User.full_name, User.username).where(User.is_active == True).order_by(User.id)
+    else:
+        q = (
+            select(ChatRoomMember.user_id, User.full_name, User.username)
+            .join(User, User.id == ChatRoomMember.user_id)
+            .where(ChatRoomMember.room_id == room_id)
+            .order_by(User.id)
+        )
     result = await db.execute(q)
     return [
         ChatRoomMemberOut(user_id=row[0], full_name=row[1], username=row[2]) for row in result.all()
@@ -259,6 +289,44 @@ async def remove_room_member(
     return Response(status_code=204)
 
 
+async def _open_dm(db: AsyncSession, name: str, user_id: int, other_id: int) -> tuple[ChatRoom, int]:
+    """Найти или создать личный чат пары по ключу (low, high) — один поиск по уникальному индексу.
+
+    Два одновременных «открыть чат» упираются в ux_chat_rooms_dm_pair: проигравший INSERT
+    ждёт коммита победителя, получает DO NOTHING и читает уже созданную комнату.
+    """
+    low, high = min(user_id, other_id), max(user_id, other_id)
+    pair = (ChatRoom.dm_user_low == low, ChatRoom.dm_user_high == high)
+
+    members = {low, high}
+    room = (await db.execute(select(ChatRoom).where(*pair))).scalar_one_or_none()
+    if room is None:
+        await db.execute(
+            pg_insert(ChatRoom)
+            .values(name=name, type="dm", created_by=user_id, dm_user_low=low, dm_user_high=high)
+            .on_conflict_do_nothing(
+                index_elements=["dm_user_low", "dm_user_high"],
+                index_where=ChatRoom.dm_user_low.is_not(None),
+            )
+        )
+        room = (await db.execute(select(ChatRoom).where(*pair))).scalar_one()
+
+    member_count = (await db.execute(
+        select(func.count()).where(ChatRoomMember.room_id == room.id)
+    )).scalar() or 0
+    if member_count < len(members):
+        # Новая комната или кто-то из пары вышел — вернуть обоих
+        await db.execute(
+            pg_insert(ChatRoomMember)
+            .values([{"room_id": room.id, "user_id": uid} for uid in members])
+            .on_conflict_do_nothing()
+        )
+        await db.commit()
+        await db.refresh(room)
+        member_count = len(members)
+    return room, member_count
+
+
 @router.post("/rooms", response_model=ChatRoomOut, status_code=201)
 async def create_room(
     body: ChatRoomCreate,
@@ -268,31 +336,13 @@ async def create_room(
     if body.type == "dm":
         if len(body.member_ids) != 1:
             raise HTTPException(400, "DM requires exactly 1 other member")
-        other_id = body.member_ids[0]
-        # Check existing DM
-        existing = await db.execute(
-            select(ChatRoom).join(ChatRoomMember, ChatRoomMember.room_id == ChatRoom.id).where(
-                ChatRoom.type == "dm",
-                ChatRoomMember.user_id == current_user.id
-            )
+        room, member_count = await _open_dm(db, body.name, current_user.id, body.member_ids[0])
+        return ChatRoomOut(
+            id=room.id, name=room.name, type=room.type,
+            created_by=room.created_by, created_at=room.created_at,
+            member_count=member_count,
+            is_reports_feed=False,
         )
-        for room in existing.scalars().all():
-            other_check = await db.execute(
-                select(ChatRoomMember).where(
-                    ChatRoomMember.room_id == room.id,
-                    ChatRoomMember.user_id == other_id
-                )
-            )
-            if other_check.scalar_one_or_none():
-                member_count = (await db.execute(
-                    select(ChatRoomMember).where(ChatRoomMember.room_id == room.id)
-                )).scalars().all()
-                return ChatRoomOut(
-                    id=room.id, name=room.name, type=room.type,
-                    created_by=room.created_by, created_at=room.created_at,
-                    member_count=len(member_count),
-                    is_reports_feed=False,
-                )
 
     room = ChatRoom(name=body.name, type=body.type, created_by=current_user.id)
     db.add(room)
@@ -316,34 +366,144 @@ async def create_room(
 async def get_messages(
     room_id: int,
     before: int | None = None,
-    limit: int = Query(50, le=100),
+    after: int | None = None,
+    around: int | None = None,
+    limit: int = Query(50, ge=1, le=100),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    member_check = await db.execute(
-        select(ChatRoomMember).where(
-            ChatRoomMember.room_id == room_id, ChatRoomMember.user_id == current_user.id
-        )
-    )
-    if not member_check.scalar_one_or_none():
+    """История комнаты по возрастанию id.
+
+    before — страница старше указанного id (листание вверх);
+    after — всё новее указанного id, до limit (догрузка после переподключения);
+    around — окно вокруг id (переход к сообщению); без курсора — последние limit.
+    """
+    if sum(c is not None for c in (before, after, around)) > 1:
+        raise HTTPException(400, "Use only one of before/after/around")
+
+    if not await _can_access_room(db, room_id, current_user.id):
         raise HTTPException(403, "Not a member")
 
-    q = select(ChatMessage, User).join(User, ChatMessage.sender_id == User.id, isouter=True).where(
-        ChatMessage.room_id == room_id, ChatMessage.is_deleted == False
-    )
-    if before:
-        q = q.where(ChatMessage.id < before)
-    q = q.order_by(ChatMessage.id.desc()).limit(limit)
+    base = select(ChatMessage).where(ChatMessage.room_id == room_id, ChatMessage.is_deleted == False)
 
-    result = await db.execute(q)
-    msgs = []
-    for msg, user in result.all():
-        msgs.append(ChatMessageOut(
-            id=msg.id, room_id=msg.room_id, sender_id=msg.sender_id,
-            sender_name=user.full_name if user else None,
-            content=msg.content, created_at=msg.created_at, is_deleted=msg.is_deleted
-        ))
-    return list(reversed(msgs))
+    if after is not None:
+        result = await db.execute(base.where(ChatMessage.id > after).order_by(ChatMessage.id.asc()).limit(limit))
+        msgs = list(result.scalars().all())
+    elif around is not None:
+        older = await db.execute(
+            base.where(ChatMessage.id < around).order_by(ChatMessage.id.desc()).limit(limit // 2)
+        )
+        newer = await db.execute(
+            base.where(ChatMessage.id >= around).order_by(ChatMessage.id.asc()).limit(limit - limit // 2)
+        )
+        msgs = list(reversed(older.scalars().all())) + list(newer.scalars().all())
+    else:
+        q = base
+        if before is not None:
+            q = q.where(ChatMessage.id < before)
+        result = await db.execute(q.order_by(ChatMessage.id.desc()).limit(limit))
+        msgs = list(reversed(result.scalars().all()))
+
+    names = await get_user_names(db, (m.sender_id for m in msgs))
+    out = orm_dicts(msgs, ChatMessageOut)
+    for item in out:
+        item["sender_name"] = names.get(item["sender_id"])
+    return fast_json(out)
+
+
+@router.get("/hub-stats")
+async def get_hub_stats(_auth: tuple = Depends(require_admin)):
+    """Состояние WebSocket-хаба этого воркера: сокеты, глубина очередей, потери."""
+    return hub_stats()
+
+
+_FEED_READ_ONLY_ERROR = {
+    "type": "error",
+    "detail": "В ленте отчётов только просмотр — отправка отключена",
+}
+
+
+@router.websocket("/ws")
+async def ws_chat_multiplexed(websocket: WebSocket):
+    """Один сокет на клиента для всех комнат.
+
+    Кадры клиента:
+      {"type": "subscribe", "room_ids": [1, 2]}   → {"type": "subscribed", "room_ids": [...], "denied": [...]}
+      {"type": "subscribe", "room_ids": [1], "last_seqs": {"1": 120}}
+          → пропущенные сообщения после seq 120, затем {"type": "replay_done"}
+            или {"type": "replay_gap"} — тогда догрузить через REST ?after=120
+      {"type": "unsubscribe", "room_ids": [1]}    → {"type": "unsubscribed", "room_ids": [...]}
+      {"type": "message", "room_id": 1, "content": "..."}
+    Входящие сообщения приходят с полем room_id, как и на /ws/{room_id}.
+    """
+    # БД нужна только на рукопожатие и подписки — не держим сессию на всё время жизни сокета
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await ws_get_current_user(websocket, db)
+        except Exception:
+            return
+        feed_rid = await _reports_feed_room_id(db)
+
+    await websocket.accept()
+    register_socket(user.id, websocket)
+    conn_id = await presence.connect(user.id)
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            data = json.loads(raw)
+            ws_msg = WSMessage(**data)
+
+            if ws_msg.type == "subscribe" and ws_msg.room_ids:
+                requested = set(ws_msg.room_ids)
+                async with AsyncSessionLocal() as db:
+                    allowed_result = await db.execute(
+                        select(ChatRoomMember.room_id).where(
+                            ChatRoomMember.user_id == user.id,
+                            ChatRoomMember.room_id.in_(requested),
+                        )
+                    )
+                    allowed = {r[0] for r in allowed_result.all()}
+                if feed_rid is not None and feed_rid in requested:
+                    allowed.add(feed_rid)
+                subscribe(user.id, websocket, allowed)
+                await presence.join_rooms(user.id, conn_id, allowed)
+                send_json(websocket, {
+                    "type": "subscribed",
+                    "room_ids": sorted(allowed),
+                    "denied": sorted(requested - allowed),
+                })
+                # Подписка раньше догрузки: сообщение может прийти дважды, но не потеряется
+                for rid, last_seq in (ws_msg.last_seqs or {}).items():
+                    if rid in allowed:
+                        await replay_to_socket(websocket, rid, last_seq)
+
+            elif ws_msg.type == "unsubscribe" and ws_msg.room_ids:
+                unsubscribe(user.id, websocket, ws_msg.room_ids)
+                await presence.leave_rooms(user.id, conn_id, ws_msg.room_ids)
+                send_json(websocket, {"type": "unsubscribed", "room_ids": ws_msg.room_ids})
+
+            elif ws_msg.type == "message" and ws_msg.content and ws_msg.room_id is not None:
+                if ws_msg.room_id not in socket_rooms.get(websocket, ()):
+                    send_json(websocket, {
+                        "type": "error",
+                        "room_id": ws_msg.room_id,
+                        "detail": "Not subscribed",
+                    })
+                    continue
+                if feed_rid is not None and ws_msg.room_id == feed_rid:
+                    send_json(websocket, {**_FEED_READ_ONLY_ERROR, "room_id": ws_msg.room_id})
+                    continue
+                message_buffer.submit(
+                    ws_msg.room_id, user.id, user.full_name, ws_msg.content,
+                    temp_id=ws_msg.temp_id, ws=websocket,
+                )
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        unregister_socket(user.id, websocket)
+        await presence.disconnect(user.id, conn_id)
 
 
 @router.websocket("/ws/{room_id}")
@@ -352,25 +512,26 @@ async def ws_chat(
     room_id: int,
     db: AsyncSession = Depends(get_db),
 ):
+    """Сокет на одну комнату (старые клиенты). Новым клиентам — /ws с подписками.
+    ?last_seq=N — догрузить пропущенное после переподключения (как last_seqs в /ws)."""
     try:
         user = await ws_get_current_user(websocket, db)
     except Exception:
         return
 
-    member_check = await db.execute(
-        select(ChatRoomMember).where(
-            ChatRoomMember.room_id == room_id, ChatRoomMember.user_id == user.id
-        )
-    )
-    if not member_check.scalar_one_or_none():
+    feed_rid = await _reports_feed_room_id(db)
+    if not await _can_access_room(db, room_id, user.id, feed_rid):
         await websocket.close(code=4003)
         return
 
     await websocket.accept()
-    feed_rid = await _reports_feed_room_id(db)
-    if room_id not in _connections:
-        _connections[room_id] = {}
-    _connections[room_id][user.id] = websocket
+    register_socket(user.id, websocket)
+    subscribe(user.id, websocket, [room_id])
+    conn_id = await presence.connect(user.id)
+    await presence.join_rooms(user.id, conn_id, [room_id])
+    last_seq = websocket.query_params.get("last_seq")
+    if last_seq and last_seq.isdigit():
+        await replay_to_socket(websocket, room_id, int(last_seq))
 
     try:
         while True:
@@ -380,27 +541,15 @@ async def ws_chat(
 
             if ws_msg.type == "message" and ws_msg.content:
                 if feed_rid is not None and room_id == feed_rid:
-                    await websocket.send_json({
-                        "type": "error",
-                        "detail": "В ленте отчётов только просмотр — отправка отключена",
-                    })
+                    send_json(websocket, _FEED_READ_ONLY_ERROR)
                     continue
-                async with AsyncSessionLocal() as save_db:
-                    msg = ChatMessage(room_id=room_id, sender_id=user.id, content=ws_msg.content)
-                    save_db.add(msg)
-                    await save_db.commit()
-                    await save_db.refresh(msg)
-
-                    await broadcast_chat_message(room_id, msg, user.full_name)
-                    await push_offline_room_members(
-                        room_id,
-                        user.id,
-                        user.full_name or "TerraApp",
-                        ws_msg.content or "",
-                        save_db,
-                    )
+                message_buffer.submit(
+                    room_id, user.id, user.full_name, ws_msg.content,
+                    temp_id=ws_msg.temp_id, ws=websocket,
+                )
 
     except WebSocketDisconnect:
         pass
     finally:
-        _connections.get(room_id, {}).pop(user.id, None)
+        unregister_socket(user.id, websocket)
+        await presence.disconnect(user.id, conn_id)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
-from app.core.database import get_db
+from sqlalchemy.orm import undefer
+from app.core.database import get_db, get_read_db
+from app.core.fast_json import fast_json, orm_dicts
 from app.models.dictionary import Activity, Location, MachineKind, MachineItem, Crop, CustomDict, CustomDictItem
 from app.schemas.dictionary import (
     ActivityOut, ActivityCreate, ActivityUpdate,
-    LocationOut, LocationCreate, LocationUpdate,
+    LocationOut, LocationCreate, LocationUpdate, LocationGeometryOut,
     MachineKindOut, MachineKindCreate, MachineKindUpdate,
     MachineItemOut, MachineItemCreate,
     CropOut, CropCreate, CropUpdate,
@@ -14,12 +16,13 @@ from app.schemas.dictionary import (
     DictionariesOut, ReorderRequest
 )
 from app.api.deps import get_current_user, require_admin
+from app.services.geofence import bump_version, rings_from_geojson
 
 router = APIRouter(prefix="/dictionaries", tags=["dictionaries"])
 
 
 @router.get("", response_model=DictionariesOut)
-async def get_all(db: AsyncSession = Depends(get_db), _=Depends(get_current_user)):
+async def get_all(db: AsyncSession = Depends(get_read_db), _=Depends(get_current_user)):
     acts  = (await db.execute(select(Activity).order_by(Activity.grp, Activity.pos))).scalars().all()
     locs  = (await db.execute(select(Location).order_by(Location.grp, Location.pos))).scalars().all()
     kinds = (await db.execute(select(MachineKind).order_by(MachineKind.pos))).scalars().all()
@@ -27,15 +30,22 @@ async def get_all(db: AsyncSession = Depends(get_db), _=Depends(get_current_user
     crops = (await db.execute(select(Crop).order_by(Crop.pos))).scalars().all()
     cdicts = (await db.execute(select(CustomDict).order_by(CustomDict.pos))).scalars().all()
     cditems = (await db.execute(select(CustomDictItem).order_by(CustomDictItem.dict_id, CustomDictItem.pos))).scalars().all()
-    # attach items to each custom dict
+    # attach items to each custom dict (столбцы справочников без повторной валидации, кроме JSON options)
     cditems_map: dict[int, list] = {}
-    for ci in cditems:
-        cditems_map.setdefault(ci.dict_id, []).append(ci)
+    for ci in orm_dicts(cditems, CustomDictItemOut, validate=("options",)):
+        cditems_map.setdefault(ci["dict_id"], []).append(ci)
     custom_dicts_out = [
-        CustomDictOut(id=d.id, name=d.name, pos=d.pos, items=cditems_map.get(d.id, []))
+        {"id": d.id, "name": d.name, "pos": d.pos, "items": cditems_map.get(d.id, [])}
         for d in cdicts
     ]
-    return DictionariesOut(activities=acts, locations=locs, machine_kinds=kinds, machine_items=items, crops=crops, custom_dicts=custom_dicts_out)
+    return fast_json({
+        "activities": orm_dicts(acts, ActivityOut, validate=("options",)),
+        "locations": orm_dicts(locs, LocationOut, validate=("options",)),
+        "machine_kinds": orm_dicts(kinds, MachineKindOut, validate=("options",)),
+        "machine_items": orm_dicts(items, MachineItemOut),
+        "crops": orm_dicts(crops, CropOut, validate=("options",)),
+        "custom_dicts": custom_dicts_out,
+    })
 
 
 # ── Activities ──
@@ -110,6 +120,48 @@ async def update_location(loc_id: int, body: LocationUpdate, db: AsyncSession =
     return obj
 
 
+@router.get("/locations/geometry", response_model=list[LocationGeometryOut])
+async def list_location_geometry(db: AsyncSession = Depends(get_db), _=Depends(get_current_user)):
+    """Контуры полей для карты (только локации с заданной геометрией)."""
+    q = (
+        select(Location)
+        .options(undefer(Location.geometry))
+        .where(Location.geometry.is_not(None))
+        .order_by(Location.grp, Location.pos)
+    )
+    return (await db.execute(q)).scalars().all()
+
+
+@router.put("/locations/{loc_id}/geometry", response_model=LocationGeometryOut)
+async def set_location_geometry(
+    loc_id: int,
+    geometry: dict = Body(..., description="GeoJSON Polygon или MultiPolygon, координаты [lon, lat]"),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(require_admin),
+):
+    try:
+        rings_from_geojson(geometry)
+    except (ValueError, TypeError, KeyError, IndexError) as e:
+        raise HTTPException(422, f"Invalid geometry: {e}")
+    obj = await db.get(Location, loc_id)
+    if not obj:
+        raise HTTPException(404, "Not found")
+    obj.geometry = geometry
+    await db.commit()
+    await bump_version()
+    return LocationGeometryOut(id=obj.id, name=obj.name, grp=obj.grp, geometry=geometry)
+
+
+@router.delete("/locations/{loc_id}/geometry", status_code=204)
+async def delete_location_geometry(loc_id: int, db: AsyncSession = Depends(get_db), _=Depends(require_admin)):
+    obj = await db.get(Location, loc_id)
+    if not obj:
+        raise HTTPException(404, "Not found")
+    obj.geometry = None
+    await db.commit()
+    await bump_version()
+
+
 @router.delete("/locations/{loc_id}", status_code=204)
 async def delete_location(loc_id: int, db: AsyncSession = Depends(get_db), _=Depends(require_admin)):
     result = await db.execute(select(Location).where(Location.id == loc_id))
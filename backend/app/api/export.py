@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends, BackgroundTasks
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, cast
-from sqlalchemy.types import Date as DateColumn
-from datetime import date
+from sqlalchemy import select, and_, func
+from datetime import date, timedelta
 import os
-from app.core.database import get_db
+from app.core.database import get_replica_db
+from app.core.rate_limit import rate_limit
 from app.models.report import Report, BrigadierReport, FormResponse
 from app.models.user import User
 from app.api.deps import require_accountant_or_admin, require_admin
 from app.services.excel_export import build_otd_excel, build_accounting_excel
+from app.services.partitions import day_start
 
 
 def _parse_hours(data: dict) -> float:
@@ -31,13 +32,13 @@ EXPORT_DIR = "/tmp/terra_exports"
 os.makedirs(EXPORT_DIR, exist_ok=True)
 
 
-@router.post("/excel/otd")
+@router.post("/excel/otd", dependencies=[Depends(rate_limit("export"))])
 async def export_otd_excel(
     date_from: date,
     date_to: date,
     background_tasks: BackgroundTasks,
     admin=Depends(require_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_replica_db),
 ):
     result = await db.execute(
         select(Report).where(
@@ -56,12 +57,12 @@ async def export_otd_excel(
     )
 
 
-@router.post("/excel/accounting")
+@router.post("/excel/accounting", dependencies=[Depends(rate_limit("export"))])
 async def export_accounting_excel(
     date_from: date,
     date_to: date,
     admin=Depends(require_accountant_or_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_replica_db),
 ):
     result = await db.execute(
         select(Report, User).join(User, Report.user_id == User.id, isouter=True).where(
@@ -92,9 +93,9 @@ def _work_date_filters(model, date_from: date | None, date_to: date | None):
 def _submitted_at_filters(date_from: date | None, date_to: date | None):
     conds = []
     if date_from is not None:
-        conds.append(cast(FormResponse.submitted_at, DateColumn) >= date_from)
+        conds.append(FormResponse.submitted_at >= day_start(date_from))
     if date_to is not None:
-        conds.append(cast(FormResponse.submitted_at, DateColumn) <= date_to)
+        conds.append(FormResponse.submitted_at < day_start(date_to + timedelta(days=1)))
     return and_(*conds) if conds else None
 
 
@@ -103,7 +104,7 @@ async def admin_stats(
     date_from: date | None = None,
     date_to: date | None = None,
     admin=Depends(require_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_replica_db),
 ):
     """
     Сводка по сотрудникам за период.
@@ -1,25 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+import json
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.attributes import flag_modified
 from app.core.database import get_db
 from app.models.form import FormTemplate, FormAssignment
 from app.models.user import UserRole
-from app.schemas.form import FormTemplateCreate, FormTemplateUpdate, FormTemplateOut
+from app.schemas.form import FormTemplateCreate, FormTemplateUpdate, FormTemplateOut, FormTemplateSummaryOut
 from app.api.deps import get_current_user, require_admin
 from app.models.user import User
+from app.services import forms_cache
 
 router = APIRouter(prefix="/forms", tags=["forms"])
 
+_full_list = TypeAdapter(list[FormTemplateOut])
+_summary_list = TypeAdapter(list[FormTemplateSummaryOut])
 
-async def _form_to_out(form: FormTemplate, db: AsyncSession) -> FormTemplateOut:
-    result = await db.execute(
-        select(FormAssignment.role).where(
-            FormAssignment.form_id == form.id,
-            FormAssignment.role.isnot(None)
-        )
-    )
-    roles = [r[0] for r in result.all()]
+
+def _roles(form: FormTemplate) -> list[str]:
+    # assignments должны быть загружены заранее (selectinload / _load_form)
+    return [a.role for a in form.assignments if a.role is not None]
+
+
+def _schema_version(schema: dict) -> str:
+    return hashlib.sha1(json.dumps(schema, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:12]
+
+
+def _form_to_out(form: FormTemplate) -> FormTemplateOut:
     return FormTemplateOut(
         id=form.id,
         name=form.name,
@@ -28,34 +40,73 @@ async def _form_to_out(form: FormTemplate, db: AsyncSession) -> FormTemplateOut:
         is_active=form.is_active,
         created_by=form.created_by,
         created_at=form.created_at,
-        roles=roles,
+        roles=_roles(form),
     )
 
 
-@router.get("", response_model=list[FormTemplateOut])
+def _form_to_summary(form: FormTemplate) -> FormTemplateSummaryOut:
+    return FormTemplateSummaryOut(
+        id=form.id,
+        name=form.name,
+        title=form.title,
+        is_active=form.is_active,
+        roles=_roles(form),
+        schema_version=_schema_version(form.schema),
+    )
+
+
+async def _load_form(db: AsyncSession, form_id: int) -> FormTemplate | None:
+    result = await db.execute(
+        select(FormTemplate)
+        .where(FormTemplate.id == form_id)
+        .options(selectinload(FormTemplate.assignments))
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+def _json_response(body: bytes, etag: str, if_none_match: str | None) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if forms_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("", response_model=list[FormTemplateOut] | list[FormTemplateSummaryOut])
 async def list_forms(
+    fields: Literal["full", "summary"] = Query("full", description="summary — без схем, со schema_version"),
+    if_none_match: str | None = Header(None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    role_result = await db.execute(select(UserRole).where(UserRole.user_id == current_user.id))
-    role_row = role_result.scalar_one_or_none()
-    role = role_row.role if role_row else "user"
+    role_result = await db.execute(select(UserRole.role).where(UserRole.user_id == current_user.id))
+    role = role_result.scalar_one_or_none() or "user"
 
     # Support comma-separated multi-roles (e.g. "otd,brigadier")
-    user_roles = [r.strip() for r in role.split(",")]
-
-    if "admin" in user_roles:
-        q = select(FormTemplate).order_by(FormTemplate.id)
-    else:
-        assigned = select(FormAssignment.form_id).where(FormAssignment.role.in_(user_roles))
-        q = select(FormTemplate).where(
-            FormTemplate.is_active == True,
-            FormTemplate.id.in_(assigned)
-        ).order_by(FormTemplate.id)
-
-    result = await db.execute(q)
-    forms = result.scalars().all()
-    return [await _form_to_out(f, db) for f in forms]
+    user_roles = sorted({r.strip() for r in role.split(",")})
+    roles_key = "admin" if "admin" in user_roles else ",".join(user_roles)
+
+    version = await forms_cache.current_version()
+    cached = forms_cache.get(version, roles_key, fields)
+    if cached is None:
+        if roles_key == "admin":
+            q = select(FormTemplate).order_by(FormTemplate.id)
+        else:
+            assigned = select(FormAssignment.form_id).where(FormAssignment.role.in_(user_roles))
+            q = select(FormTemplate).where(
+                FormTemplate.is_active == True,
+                FormTemplate.id.in_(assigned)
+            ).order_by(FormTemplate.id)
+
+        result = await db.execute(q.options(selectinload(FormTemplate.assignments)))
+        forms = result.scalars().all()
+        if fields == "summary":
+            body = _summary_list.dump_json([_form_to_summary(f) for f in forms])
+        else:
+            body = _full_list.dump_json([_form_to_out(f) for f in forms])
+        cached = forms_cache.put(version, roles_key, fields, body)
+
+    return _json_response(*cached, if_none_match)
 
 
 @router.post("", response_model=FormTemplateOut, status_code=201)
@@ -84,17 +135,22 @@ async def create_form(
         db.add(FormAssignment(form_id=form.id, group_id=group_id))
 
     await db.commit()
-    await db.refresh(form)
-    return await _form_to_out(form, db)
+    await forms_cache.bump_version()
+    return _form_to_out(await _load_form(db, form.id))
 
 
 @router.get("/{form_id}", response_model=FormTemplateOut)
-async def get_form(form_id: int, db: AsyncSession = Depends(get_db), _=Depends(get_current_user)):
-    result = await db.execute(select(FormTemplate).where(FormTemplate.id == form_id))
-    form = result.scalar_one_or_none()
+async def get_form(
+    form_id: int,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    form = await _load_form(db, form_id)
     if not form:
         raise HTTPException(404, "Not found")
-    return await _form_to_out(form, db)
+    body = _form_to_out(form).model_dump_json().encode()
+    return _json_response(body, forms_cache.make_etag(body), if_none_match)
 
 
 @router.patch("/{form_id}", response_model=FormTemplateOut)
@@ -126,8 +182,8 @@ async def update_form(
             db.add(FormAssignment(form_id=form_id, role=role))
 
     await db.commit()
-    await db.refresh(form)
-    return await _form_to_out(form, db)
+    await forms_cache.bump_version()
+    return _form_to_out(await _load_form(db, form_id))
 
 
 @router.delete("/{form_id}", status_code=204)
@@ -138,3 +194,4 @@ async def delete_form(form_id: int, admin=Depends(require_admin), db: AsyncSessi
         raise HTTPException(404, "Not found")
     await db.delete(form)
     await db.commit()
+    await forms_cache.bump_version()
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.api.deps import require_admin
+from app.core.config import settings
+from app.core import profiling
+
+router = APIRouter(prefix="/admin/profiling", tags=["admin"])
+
+
+@router.post("/sample", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    all_threads: bool = False,
+    _auth: tuple = Depends(require_admin),
+):
+    """Профиль этого воркера за seconds в формате collapsed stacks (flamegraph.pl / speedscope).
+
+    Ответ приходит по окончании сбора; сводка — в заголовках X-Profile-*.
+    """
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(400, f"seconds must be at most {settings.PROFILE_MAX_SECONDS}")
+    try:
+        collapsed, info = await profiling.sample(seconds, interval_ms / 1000, all_threads=all_threads)
+    except profiling.ProfilerBusy:
+        raise HTTPException(409, "Another profile is being captured")
+    return PlainTextResponse(
+        collapsed + "\n",
+        headers={
+            "X-Profile-Samples": str(info["samples"]),
+            "X-Profile-Stacks": str(info["stacks"]),
+            "X-Profile-Overrun": str(info["overrun"]),
+        },
+    )
+
+
+@router.get("/tasks")
+async def dump_tasks(limit: int = Query(30, ge=1, le=200), _auth: tuple = Depends(require_admin)):
+    """asyncio-задачи этого воркера со стеками корутин."""
+    tasks = profiling.task_dump(limit=limit)
+    return {"count": len(tasks), "tasks": tasks}
+
+
+@router.get("/loop-lag")
+async def get_loop_lag(_auth: tuple = Depends(require_admin)):
+    """Задержка event loop и стеки последних зависаний дольше порога."""
+    return profiling.lag_monitor.snapshot()
+
+
+@router.post("/loop-lag/start")
+async def start_loop_lag(
+    threshold_ms: float = Query(None, ge=5),
+    interval_ms: float = Query(50, ge=5, le=1000),
+    _auth: tuple = Depends(require_admin),
+):
+    threshold = (threshold_ms or settings.LOOP_LAG_THRESHOLD_MS) / 1000
+    profiling.lag_monitor.start(threshold, interval_ms / 1000)
+    return profiling.lag_monitor.snapshot()
+
+
+@router.post("/loop-lag/stop")
+async def stop_loop_lag(_auth: tuple = Depends(require_admin)):
+    await profiling.lag_monitor.stop()
+    return profiling.lag_monitor.snapshot()
@@ -2,19 +2,22 @@ from datetime import date, timedelta
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy.orm.attributes import flag_modified
-from sqlalchemy import select, func, and_, cast
+from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.types import Date as DateColumn
 
 from app.api.deps import (
     get_current_user,
     get_current_user_role,
     require_accountant_or_admin,
 )
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db, get_replica_db
+from app.core.fast_json import fast_json, orm_dicts
+from app.core.rate_limit import rate_limit
 from app.models.form import FormTemplate
 from app.models.report import Report, BrigadierReport, FormResponse
 from app.models.user import User, UserRole
+from app.services.partitions import day_start
+from app.services.telemetry import machine_hours
 from app.services.reports_feed_chat import (
     announce_brig,
     announce_brig_delete,
@@ -161,7 +164,7 @@ async def _merge_otd_feed_for_user(
 # ──────────────────────────── OTD Reports ────────────────────────────
 
 
-@router.post("/reports", response_model=ReportOut, status_code=201)
+@router.post("/reports", response_model=ReportOut, status_code=201, dependencies=[Depends(rate_limit("report_submit"))])
 async def create_report(
     body: ReportCreate,
     current_user: User = Depends(get_current_user),
@@ -192,7 +195,7 @@ async def create_report(
 @router.get("/reports", response_model=list[ReportOut])
 async def list_reports(
     user_and_role: tuple = Depends(get_current_user_role),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     date_from: date | None = None,
     date_to: date | None = None,
     limit: int = Query(50, le=200),
@@ -208,13 +211,13 @@ async def list_reports(
         q = q.where(Report.work_date <= date_to)
     q = q.order_by(Report.work_date.desc(), Report.id.desc()).limit(limit).offset(offset)
     result = await db.execute(q)
-    return result.scalars().all()
+    return fast_json(orm_dicts(result.scalars().all(), ReportOut))
 
 
 @router.get("/reports/feed", response_model=list[ReportFeedItemOut])
 async def reports_feed(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     limit: int = Query(100, le=200),
 ):
     """Список ОТД: классические записи + flow-форма «otd» (form_responses)."""
@@ -227,7 +230,7 @@ async def admin_otd_feed(
     date_to: date | None = None,
     limit: int = Query(500, le=2000),
     _admin=Depends(require_accountant_or_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_replica_db),
 ):
     """Все ОТД-отчёты за период: классика + flow «otd» (для админки)."""
     ft_result = await db.execute(select(FormTemplate).where(FormTemplate.name == "otd"))
@@ -235,8 +238,6 @@ async def admin_otd_feed(
     otd_ids = [f.id for f in otd_forms] if otd_forms else []
     title_by_id = {f.id: f.title for f in otd_forms} if otd_forms else {}
 
-    items: list[ReportFeedItemOut] = []
-
     rq = select(Report)
     if date_from:
         rq = rq.where(Report.work_date >= date_from)
@@ -244,27 +245,8 @@ async def admin_otd_feed(
         rq = rq.where(Report.work_date <= date_to)
     rq = rq.order_by(Report.work_date.desc(), Report.id.desc()).limit(limit)
     r_result = await db.execute(rq)
-    for r in r_result.scalars().all():
-        items.append(
-            ReportFeedItemOut(
-                source="otd",
-                id=r.id,
-                created_at=r.created_at,
-                user_id=r.user_id,
-                reg_name=r.reg_name,
-                work_date=r.work_date,
-                hours=r.hours,
-                location=r.location,
-                location_grp=r.location_grp,
-                activity=r.activity,
-                activity_grp=r.activity_grp,
-                machine_type=r.machine_type,
-                machine_name=r.machine_name,
-                crop=r.crop,
-                trips=r.trips,
-                form_title=None,
-            )
-        )
+    # Строки reports типизированы — без моделей; ответы форм (JSONB) проходят через модель
+    items = orm_dicts(r_result.scalars().all(), ReportFeedItemOut, source="otd")
 
     if otd_ids:
         fq = (
@@ -273,18 +255,26 @@ async def admin_otd_feed(
             .where(FormResponse.form_id.in_(otd_ids))
         )
         if date_from:
-            fq = fq.where(cast(FormResponse.submitted_at, DateColumn) >= date_from)
+            fq = fq.where(FormResponse.submitted_at >= day_start(date_from))
         if date_to:
-            fq = fq.where(cast(FormResponse.submitted_at, DateColumn) <= date_to)
+            fq = fq.where(FormResponse.submitted_at < day_start(date_to + timedelta(days=1)))
         fq = fq.order_by(FormResponse.submitted_at.desc()).limit(limit)
         fr_result = await db.execute(fq)
         for fr, full_name in fr_result.all():
             items.append(
-                _form_response_to_feed_item(fr, title_by_id.get(fr.form_id, "ОТД"), full_name)
+                _form_response_to_feed_item(fr, title_by_id.get(fr.form_id, "ОТД"), full_name).model_dump()
             )
 
-    items.sort(key=lambda x: (x.work_date or date.min, x.created_at), reverse=True)
-    return items[:limit]
+    items.sort(key=lambda x: (x["work_date"] or date.min, x["created_at"]), reverse=True)
+    items = items[:limit]
+
+    # Рядом с заявленными часами — моточасы машины за тот же день по трекеру
+    hours = await machine_hours(db, {i["machine_name"] for i in items}, date_from, date_to)
+    for item in items:
+        tracked = hours.get((item["machine_name"], item["work_date"]))
+        if tracked:
+            item["telemetry_engine_hours"], item["telemetry_motion_hours"] = tracked
+    return fast_json(items)
 
 
 @router.get("/reports/{report_id}", response_model=ReportOut)
@@ -363,7 +353,7 @@ async def delete_report(
 # ──────────────────────────── Brigadier Reports ────────────────────────────
 
 
-@router.post("/brig/reports", response_model=BrigReportOut, status_code=201)
+@router.post("/brig/reports", response_model=BrigReportOut, status_code=201, dependencies=[Depends(rate_limit("report_submit"))])
 async def create_brig_report(
     body: BrigReportCreate,
     current_user: User = Depends(get_current_user),
@@ -426,7 +416,7 @@ async def list_brig_reports(
 # ──────────────────────────── Dynamic Form Responses ────────────────────────────
 
 
-@router.post("/form-responses", response_model=FormResponseOut, status_code=201)
+@router.post("/form-responses", response_model=FormResponseOut, status_code=201, dependencies=[Depends(rate_limit("report_submit"))])
 async def submit_form(
     body: FormResponseCreate,
     current_user: User = Depends(get_current_user),
@@ -527,7 +517,7 @@ async def delete_form_response(
 async def get_stats(
     period: str = Query("week", pattern="^(today|week|month)$"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     today = date.today()
     if period == "today":
@@ -549,8 +539,8 @@ async def get_stats(
     fr_q = select(FormResponse).where(
         and_(
             FormResponse.user_id == current_user.id,
-            cast(FormResponse.submitted_at, DateColumn) >= date_from,
-            cast(FormResponse.submitted_at, DateColumn) <= today,
+            FormResponse.submitted_at >= day_start(date_from),
+            FormResponse.submitted_at < day_start(today + timedelta(days=1)),
         )
     )
     frs = (await db.execute(fr_q)).scalars().all()
@@ -0,0 +1,119 @@
+import secrets
+from datetime import date
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user, require_accountant_or_admin, require_admin
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.report import Report
+from app.models.telemetry import TelemetryDevice
+from app.models.user import User
+from app.schemas.telemetry import (
+    FieldSuggestionOut,
+    MachineHoursOut,
+    TelemetryDeviceOut,
+    TelemetryDeviceUpdate,
+    TelemetryIngestOut,
+)
+from app.services import telemetry
+
+router = APIRouter(prefix="/telemetry", tags=["telemetry"])
+
+
+@router.post("/positions", response_model=TelemetryIngestOut)
+async def ingest_positions(
+    request: Request,
+    x_telemetry_token: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Точки от Traccar (forward.url). Тело — объект пересылки Traccar, их список или {"positions": [...]}."""
+    if not settings.TELEMETRY_INGEST_TOKEN:
+        raise HTTPException(status_code=503, detail="Telemetry ingest disabled")
+    if not x_telemetry_token or not secrets.compare_digest(x_telemetry_token, settings.TELEMETRY_INGEST_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid telemetry token")
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    positions, rejected = telemetry.parse_payload(payload)
+    if len(positions) > settings.TELEMETRY_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"Batch larger than {settings.TELEMETRY_MAX_BATCH} positions")
+    accepted = await telemetry.ingest(db, positions)
+    return TelemetryIngestOut(accepted=accepted, rejected=rejected)
+
+
+@router.get("/devices", response_model=list[TelemetryDeviceOut])
+async def list_devices(
+    _auth: tuple = Depends(require_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await db.execute(select(TelemetryDevice).order_by(TelemetryDevice.name, TelemetryDevice.id))
+    return result.scalars().all()
+
+
+@router.patch("/devices/{device_id}", response_model=TelemetryDeviceOut)
+async def update_device(
+    device_id: int,
+    body: TelemetryDeviceUpdate,
+    _auth: tuple = Depends(require_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    device = await db.get(TelemetryDevice, device_id)
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    device.machine_name = body.machine_name or None
+    await db.commit()
+    await db.refresh(device)
+    return device
+
+
+@router.get("/machine-hours", response_model=list[MachineHoursOut])
+async def get_machine_hours(
+    date_from: date,
+    date_to: date,
+    _auth: tuple = Depends(require_accountant_or_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """Заявленные в ОТД часы по машине и дню рядом с моточасами и часами движения по трекеру."""
+    if date_to < date_from or (date_to - date_from).days > 366:
+        raise HTTPException(status_code=400, detail="Invalid period")
+    reported_rows = await db.execute(
+        select(Report.machine_name, Report.work_date, func.sum(Report.hours))
+        .where(
+            Report.machine_name.is_not(None),
+            Report.work_date >= date_from,
+            Report.work_date <= date_to,
+        )
+        .group_by(Report.machine_name, Report.work_date)
+    )
+    reported = {(name, day): hours for name, day, hours in reported_rows.all()}
+    tracked_names = (await db.execute(
+        select(TelemetryDevice.machine_name).where(TelemetryDevice.machine_name.is_not(None)).distinct()
+    )).scalars().all()
+    tracked = await telemetry.machine_hours(db, tracked_names, date_from, date_to)
+
+    out = []
+    for name, day in sorted(reported.keys() | tracked.keys(), key=lambda k: (k[1], k[0]), reverse=True):
+        engine_h, motion_h = tracked.get((name, day), (None, None))
+        out.append(MachineHoursOut(
+            machine_name=name,
+            day=day,
+            reported_hours=reported.get((name, day)),
+            engine_hours=engine_h,
+            motion_hours=motion_h,
+        ))
+    return out
+
+
+@router.get("/suggestions", response_model=list[FieldSuggestionOut])
+async def get_field_suggestions(
+    machine_name: str,
+    day: date,
+    _user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Поля и моточасы машины за день по трекеру — для предзаполнения локации и часов в ОТД."""
+    return await telemetry.field_suggestions(db, machine_name, day)
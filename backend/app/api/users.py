@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, or_, tuple_
 from app.core.database import get_db
 from app.models.user import User, UserRole, PushToken
 from app.schemas.user import UserOut, UserUpdate, UserAdminUpdate, UserListItem
 from app.api.deps import get_current_user, get_current_user_role, require_admin
+from app.realtime import presence
+from app.services import refresh_tokens
+from app.services.active_users import mark_active, mark_inactive
+from app.services.user_names import invalidate_user_name
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -41,6 +47,7 @@ async def update_me(
 ):
     if body.full_name is not None:
         current_user.full_name = body.full_name
+        invalidate_user_name(current_user.id)
     if body.phone is not None:
         current_user.phone = body.phone
     if body.tz is not None:
@@ -68,38 +75,71 @@ async def register_push_token(
 
 @router.get("/online-count")
 async def get_online_count(admin=Depends(require_admin)):
-    from app.realtime.chat_hub import connections
-    online_users: set[int] = set()
-    for room_connections in connections.values():
-        online_users.update(room_connections.keys())
-    return {"count": len(online_users)}
+    return {"count": await presence.online_count()}
+
+
+def _encode_cursor(created_at: datetime, user_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{user_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, user_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.get("", response_model=list[UserListItem])
 async def list_users(
+    response: Response,
     admin=Depends(require_admin),
     db: AsyncSession = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
+    q: str | None = Query(None, max_length=100),
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
 ):
-    result = await db.execute(
-        select(User).where(User.is_active == True).offset(skip).limit(limit).order_by(User.created_at.desc())
+    """Активные пользователи, новые сверху. Роль — одним JOIN, пагинация по ключу (created_at, id).
+    Курсор следующей страницы отдаётся в заголовке X-Next-Cursor (нет заголовка — страниц больше нет)."""
+    stmt = (
+        select(User, UserRole.role)
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .where(User.is_active == True)
     )
-    users = result.scalars().all()
-    items = []
-    for u in users:
-        r = await db.execute(select(UserRole).where(UserRole.user_id == u.id))
-        role_row = r.scalar_one_or_none()
-        items.append(UserListItem(
+    if q and q.strip():
+        # % и _ из запроса — буквальные символы, а не шаблон
+        term = q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{term}%"
+        stmt = stmt.where(or_(
+            User.full_name.ilike(pattern, escape="\\"),
+            User.username.ilike(pattern, escape="\\"),
+            User.phone.ilike(pattern, escape="\\"),
+        ))
+    if cursor:
+        c_created_at, c_id = _decode_cursor(cursor)
+        stmt = stmt.where(tuple_(User.created_at, User.id) < tuple_(c_created_at, c_id))
+    stmt = stmt.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last.created_at, last.id)
+
+    return [
+        UserListItem(
             id=u.id,
             full_name=u.full_name,
             username=u.username,
             phone=u.phone,
-            role=role_row.role if role_row else "user",
+            role=role or "user",
             is_active=u.is_active,
             created_at=u.created_at,
-        ))
-    return items
+        )
+        for u, role in rows
+    ]
 
 
 @router.patch("/{user_id}", response_model=UserOut)
@@ -116,6 +156,7 @@ async def admin_update_user(
 
     if body.full_name is not None:
         user.full_name = body.full_name
+        invalidate_user_name(user.id)
     if body.is_active is not None:
         user.is_active = body.is_active
 
@@ -129,4 +170,9 @@ async def admin_update_user(
 
     await db.commit()
     await db.refresh(user)
+    if body.is_active is True:
+        await mark_active(user.id)
+    elif body.is_active is False:
+        await mark_inactive(user.id)
+        await refresh_tokens.revoke_all(user.id)
     return await _build_user_out(user, db)
@@ -0,0 +1,102 @@
+"""Сжатие ответов: brotli (если установлен пакет brotli и клиент его принимает), иначе gzip.
+
+Сжимаются только цельные (не потоковые) ответы текстовых типов длиннее
+COMPRESS_MIN_BYTES: JSON-списки, /metrics. Excel-выгрузки (уже zip), файлы и
+потоковые ответы проходят как есть. Тела больше COMPRESS_THREAD_BYTES сжимаются в
+потоке — zlib и brotli отпускают GIL, event loop не стоит, пока жмётся лента на мегабайт.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость
+    brotli = None
+
+_COMPRESSIBLE = (b"application/json", b"text/", b"application/javascript", b"image/svg+xml")
+
+
+def _accepted(scope) -> set[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"accept-encoding":
+            return {part.split(";")[0].strip() for part in value.decode("latin-1").lower().split(",")}
+    return set()
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accepted = _accepted(scope)
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", ()))
+                content_type = headers.get(b"content-type", b"")
+                if b"content-encoding" in headers or not content_type.startswith(_COMPRESSIBLE):
+                    await send(message)
+                    return
+                # Решение — по первому куску тела: сжимаем, только если он же и последний
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            pending, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < settings.COMPRESS_MIN_BYTES:
+                await send(pending)
+                await send(message)
+                return
+
+            if len(body) > settings.COMPRESS_THREAD_BYTES:
+                body = await asyncio.to_thread(_compress, body, encoding)
+            else:
+                body = _compress(body, encoding)
+            headers = []
+            vary = []
+            for k, v in pending.get("headers", ()):
+                if k == b"content-length":
+                    continue
+                if k == b"vary":
+                    vary.append(v)
+                    continue
+                if k == b"etag" and v.startswith(b'"'):
+                    # Сжатое тело побайтно другое: сильный валидатор становится слабым
+                    v = b"W/" + v
+                headers.append((k, v))
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b", ".join([*vary, b"Accept-Encoding"])),
+            ]
+            await send({**pending, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
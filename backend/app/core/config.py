@@ -26,9 +26,52 @@ class Settings(BaseSettings):
     def DATABASE_URL_SYNC(self) -> str:
         return f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    # Реплика для тяжёлого чтения (лента ОТД админки, статистика, выгрузки); пустой хост — всё на основной.
+    # Запросы идут на реплику, пока её отставание не больше DB_REPLICA_MAX_LAG_SECONDS
+    # (проверяется не чаще раза в DB_REPLICA_LAG_CHECK_SECONDS), иначе — на основную.
+    DB_REPLICA_HOST: str = ""
+    DB_REPLICA_PORT: int = 0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 10.0
+    DB_REPLICA_LAG_CHECK_SECONDS: float = 5.0
+
+    @property
+    def DATABASE_REPLICA_URL(self) -> str | None:
+        if not self.DB_REPLICA_HOST:
+            return None
+        port = self.DB_REPLICA_PORT or self.DB_PORT
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_REPLICA_HOST}:{port}/{self.DB_NAME}"
+
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Presence (онлайн-статус WebSocket-подключений в Redis)
+    PRESENCE_TTL_SECONDS: int = 60
+    PRESENCE_HEARTBEAT_SECONDS: int = 20
+
+    # Исходящая очередь WebSocket: лимит кадров на сокет и таймаут одной отправки
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+
+    # Пакетная запись сообщений из WebSocket: окно сбора и максимальный размер пакета
+    CHAT_WRITE_BATCH_WINDOW_MS: float = 5.0
+    CHAT_WRITE_BATCH_MAX: int = 200
+
+    # Догрузка пропущенных сообщений при переподключении WebSocket (последние N на комнату)
+    CHAT_REPLAY_BUFFER_SIZE: int = 200
+    CHAT_REPLAY_TTL_SECONDS: int = 86400
+
+    # Множество активных пользователей в Redis (участники ленты отчётов): период полной пересборки из БД
+    ACTIVE_USERS_REBUILD_SECONDS: int = 3600
+
+    # Кэш tenant_settings в памяти воркера (сбрасывается через Redis pub/sub, TTL — страховка)
+    TENANT_SETTINGS_CACHE_SECONDS: int = 300
+
+    # bcrypt: стоимость хэша и отдельный пул потоков, чтобы хэширование не блокировало event loop.
+    # При смене BCRYPT_ROUNDS пароль перехэшируется при следующем входе.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_WAITING: int = 500
+
     # JWT
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_EXPIRE_MINUTES: int = 15
@@ -44,11 +87,76 @@ class Settings(BaseSettings):
     # Sentry
     SENTRY_DSN: str = ""
 
+    # Prometheus: /metrics (пустой токен — без авторизации, иначе Authorization: Bearer <токен>);
+    # METRICS_WORKER_PORT — отдельный порт метрик ARQ-воркера (0 — выключен)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+    METRICS_WORKER_PORT: int = 0
+
+    # Учёт SQL на запрос: заголовок Server-Timing, предупреждение в лог сверх порогов
+    # по числу запросов / времени в БД, лог медленных запросов с местом вызова
+    SQL_STATS_ENABLED: bool = True
+    SQL_SLOW_QUERY_MS: int = 200
+    SQL_REQUEST_WARN_QUERIES: int = 30
+    SQL_REQUEST_WARN_MS: int = 500
+
+    # Лимиты частоты в Redis (app/core/rate_limit.py), «N/second|minute|hour|day» на пользователя
+    # (без токена — на IP); вход — на пару IP + логин
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN: str = "10/minute"
+    RATE_LIMIT_REPORT_SUBMIT: str = "30/minute"
+    RATE_LIMIT_EXPORT: str = "10/minute"
+
+    # Большие JSON-списки без повторной валидации (app/core/fast_json.py); false — через response_model.
+    # Сжатие ответов: br (если установлен brotli) или gzip от COMPRESS_MIN_BYTES, большие тела — в потоке
+    FAST_JSON_RESPONSES: bool = True
+    COMPRESS_MIN_BYTES: int = 1024
+    COMPRESS_THREAD_BYTES: int = 256 * 1024
+    COMPRESS_GZIP_LEVEL: int = 5
+    COMPRESS_BROTLI_QUALITY: int = 5
+
+    # Профилирование по запросу администратора (/admin/profiling): предел длительности сбора,
+    # монитор задержки event loop — запускать ли при старте и порог, после которого снимается стек
+    PROFILE_MAX_SECONDS: int = 60
+    LOOP_LAG_MONITOR: bool = False
+    LOOP_LAG_THRESHOLD_MS: int = 100
+
+    # Месячные секции reports / form_responses / chat_messages / telemetry_positions (app/services/partitions.py):
+    # сколько месяцев создавать наперёд; секции старше PARTITION_ARCHIVE_AFTER_MONTHS (0 — не архивировать)
+    # уходят в схему archive, при заданном каталоге — с выгрузкой в Parquet (нужен pyarrow)
+    PARTITION_AHEAD_MONTHS: int = 3
+    PARTITION_ARCHIVE_AFTER_MONTHS: int = 0
+    PARTITION_ARCHIVE_TABLES: List[str] = ["reports", "form_responses", "chat_messages"]
+    PARTITION_ARCHIVE_PARQUET_DIR: str = ""
+    PARTITION_ARCHIVE_DROP_AFTER_DUMP: bool = False
+
     # Google Sheets (optional, keep bot integration)
     GOOGLE_SERVICE_ACCOUNT_FILE: str = "service_account.json"
     DRIVE_FOLDER_ID: str = ""
     BRIGADIER_FOLDER_ID: str = ""
 
+    # Синхронизация отчётов в Google Sheets (ARQ, app/services/sheets_sync.py). Пустой id — вид не синхронизируется.
+    # SHEETS_API_BASE_URL можно направить на локальный фейк (bench/fake_sheets.py).
+    SHEETS_OTD_SPREADSHEET_ID: str = ""
+    SHEETS_OTD_SHEET: str = "ОТД"
+    SHEETS_BRIG_SPREADSHEET_ID: str = ""
+    SHEETS_BRIG_SHEET: str = "Бригадиры"
+    SHEETS_API_BASE_URL: str = "https://sheets.googleapis.com"
+    SHEETS_WRITES_PER_MINUTE: int = 60
+    SHEETS_SYNC_BATCH: int = 500
+    SHEETS_SYNC_INTERVAL_MINUTES: int = 5
+
+    # Телеметрия Traccar: токен пересылки (пусто — приём выключен), локальный день для сводок,
+    # максимальный разрыв между точками, который ещё считается непрерывной работой
+    TELEMETRY_INGEST_TOKEN: str = ""
+    TELEMETRY_MAX_BATCH: int = 20000
+    TELEMETRY_TIMEZONE: str = "UTC"
+    TELEMETRY_MAX_GAP_SECONDS: int = 300
+    TELEMETRY_ROLLUP_INTERVAL_MINUTES: int = 10
+    # Геозоны полей: шаг сетки индекса (микроградусы, 500 ≈ 55 м по широте) и минимальное время в поле
+    GEOFENCE_CELL_E6: int = 500
+    GEOFENCE_MIN_DWELL_SECONDS: int = 300
+
     # Expo Push
     EXPO_PUSH_URL: str = "https://exp.host/--/api/v2/push/send"
 
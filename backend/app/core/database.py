@@ -1,7 +1,15 @@
+import asyncio
+import logging
+import time
+
+from fastapi import Depends
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 engine = create_async_engine(
     settings.DATABASE_URL,
@@ -17,6 +25,25 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Реплика (DB_REPLICA_HOST) — только для чтения, см. get_replica_db
+replica_engine = (
+    create_async_engine(
+        settings.DATABASE_REPLICA_URL,
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=10,
+    )
+    if settings.DATABASE_REPLICA_URL
+    else None
+)
+
+ReplicaSessionLocal = (
+    async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine is not None
+    else None
+)
+
 
 class Base(DeclarativeBase):
     pass
@@ -26,9 +53,83 @@ async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
+            # Сессию пометил get_read_db — коммитить нечего
+            if session.info.get("read_only"):
+                await session.rollback()
+            else:
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+
+
+async def get_read_db(db: AsyncSession = Depends(get_db)) -> AsyncSession:
+    """Сессия основной БД только для чтения: без COMMIT в конце, запись отклонит сам Postgres.
+
+    Это та же сессия, что у get_current_user (зависимость get_db кэшируется на запрос),
+    поэтому второго соединения не появляется. Перевод транзакции в READ ONLY разрешён
+    и после первых запросов — запрещён только обратный.
+    """
+    db.info["read_only"] = True
+    await db.execute(text("SET TRANSACTION READ ONLY"))
+    return db
+
+
+# Состояние проверки отставания реплики: (момент проверки, можно ли читать, отставание в секундах)
+replica_state: dict = {"checked_at": 0.0, "usable": False, "lag_seconds": None}
+_replica_check_lock = asyncio.Lock()
+
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+    " END"
+)
+
+
+async def replica_usable() -> bool:
+    """Реплика настроена, отвечает и отстаёт не больше DB_REPLICA_MAX_LAG_SECONDS."""
+    if replica_engine is None:
+        return False
+    if time.monotonic() - replica_state["checked_at"] < settings.DB_REPLICA_LAG_CHECK_SECONDS:
+        return replica_state["usable"]
+    async with _replica_check_lock:
+        if time.monotonic() - replica_state["checked_at"] >= settings.DB_REPLICA_LAG_CHECK_SECONDS:
+            try:
+                async with replica_engine.connect() as conn:
+                    lag = (await conn.execute(_REPLICA_LAG_SQL)).scalar()
+                lag = float(lag) if lag is not None else None
+                usable = lag is not None and lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+            except Exception:
+                logger.warning("replica lag check failed, reading from primary", exc_info=True)
+                lag, usable = None, False
+            if usable != replica_state["usable"]:
+                logger.info("replica %s (lag %s s)", "in use" if usable else "bypassed", lag)
+            replica_state.update(checked_at=time.monotonic(), usable=usable, lag_seconds=lag)
+    return replica_state["usable"]
+
+
+async def get_replica_db(db: AsyncSession = Depends(get_db)) -> AsyncSession:
+    """Сессия для тяжёлого чтения: реплика, если она в норме, иначе get_read_db основной БД.
+
+    Данные на реплике могут отставать на DB_REPLICA_MAX_LAG_SECONDS — не для экранов,
+    где пользователь ждёт только что отправленное. Объявлять после зависимостей
+    авторизации: при чтении с реплики их транзакция на основной БД здесь завершается.
+    """
+    if not await replica_usable():
+        yield await get_read_db(db)
+        return
+    # Транзакция авторизации (get_current_user) больше не нужна: close() откатывает её и
+    # возвращает соединение основной БД в пул, а не держит его idle in transaction на всю
+    # выгрузку. В отличие от rollback() не помечает загруженного пользователя устаревшим —
+    # обращение к его полям не пойдёт в БД
+    db.info["read_only"] = True
+    await db.close()
+    async with ReplicaSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.rollback()
@@ -0,0 +1,86 @@
+"""Быстрый путь для больших JSON-списков.
+
+Обычно эндпоинт собирает Pydantic-модель на каждую строку (валидация в __init__),
+FastAPI ещё раз проверяет результат по response_model и только потом сериализует.
+Для строк ORM с типизированными столбцами обе проверки ничего не находят, а на
+ленте ОТД в 2000 записей занимают больше, чем сам запрос в БД.
+
+    rows = (await db.execute(q)).scalars().all()
+    return fast_json(orm_dicts(rows, ReportOut))
+
+orm_dicts берёт из строк ровно поля модели (недостающие — значения по умолчанию
+модели), fast_json кодирует их pydantic_core.to_json (Rust, те же форматы дат, что у
+FastAPI) и возвращает готовый Response — response_model в декораторе остаётся для
+OpenAPI. С FAST_JSON_RESPONSES=false fast_json отдаёт данные как есть, и FastAPI
+валидирует их по response_model — так проверяется, что быстрый путь не разошёлся со схемой.
+
+Только для доверенных данных: содержимое JSONB и прочий свободный ввод собирать
+через модели, как раньше. Если такой столбец — одно поле в остальном типизированной
+строки (options справочников), его можно провести через тип поля модели:
+orm_dicts(rows, ActivityOut, validate=("options",)).
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Iterable
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import PydanticUndefined, to_json
+
+from app.core.config import settings
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+@lru_cache(maxsize=None)
+def _fields(model: type[BaseModel]) -> tuple[tuple[str, Any], ...]:
+    out = []
+    for name, field in model.model_fields.items():
+        default = None if field.default is PydanticUndefined else field.default
+        out.append((name, default))
+    return tuple(out)
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: type[BaseModel], name: str) -> TypeAdapter:
+    return TypeAdapter(model.model_fields[name].annotation)
+
+
+_MISSING = object()
+
+
+def orm_dicts(
+    rows: Iterable[Any], model: type[BaseModel], *, validate: tuple[str, ...] = (), **values: Any
+) -> list[dict]:
+    """Поля model из атрибутов строк ORM без валидации; values — одинаковые для всех строк поля.
+
+    validate — поля со свободным JSON: проверяются и приводятся по типу поля model.
+    """
+    fields = [(name, default) for name, default in _fields(model) if name not in values]
+    adapters = [(name, _adapter(model, name)) for name in validate]
+    out = []
+    for row in rows:
+        # Загруженные столбцы лежат в __dict__ экземпляра: так в разы быстрее, чем через
+        # дескрипторы ORM. Чего там нет (не атрибут ORM, свойство) — обычным getattr.
+        loaded = row.__dict__
+        item = dict(values)
+        for name, default in fields:
+            value = loaded.get(name, _MISSING)
+            item[name] = getattr(row, name, default) if value is _MISSING else value
+        for name, adapter in adapters:
+            item[name] = adapter.validate_python(item[name])
+        out.append(item)
+    return out
+
+
+def fast_json(content: Any, status_code: int = 200, headers: dict[str, str] | None = None) -> Any:
+    if not settings.FAST_JSON_RESPONSES:
+        return content
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,141 @@
+"""Метрики Prometheus: задержки маршрутов, пул БД, Redis, WebSocket, push, выгрузки и лимиты частоты.
+
+Счётчики и гистограммы обновляются по месту (middleware, push, экспорт). Состояние,
+которое и так лежит в памяти процесса (пул SQLAlchemy, chat_hub.connections, пул bcrypt),
+читается в момент опроса коллектором — на горячем пути ничего не добавляется.
+"""
+
+from __future__ import annotations
+
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса по шаблону маршрута",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REDIS_PING = Gauge("redis_ping_seconds", "Задержка PING к Redis, измеренная при опросе /metrics")
+REDIS_UP = Gauge("redis_up", "1 — Redis ответил на PING при опросе")
+PUSH_MESSAGES = Counter("push_messages_total", "Push-уведомления Expo по исходу", ["outcome"])
+EXPORT_DURATION = Histogram(
+    "export_duration_seconds",
+    "Время сборки Excel-выгрузки",
+    ["kind"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+RATE_LIMIT_CHECKS = Counter("rate_limit_checks_total", "Проверки лимитов частоты по исходу", ["limit", "outcome"])
+RATE_LIMIT_CHECK_SECONDS = Histogram(
+    "rate_limit_check_seconds",
+    "Время проверки лимита (один вызов скрипта в Redis)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+def route_template(scope) -> str:
+    # Новые FastAPI подключают роутеры лениво: в scope["route"] лежит путь без префикса
+    # (/forms/{form_id}), полный шаблон — в контексте маршрута FastAPI
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    # Без маршрута — один общий ярлык, чтобы сканеры случайных URL не раздували число рядов
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: гистограмма задержек по шаблону пути (/api/v1/chat/rooms/{room_id}), не по URL."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            if route != "/metrics":
+                REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+
+
+class _RuntimeCollector:
+    def collect(self):
+        from app.core.database import engine, replica_engine, replica_state
+        from app.core.security import hash_stats
+        from app.realtime.chat_hub import connections, hub_stats
+
+        pool = engine.pool
+        db_pool = GaugeMetricFamily("db_pool_connections", "Соединения пула SQLAlchemy", labels=["state"])
+        db_pool.add_metric(["size"], pool.size())
+        db_pool.add_metric(["checked_out"], pool.checkedout())
+        db_pool.add_metric(["checked_in"], pool.checkedin())
+        db_pool.add_metric(["overflow"], max(pool.overflow(), 0))
+        yield db_pool
+
+        if replica_engine is not None:
+            yield GaugeMetricFamily("db_replica_usable", "1 — тяжёлое чтение идёт на реплику", value=int(replica_state["usable"]))
+            if replica_state["lag_seconds"] is not None:
+                yield GaugeMetricFamily("db_replica_lag_seconds", "Отставание реплики при последней проверке",
+                                        value=replica_state["lag_seconds"])
+
+        ws_rooms = GaugeMetricFamily("chat_ws_connections", "Подписанные WebSocket по комнатам", labels=["room"])
+        for room_id, users in list(connections.items()):
+            ws_rooms.add_metric([str(room_id)], sum(len(sockets) for sockets in users.values()))
+        yield ws_rooms
+
+        hub = hub_stats()
+        yield GaugeMetricFamily("chat_ws_sockets", "Открытые WebSocket", value=hub["sockets"])
+        yield GaugeMetricFamily("chat_ws_queue_depth", "Кадров в исходящих очередях сокетов", value=hub["queue_depth_total"])
+        yield GaugeMetricFamily("chat_ws_queue_depth_max", "Самая длинная исходящая очередь", value=hub["queue_depth_max"])
+        frames = CounterMetricFamily("chat_ws_frames", "Кадры исходящих очередей WebSocket", labels=["event"])
+        for key in ("enqueued", "sent", "dropped"):
+            frames.add_metric([key], hub.get(key, 0))
+        yield frames
+
+        yield GaugeMetricFamily("password_hash_in_flight", "Хэшей bcrypt в пуле потоков", value=hash_stats["in_flight"])
+        yield GaugeMetricFamily("password_hash_waiting", "Хэшей bcrypt в очереди на пул", value=hash_stats["waiting"])
+        hashes = CounterMetricFamily("password_hash", "Хэши bcrypt по исходу", labels=["outcome"])
+        hashes.add_metric(["completed"], hash_stats["completed"])
+        hashes.add_metric(["rejected"], hash_stats["rejected"])
+        yield hashes
+
+
+_runtime_registered = False
+
+
+def register_runtime_collector() -> None:
+    global _runtime_registered
+    if not _runtime_registered:
+        REGISTRY.register(_RuntimeCollector())
+        _runtime_registered = True
+
+
+async def observe_redis() -> None:
+    from app.core.redis import get_redis
+
+    started = time.perf_counter()
+    try:
+        await (await get_redis()).ping()
+    except Exception:
+        REDIS_UP.set(0)
+        return
+    REDIS_PING.set(time.perf_counter() - started)
+    REDIS_UP.set(1)
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
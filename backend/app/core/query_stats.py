@@ -0,0 +1,172 @@
+"""Учёт SQL-запросов на HTTP-запрос и лог медленных запросов.
+
+Хуки SQLAlchemy before/after_cursor_execute считают запросы и время в БД в объект
+QueryStats текущего контекста (ContextVar задаёт middleware). Итог уходит клиенту
+в Server-Timing: db;dur=12.3;desc="7 queries" и в лог, если превышены
+SQL_REQUEST_WARN_QUERIES / SQL_REQUEST_WARN_MS — так N+1 виден сразу, а не по жалобам.
+
+Server-Timing уходит вместе с http.response.start, а get_db закрывает сессию (autoflush
+невыгруженных изменений и COMMIT) уже после отправки ответа. Поэтому в заголовке нет этих
+последних запросов: у эндпоинта записи без явного await db.commit()/flush() в обработчике
+счётчик занижен. Лог о превышении порогов пишется после завершения запроса и учитывает всё.
+
+Запрос дольше SQL_SLOW_QUERY_MS пишется в лог app.sql.slow с текстом и местом вызова
+в коде app/ (стек ищется только для медленных запросов).
+
+Для проверок в CI:
+    response = client.get("/api/v1/chat/rooms", headers=auth)
+    assert_max_queries(response, 5)   # для записи — только если обработчик сам делает commit/flush
+
+    with count_queries() as stats:      # прямой вызов сервиса без HTTP
+        await list_something(db)
+    assert stats.count <= 3
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger("app.sql")
+slow_logger = logging.getLogger("app.sql.slow")
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_SKIP_FILES = (os.path.abspath(__file__), os.path.join(_APP_DIR, "core", "database.py"))
+_SERVER_TIMING_DB = re.compile(r'(?:^|,)\s*db;[^,]*desc="(\d+) quer')
+
+
+@dataclass(slots=True)
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current() -> QueryStats | None:
+    return _current.get()
+
+
+def _call_site() -> str:
+    """Первый кадр из app/ — откуда пришёл запрос.
+
+    Хук выполняется в greenlet SQLAlchemy; корутины приложения лежат на стеке
+    родительского greenlet, поэтому смотрим сначала туда.
+    """
+    frame = None
+    try:
+        import greenlet
+
+        parent = greenlet.getcurrent().parent
+        frame = parent.gr_frame if parent is not None else None
+    except ImportError:
+        pass
+    if frame is None:
+        frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename not in _SKIP_FILES:
+            return f"{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        slow_logger.warning(
+            "slow query %.1f ms at %s: %s",
+            elapsed * 1000, _call_site(), " ".join(statement.split())[:2000],
+        )
+
+
+_installed: set[int] = set()
+
+
+def install(engine) -> None:
+    """Подключить хуки к движку (AsyncEngine или Engine); повторный вызов ничего не делает."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if id(sync_engine) in _installed:
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _installed.add(id(sync_engine))
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: QueryStats на каждый HTTP-запрос, Server-Timing и предупреждение сверх порогов.
+
+    Server-Timing — то, что выполнено до начала ответа; предупреждение — после всего запроса.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and stats.count:
+                timing = f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'.encode()
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if stats.count > settings.SQL_REQUEST_WARN_QUERIES or stats.seconds * 1000 > settings.SQL_REQUEST_WARN_MS:
+                logger.warning(
+                    "%s %s: %d queries, %.1f ms in DB",
+                    scope["method"], route_template(scope), stats.count, stats.seconds * 1000,
+                )
+
+
+@contextmanager
+def count_queries():
+    """Считать запросы внутри блока (вне HTTP: сервисы, воркеры, тесты)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def query_count(response) -> int:
+    """Число SQL-запросов из Server-Timing ответа (httpx / TestClient); 0, если запросов не было."""
+    match = _SERVER_TIMING_DB.search(response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+def assert_max_queries(response, limit: int) -> None:
+    """Проверка по Server-Timing: запросы из завершения get_db (COMMIT после ответа) не видны."""
+    count = query_count(response)
+    assert count <= limit, (
+        f"{response.request.method} {response.request.url.path}: {count} SQL queries, expected at most {limit}"
+    )
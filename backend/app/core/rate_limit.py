@@ -0,0 +1,174 @@
+"""Ограничение частоты запросов в Redis (GCRA), общее для всех процессов API.
+
+Лимит задаётся строкой «N/период» (10/minute, 300/hour) в настройке RATE_LIMIT_<ИМЯ>:
+LOGIN, REPORT_SUBMIT, EXPORT. Ключ — id пользователя из access-токена (без похода
+в БД), без токена — IP клиента: телефоны одной фермы за NAT не делят общий лимит,
+пока авторизованы. Вход ограничивается по паре (IP, логин).
+
+GCRA хранит на ключ одно число — теоретическое время следующего запроса (TAT), —
+и проверка с обновлением делается одним Lua-скриптом (EVALSHA, один круг до Redis).
+Время берётся из Redis (TIME), поэтому часы процессов API не обязаны совпадать.
+Пустой всплеск до N запросов пропускается сразу, дальше — не чаще одного за период/N.
+
+Если Redis недоступен, запрос пропускается (fail open): лимит — защита от перебора
+и перегрузки, а не повод отказывать всем при сбое Redis.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import HTTPException, Request, Response
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_CHECK_SECONDS, RATE_LIMIT_CHECKS
+from app.core.redis import get_redis
+from app.core.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit"
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# KEYS[1] — ключ; ARGV[1] — интервал между запросами (мс), ARGV[2] — окно = N * интервал (мс).
+# Возвращает {пропущен (0/1), осталось, повторить через (мс), полное восстановление через (мс)}.
+_GCRA_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if allow_at > now then
+  return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((now - allow_at) / interval), 0, new_tat - now}
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class Rate:
+    count: int
+    period: int  # секунды
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        count, _, unit = value.strip().partition("/")
+        unit = unit.strip().lower().rstrip("s")
+        if unit not in _PERIODS or not count.strip().isdigit() or int(count) < 1:
+            raise ValueError(f"bad rate {value!r}, expected e.g. '10/minute'")
+        return cls(int(count), _PERIODS[unit])
+
+
+@dataclass(slots=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # секунды до следующего разрешённого запроса (0 — можно сейчас)
+    reset_after: float  # секунды до полного восстановления бюджета
+
+
+@lru_cache(maxsize=None)
+def get_rate(name: str) -> Rate:
+    return Rate.parse(getattr(settings, f"RATE_LIMIT_{name.upper()}"))
+
+
+_scripts: dict[int, object] = {}
+
+
+async def _script():
+    redis = await get_redis()
+    script = _scripts.get(id(redis))
+    if script is None:
+        # После close_redis() клиент пересоздаётся — скрипт привязан к клиенту
+        _scripts.clear()
+        script = _scripts[id(redis)] = redis.register_script(_GCRA_LUA)
+    return script
+
+
+async def hit(name: str, key: str) -> RateLimitResult | None:
+    """Учесть запрос по бюджету name для key. None — Redis недоступен, запрос не ограничивается."""
+    rate = get_rate(name)
+    interval_ms = rate.period * 1000 / rate.count
+    started = time.perf_counter()
+    try:
+        script = await _script()
+        allowed, remaining, retry_ms, reset_ms = await script(
+            keys=[f"{KEY_PREFIX}:{name}:{key}"],
+            args=[interval_ms, interval_ms * rate.count],
+        )
+    except Exception:
+        RATE_LIMIT_CHECKS.labels(name, "error").inc()
+        logger.warning("rate limit check failed for %s, request allowed", name, exc_info=True)
+        return None
+    finally:
+        RATE_LIMIT_CHECK_SECONDS.observe(time.perf_counter() - started)
+    RATE_LIMIT_CHECKS.labels(name, "allowed" if allowed else "limited").inc()
+    return RateLimitResult(
+        allowed=bool(allowed),
+        limit=rate.count,
+        remaining=int(remaining),
+        retry_after=int(retry_ms) / 1000,
+        reset_after=int(reset_ms) / 1000,
+    )
+
+
+def client_ip(request: Request) -> str:
+    # X-Forwarded-For от доверенного прокси uvicorn уже подставил в client (--forwarded-allow-ips)
+    return request.client.host if request.client else "unknown"
+
+
+def client_key(request: Request) -> str:
+    """u:<id> по действующему access-токену, иначе ip:<адрес>."""
+    auth = request.headers.get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        payload = decode_access_token(token)
+        if payload and payload.get("sub"):
+            return f"u:{payload['sub']}"
+    return f"ip:{client_ip(request)}"
+
+
+def _headers(result: RateLimitResult) -> dict[str, str]:
+    return {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(max(1, round(result.reset_after))),
+    }
+
+
+async def enforce(name: str, request: Request, response: Response | None = None, key: str | None = None) -> None:
+    """Проверить бюджет name; сверх лимита — 429 с Retry-After."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    result = await hit(name, key or client_key(request))
+    if result is None:
+        return
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={**_headers(result), "Retry-After": str(max(1, math.ceil(result.retry_after)))},
+        )
+    if response is not None:
+        response.headers.update(_headers(result))
+
+
+def rate_limit(name: str):
+    """Зависимость FastAPI: dependencies=[Depends(rate_limit("export"))]."""
+    get_rate(name)  # опечатка в имени или формате лимита — ошибка при импорте, а не на запросе
+
+    async def dependency(request: Request, response: Response) -> None:
+        await enforce(name, request, response)
+
+    return dependency
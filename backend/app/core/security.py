@@ -1,3 +1,6 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import uuid
@@ -7,13 +10,88 @@ from app.core.config import settings
 
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True, если хэш посчитан с другой стоимостью, чем BCRYPT_ROUNDS ($2b$<rounds>$...)."""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+# ── bcrypt вне event loop ──
+# Один хэш — 100–300 мс CPU; bcrypt отпускает GIL, поэтому хватает пула потоков.
+# Семафор ограничивает одновременные вычисления размером пула, остальные ждут в очереди;
+# если очередь длиннее PASSWORD_HASH_MAX_WAITING, запрос сразу отклоняется (503).
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+
+# Счётчики для мониторинга (см. password_hash_stats)
+hash_stats: dict[str, float] = {
+    "in_flight": 0,
+    "waiting": 0,
+    "completed": 0,
+    "rejected": 0,
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0,
+    "run_ms_total": 0.0,
+}
+
+
+async def _run_hasher(fn, *args):
+    if hash_stats["waiting"] >= settings.PASSWORD_HASH_MAX_WAITING:
+        hash_stats["rejected"] += 1
+        raise PasswordHasherBusy()
+    queued_at = time.perf_counter()
+    hash_stats["waiting"] += 1
+    try:
+        await _hash_slots.acquire()
+    finally:
+        hash_stats["waiting"] -= 1
+    started = time.perf_counter()
+    wait_ms = (started - queued_at) * 1000
+    hash_stats["wait_ms_total"] += wait_ms
+    hash_stats["wait_ms_max"] = max(hash_stats["wait_ms_max"], wait_ms)
+    hash_stats["in_flight"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        hash_stats["in_flight"] -= 1
+        hash_stats["completed"] += 1
+        hash_stats["run_ms_total"] += (time.perf_counter() - started) * 1000
+        _hash_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hasher(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hasher(verify_password, plain_password, hashed_password)
+
+
+def password_hash_stats() -> dict:
+    completed = hash_stats["completed"] or 1
+    return {
+        **hash_stats,
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "wait_ms_avg": round(hash_stats["wait_ms_total"] / completed, 3),
+        "run_ms_avg": round(hash_stats["run_ms_total"] / completed, 3),
+    }
+
+
 def create_access_token(user_id: int, role: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.JWT_ACCESS_EXPIRE_MINUTES)
     payload = {
@@ -1,20 +1,21 @@
+import secrets
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from app.core import compression, metrics, profiling, query_stats
+from app.core.database import engine, replica_engine
 from app.core.config import settings
 from app.core.redis import get_redis, close_redis
+from app.core.security import PasswordHasherBusy
+from app.realtime import message_buffer, presence
+from app.services import tenant_settings
 from app.api import api_router
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-limiter = Limiter(key_func=get_remote_address)
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -26,8 +27,17 @@ async def lifespan(app: FastAPI):
         from sentry_sdk.integrations.fastapi import FastApiIntegration
         sentry_sdk.init(dsn=settings.SENTRY_DSN, integrations=[FastApiIntegration()])
 
+    presence.start_heartbeat()
+    tenant_settings.start_listener()
+    if settings.LOOP_LAG_MONITOR:
+        profiling.lag_monitor.start(settings.LOOP_LAG_THRESHOLD_MS / 1000, 0.05)
+
     yield
 
+    await message_buffer.flush()
+    await presence.stop_heartbeat()
+    await tenant_settings.stop_listener()
+    await profiling.lag_monitor.stop()
     await close_redis()
     logger.info("TerraApp API shutdown")
 
@@ -40,9 +50,6 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # allow_credentials=True несовместим с allow_origins=["*"] в браузере (JWT в Authorization не требует cookies).
 app.add_middleware(
     CORSMiddleware,
@@ -50,7 +57,19 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(compression.CompressionMiddleware)
+
+if settings.SQL_STATS_ENABLED:
+    query_stats.install(engine)
+    if replica_engine is not None:
+        query_stats.install(replica_engine)
+    app.add_middleware(query_stats.QueryStatsMiddleware)
+
+if settings.METRICS_ENABLED:
+    metrics.register_runtime_collector()
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(api_router, prefix="/api/v1")
 
@@ -60,6 +79,28 @@ async def health():
     return {"status": "ok", "version": settings.APP_VERSION}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: str | None = Header(None)):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN and not secrets.compare_digest(
+        authorization or "", f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    await metrics.observe_redis()
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error("Unhandled error: %s", exc, exc_info=True)
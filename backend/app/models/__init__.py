@@ -5,6 +5,8 @@ from app.models.form import FormTemplate, FormAssignment
 from app.models.chat import ChatRoom, ChatRoomMember, ChatMessage
 from app.models.group import Group, GroupMember
 from app.models.tenant import TenantSettings, InviteLink
+from app.models.sheets_sync import SheetsChange, SheetsSyncState, SheetsSyncRow
+from app.models.telemetry import TelemetryDevice, TelemetryDaily, TelemetryDwell, telemetry_positions
 
 __all__ = [
     "User", "AuthCredential", "UserRole", "PushToken",
@@ -14,4 +16,6 @@ __all__ = [
     "ChatRoom", "ChatRoomMember", "ChatMessage",
     "Group", "GroupMember",
     "TenantSettings", "InviteLink",
+    "SheetsChange", "SheetsSyncState", "SheetsSyncRow",
+    "TelemetryDevice", "TelemetryDaily", "TelemetryDwell", "telemetry_positions",
 ]
@@ -1,16 +1,25 @@
-from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 
 
 class ChatRoom(Base):
     __tablename__ = "chat_rooms"
+    __table_args__ = (
+        Index(
+            "ux_chat_rooms_dm_pair", "dm_user_low", "dm_user_high",
+            unique=True, postgresql_where=text("dm_user_low IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str | None] = mapped_column(String(255))
     type: Mapped[str] = mapped_column(String(20), default="group")  # "dm" or "group"
     created_by: Mapped[int | None] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"))
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Канонический ключ личного чата: (меньший id, больший id) участников; у групп NULL
+    dm_user_low: Mapped[int | None] = mapped_column(BigInteger)
+    dm_user_high: Mapped[int | None] = mapped_column(BigInteger)
 
     members: Mapped[list["ChatRoomMember"]] = relationship(back_populates="room", cascade="all, delete-orphan")
     messages: Mapped[list["ChatMessage"]] = relationship(back_populates="room", cascade="all, delete-orphan")
@@ -29,6 +38,7 @@ class ChatRoomMember(Base):
 
 
 class ChatMessage(Base):
+    # Секции по месяцам created_at (миграция 010), первичный ключ в БД — (id, created_at)
     __tablename__ = "chat_messages"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
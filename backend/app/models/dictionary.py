@@ -26,6 +26,8 @@ class Location(Base):
     mode: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
     options: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
     message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Контур поля, GeoJSON Polygon/MultiPolygon; не грузится вместе со справочником
+    geometry: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True, deferred=True)
 
 
 class MachineKind(Base):
@@ -5,6 +5,7 @@ from app.core.database import Base
 
 
 class Report(Base):
+    # Секции по месяцам work_date (миграция 010), первичный ключ в БД — (id, work_date)
     __tablename__ = "reports"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -16,7 +17,7 @@ class Report(Base):
     location_grp: Mapped[str | None] = mapped_column(String(50))
     activity: Mapped[str | None] = mapped_column(String(255))
     activity_grp: Mapped[str | None] = mapped_column(String(50))
-    work_date: Mapped[Date | None] = mapped_column(Date)
+    work_date: Mapped[Date] = mapped_column(Date, nullable=False)
     hours: Mapped[float | None] = mapped_column(Float)
     machine_type: Mapped[str | None] = mapped_column(String(50))
     machine_name: Mapped[str | None] = mapped_column(String(255))
@@ -41,6 +42,7 @@ class BrigadierReport(Base):
 
 
 class FormResponse(Base):
+    # Секции по месяцам submitted_at (миграция 010), первичный ключ в БД — (id, submitted_at)
     __tablename__ = "form_responses"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -0,0 +1,35 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+
+class SheetsChange(Base):
+    """Журнал изменений отчётов для синхронизации с Google Sheets (пишется триггером)."""
+
+    __tablename__ = "sheets_changes"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)   # "otd" | "brig"
+    record_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class SheetsSyncState(Base):
+    """Следующая свободная строка таблицы и время последней синхронизации."""
+
+    __tablename__ = "sheets_sync_state"
+
+    kind: Mapped[str] = mapped_column(String(20), primary_key=True)
+    next_row: Mapped[int] = mapped_column(Integer, nullable=False, server_default="2")
+    synced_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class SheetsSyncRow(Base):
+    """В какой строке листа лежит отчёт."""
+
+    __tablename__ = "sheets_sync_rows"
+
+    kind: Mapped[str] = mapped_column(String(20), primary_key=True)
+    record_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sheet_row: Mapped[int] = mapped_column(Integer, nullable=False)
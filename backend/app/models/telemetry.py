@@ -0,0 +1,63 @@
+from datetime import date, datetime
+from sqlalchemy import BigInteger, Column, Date, DateTime, ForeignKey, Integer, SmallInteger, String, Table, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+
+class TelemetryDevice(Base):
+    """Трекер Traccar и машина (MachineItem.name / Report.machine_name), на которой он стоит."""
+
+    __tablename__ = "telemetry_devices"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    unique_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)   # IMEI
+    name: Mapped[str | None] = mapped_column(String(255))
+    machine_name: Mapped[str | None] = mapped_column(String(255), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+# Точки пишутся COPY и читаются агрегатами — без ORM-класса и первичного ключа.
+# Таблица секционирована по fix_time (месяц), см. миграцию 007 и services/telemetry.py.
+telemetry_positions = Table(
+    "telemetry_positions",
+    Base.metadata,
+    Column("device_id", Integer, nullable=False),
+    Column("fix_time", DateTime(timezone=True), nullable=False),
+    Column("lat_e6", Integer, nullable=False),
+    Column("lon_e6", Integer, nullable=False),
+    Column("speed", SmallInteger, nullable=False, server_default="0"),    # 0.1 км/ч
+    Column("course", SmallInteger, nullable=False, server_default="0"),
+    Column("flags", SmallInteger, nullable=False, server_default="0"),    # 1 — зажигание, 2 — движение
+)
+
+
+class TelemetryDaily(Base):
+    """Моточасы и часы движения машины за день (локальный день TELEMETRY_TIMEZONE)."""
+
+    __tablename__ = "telemetry_daily"
+
+    device_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("telemetry_devices.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
+    engine_seconds: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    motion_seconds: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    positions: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    first_fix: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_fix: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class TelemetryDwell(Base):
+    """Отрезок пребывания машины в поле (Location с контуром) за день."""
+
+    __tablename__ = "telemetry_dwell"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    device_id: Mapped[int] = mapped_column(Integer, ForeignKey("telemetry_devices.id", ondelete="CASCADE"), nullable=False)
+    location_id: Mapped[int] = mapped_column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    start_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    engine_seconds: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    motion_seconds: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
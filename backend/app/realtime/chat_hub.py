@@ -1,38 +1,285 @@
 """Общий WebSocket-хаб для чатов: импортируется и из API, и из сервисов ленты отчётов."""
 
+import asyncio
 import json
+import logging
+from collections import deque
 from typing import TYPE_CHECKING
 
 from fastapi import WebSocket
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.redis import get_redis
 from app.models.chat import ChatRoomMember, ChatMessage
 from app.models.user import PushToken
+from app.realtime import presence
 from app.services.push import send_push_notifications
 
 if TYPE_CHECKING:
     pass
 
-# room_id -> { user_id -> WebSocket }
-connections: dict[int, dict[int, WebSocket]] = {}
+logger = logging.getLogger(__name__)
 
+# room_id -> { user_id -> сокеты пользователя в комнате (несколько устройств/вкладок) }
+connections: dict[int, dict[int, set[WebSocket]]] = {}
 
-async def broadcast_chat_message(room_id: int, msg: ChatMessage, sender_name: str | None) -> None:
-    broadcast = {
+# user_id -> сокеты пользователя (один мультиплексный сокет может быть подписан на много комнат)
+user_sockets: dict[int, set[WebSocket]] = {}
+
+# WebSocket -> room_id, на которые он подписан
+socket_rooms: dict[WebSocket, set[int]] = {}
+
+# Счётчики для мониторинга рассылки (см. hub_stats)
+stats: dict[str, int] = {
+    "enqueued": 0,
+    "sent": 0,
+    "dropped": 0,   # сообщения, не влезшие в очередь медленного клиента
+    "evicted": 0,   # сокеты, отключённые из-за переполнения очереди, таймаута или ошибки отправки
+}
+
+
+class _SocketWriter:
+    """Очередь исходящих кадров одного сокета и задача, которая её отправляет.
+
+    Рассылка только кладёт готовый текст в очередь и не ждёт клиента. Если очередь
+    переполнена или отправка висит дольше WS_SEND_TIMEOUT_SECONDS, сокет отключается,
+    чтобы медленный клиент не копил память и не задерживал остальных.
+    """
+
+    def __init__(self, user_id: int, ws: WebSocket):
+        self.user_id = user_id
+        self.ws = ws
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self.task = asyncio.create_task(self._run())
+        self.closed = False
+
+    def put(self, text: str) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            stats["dropped"] += 1
+            logger.warning("ws send queue full, evicting user_id=%s", self.user_id)
+            self.evict()
+            return False
+        stats["enqueued"] += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            text = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.ws.send_text(text), timeout=settings.WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.info("ws send failed, evicting user_id=%s", self.user_id, exc_info=True)
+                self.evict()
+                return
+            stats["sent"] += 1
+
+    def evict(self) -> None:
+        if self.closed:
+            return
+        stats["evicted"] += 1
+        unregister_socket(self.user_id, self.ws)
+        asyncio.create_task(self._close())
+
+    async def _close(self) -> None:
+        try:
+            # 1013 Try Again Later: клиент переподключится и догрузит историю через REST
+            await self.ws.close(code=1013)
+        except Exception:
+            pass
+
+    def stop(self) -> None:
+        self.closed = True
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+
+
+# WebSocket -> его писатель
+_writers: dict[WebSocket, _SocketWriter] = {}
+
+
+def register_socket(user_id: int, ws: WebSocket) -> None:
+    user_sockets.setdefault(user_id, set()).add(ws)
+    socket_rooms.setdefault(ws, set())
+    if ws not in _writers:
+        _writers[ws] = _SocketWriter(user_id, ws)
+
+
+def subscribe(user_id: int, ws: WebSocket, room_ids) -> None:
+    rooms = socket_rooms.setdefault(ws, set())
+    for room_id in room_ids:
+        connections.setdefault(room_id, {}).setdefault(user_id, set()).add(ws)
+        rooms.add(room_id)
+
+
+def unsubscribe(user_id: int, ws: WebSocket, room_ids) -> None:
+    rooms = socket_rooms.get(ws, set())
+    for room_id in room_ids:
+        rooms.discard(room_id)
+        room_conns = connections.get(room_id)
+        if room_conns is None:
+            continue
+        # Другие сокеты того же пользователя в комнате остаются подписанными
+        user_conns = room_conns.get(user_id)
+        if user_conns is not None:
+            user_conns.discard(ws)
+            if not user_conns:
+                room_conns.pop(user_id, None)
+        if not room_conns:
+            connections.pop(room_id, None)
+
+
+def unregister_socket(user_id: int, ws: WebSocket) -> None:
+    unsubscribe(user_id, ws, list(socket_rooms.get(ws, ())))
+    socket_rooms.pop(ws, None)
+    socks = user_sockets.get(user_id)
+    if socks is not None:
+        socks.discard(ws)
+        if not socks:
+            user_sockets.pop(user_id, None)
+    writer = _writers.pop(ws, None)
+    if writer is not None:
+        writer.stop()
+
+
+def send_json(ws: WebSocket, payload: dict) -> bool:
+    """Поставить кадр в очередь сокета (в том же порядке, что и рассылки)."""
+    writer = _writers.get(ws)
+    if writer is None:
+        return False
+    return writer.put(json.dumps(payload))
+
+
+def send_text(ws: WebSocket, text: str) -> bool:
+    writer = _writers.get(ws)
+    if writer is None:
+        return False
+    return writer.put(text)
+
+
+# ── Буфер последних рассылок для догрузки после переподключения ──
+# seq сообщения = его id (растёт монотонно). Общий для воркеров буфер — Redis stream
+# chat:replay:{room_id}, обрезаемый до CHAT_REPLAY_BUFFER_SIZE; локальная deque на комнату
+# видит только рассылки этого процесса и читается, лишь когда Redis недоступен.
+
+_replay: dict[int, deque[tuple[int, str]]] = {}
+
+
+def _replay_key(room_id: int) -> str:
+    return f"chat:replay:{room_id}"
+
+
+async def _remember(entries: list[tuple[int, int, str]]) -> None:
+    """Записать рассылки [(room_id, seq, text)] в буфер: один pipeline на пакет."""
+    for room_id, seq, text in entries:
+        buf = _replay.get(room_id)
+        if buf is None:
+            buf = _replay[room_id] = deque(maxlen=settings.CHAT_REPLAY_BUFFER_SIZE)
+        buf.append((seq, text))
+    try:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for room_id, seq, text in entries:
+                pipe.xadd(
+                    _replay_key(room_id),
+                    {"seq": seq, "payload": text},
+                    maxlen=settings.CHAT_REPLAY_BUFFER_SIZE,
+                    approximate=True,
+                )
+            for room_id in {room_id for room_id, _, _ in entries}:
+                pipe.expire(_replay_key(room_id), settings.CHAT_REPLAY_TTL_SECONDS)
+            await pipe.execute()
+    except Exception:
+        logger.warning("replay buffer xadd failed size=%d", len(entries), exc_info=True)
+
+
+async def replay_since(room_id: int, last_seq: int) -> list[str] | None:
+    """Рассылки комнаты после last_seq в исходном порядке.
+
+    None — буфер не покрывает разрыв (сообщение last_seq уже вытеснено или буфер пуст),
+    клиент должен догрузить историю через GET /chat/rooms/{id}/messages?after=last_seq.
+    """
+    try:
+        redis = await get_redis()
+        entries = await redis.xrange(_replay_key(room_id), "-", "+")
+    except Exception:
+        logger.warning("replay buffer xrange failed room_id=%s, using local buffer", room_id, exc_info=True)
+        # Без Redis известны только рассылки этого процесса: при нескольких воркерах
+        # это может быть не всё, но лучше, чем ничего; пустой буфер — разрыв
+        local = _replay.get(room_id)
+        if not local or local[0][0] > last_seq:
+            return None
+        return [text for seq, text in local if seq > last_seq]
+    if not entries or int(entries[0][1]["seq"]) > last_seq:
+        return None
+    return [fields["payload"] for _id, fields in entries if int(fields["seq"]) > last_seq]
+
+
+async def replay_to_socket(ws: WebSocket, room_id: int, last_seq: int) -> None:
+    texts = await replay_since(room_id, last_seq)
+    if texts is None:
+        send_json(ws, {"type": "replay_gap", "room_id": room_id, "after": last_seq})
+        return
+    for text in texts:
+        send_text(ws, text)
+    send_json(ws, {"type": "replay_done", "room_id": room_id, "count": len(texts)})
+
+
+def _message_text(room_id: int, msg: ChatMessage, sender_name: str | None) -> str:
+    return json.dumps({
         "type": "message",
         "id": msg.id,
+        "seq": msg.id,
         "room_id": room_id,
         "sender_id": msg.sender_id,
         "sender_name": sender_name,
         "content": msg.content,
         "created_at": msg.created_at.isoformat(),
+    })
+
+
+def _fan_out(room_id: int, text: str) -> None:
+    for user_conns in list(connections.get(room_id, {}).values()):
+        for ws in list(user_conns):
+            writer = _writers.get(ws)
+            if writer is not None:
+                writer.put(text)
+
+
+async def broadcast_chat_messages(messages: list[tuple[int, ChatMessage, str | None]]) -> None:
+    """Разослать пакет [(room_id, msg, sender_name)] в исходном порядке.
+
+    Буфер догрузки пишется до рассылки (переподключившийся клиент не пропустит
+    сообщение между ними) — одним pipeline на весь пакет, а не круг до Redis на строку.
+    """
+    entries = [(room_id, msg.id, _message_text(room_id, msg, sender_name)) for room_id, msg, sender_name in messages]
+    if not entries:
+        return
+    await _remember(entries)
+    for room_id, _seq, text in entries:
+        _fan_out(room_id, text)
+
+
+async def broadcast_chat_message(room_id: int, msg: ChatMessage, sender_name: str | None) -> None:
+    await broadcast_chat_messages([(room_id, msg, sender_name)])
+
+
+def hub_stats() -> dict:
+    depths = [w.queue.qsize() for w in _writers.values()]
+    return {
+        **stats,
+        "sockets": len(_writers),
+        "rooms": len(connections),
+        "queue_depth_total": sum(depths),
+        "queue_depth_max": max(depths, default=0),
     }
-    for _uid, ws in list(connections.get(room_id, {}).items()):
-        try:
-            await ws.send_text(json.dumps(broadcast))
-        except Exception:
-            pass
 
 
 async def push_offline_room_members(
@@ -41,13 +288,20 @@ async def push_offline_room_members(
     title: str,
     body: str,
     db: AsyncSession,
+    member_ids: list[int] | None = None,
 ) -> None:
-    members_result = await db.execute(
-        select(ChatRoomMember.user_id).where(ChatRoomMember.room_id == room_id)
-    )
-    all_member_ids = [r[0] for r in members_result.all()]
-    online_ids = set(connections.get(room_id, {}).keys())
-    offline_ids = [uid for uid in all_member_ids if uid not in online_ids and uid != sender_id]
+    """member_ids — готовый список участников (лента отчётов); иначе читается из chat_room_members."""
+    if member_ids is None:
+        members_result = await db.execute(
+            select(ChatRoomMember.user_id).where(ChatRoomMember.room_id == room_id)
+        )
+        all_member_ids = [r[0] for r in members_result.all()]
+    else:
+        all_member_ids = member_ids
+    # Пуш не нужен только тем, у кого открыт сокет в этой комнате: клиент со старыми
+    # сокетами на комнату, онлайн в другом чате, должен получить уведомление
+    in_room_ids = await presence.in_room(room_id, all_member_ids)
+    offline_ids = [uid for uid in all_member_ids if uid not in in_room_ids and uid != sender_id]
     if not offline_ids:
         return
     tokens_result = await db.execute(select(PushToken.token).where(PushToken.user_id.in_(offline_ids)))
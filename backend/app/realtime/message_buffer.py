@@ -0,0 +1,188 @@
+"""Пакетная запись сообщений чата из WebSocket (write-behind).
+
+Сообщения, пришедшие в пределах CHAT_WRITE_BATCH_WINDOW_MS, пишутся одним
+многострочным INSERT ... RETURNING в одной транзакции, затем по порядку
+рассылаются в комнаты. Пуш офлайн-участникам — один раз на комнату за пакет.
+Пакеты пишутся строго по очереди, поэтому порядок id совпадает с порядком прихода.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from fastapi import WebSocket
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.chat import ChatMessage
+from app.realtime.chat_hub import broadcast_chat_messages, push_offline_room_members, send_json
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+    room_id: int
+    sender_id: int
+    sender_name: str | None
+    content: str
+    temp_id: str | None
+    ws: WebSocket | None
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+_pending: list[_Pending] = []
+_flush_lock = asyncio.Lock()
+_timer: asyncio.Task | None = None
+_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+def submit(
+    room_id: int,
+    sender_id: int,
+    sender_name: str | None,
+    content: str,
+    *,
+    temp_id: str | None = None,
+    ws: WebSocket | None = None,
+) -> asyncio.Future:
+    """Поставить сообщение в очередь на запись.
+
+    Возвращает future со строкой (id, room_id, sender_id, content, created_at) или None,
+    если запись не удалась. Если передан ws и temp_id, отправителю уходит
+    {"type": "ack", "temp_id", "id", ...} или {"type": "error", "temp_id", ...}.
+    """
+    global _timer
+    item = _Pending(room_id, sender_id, sender_name, content, temp_id, ws)
+    _pending.append(item)
+    if len(_pending) >= settings.CHAT_WRITE_BATCH_MAX:
+        _spawn(flush())
+    elif _timer is None:
+        _timer = _spawn(_flush_later(settings.CHAT_WRITE_BATCH_WINDOW_MS / 1000))
+    return item.future
+
+
+async def _flush_later(delay: float) -> None:
+    global _timer
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        _timer = None
+    await flush()
+
+
+async def flush() -> None:
+    """Записать всё, что накопилось. Вызывается таймером и при остановке приложения."""
+    async with _flush_lock:
+        while _pending:
+            batch = _pending[: settings.CHAT_WRITE_BATCH_MAX]
+            del _pending[: len(batch)]
+            await _write_batch(batch)
+
+
+async def _insert(batch: list[_Pending]) -> list:
+    async with AsyncSessionLocal() as db:
+        # Postgres не обещает, что RETURNING (и выдача id) идут в порядке VALUES.
+        # sort_by_parameter_order: SQLAlchemy добавляет в VALUES порядковый номер строки,
+        # вставляет через SELECT ... ORDER BY по нему и возвращает строки в порядке batch
+        result = await db.execute(
+            insert(ChatMessage).returning(
+                ChatMessage.id,
+                ChatMessage.room_id,
+                ChatMessage.sender_id,
+                ChatMessage.content,
+                ChatMessage.created_at,
+                sort_by_parameter_order=True,
+            ),
+            [
+                {"room_id": p.room_id, "sender_id": p.sender_id, "content": p.content}
+                for p in batch
+            ],
+        )
+        rows = result.all()
+        await db.commit()
+    return rows
+
+
+async def _insert_or_split(batch: list[_Pending]) -> list:
+    """Строки RETURNING в порядке batch; None — сообщение не записано.
+
+    Ошибка данных одной строки (комнату удалили до записи, недопустимый текст) валит весь
+    INSERT — тогда пакет пишется половинами, пока плохие строки не останутся по одной.
+    Половины пишутся по порядку, так что id по-прежнему растут в порядке прихода.
+    """
+    try:
+        return await _insert(batch)
+    except (IntegrityError, DataError):
+        if len(batch) == 1:
+            logger.warning("chat message not saved room_id=%s sender_id=%s", batch[0].room_id,
+                           batch[0].sender_id, exc_info=True)
+            return [None]
+    mid = len(batch) // 2
+    return await _insert_or_split(batch[:mid]) + await _insert_or_split(batch[mid:])
+
+
+async def _write_batch(batch: list[_Pending]) -> None:
+    try:
+        rows = await _insert_or_split(batch)
+    except Exception:
+        # Не ошибка отдельной строки (БД недоступна и т.п.) — дробить пакет бесполезно
+        logger.exception("chat write batch failed size=%d", len(batch))
+        rows = [None] * len(batch)
+
+    saved = []
+    for p, row in zip(batch, rows):
+        if row is not None:
+            saved.append((p, row))
+            continue
+        if p.ws is not None and p.temp_id is not None:
+            send_json(p.ws, {"type": "error", "temp_id": p.temp_id, "detail": "Message not saved"})
+        if not p.future.done():
+            p.future.set_result(None)
+    if not saved:
+        return
+
+    last_in_room: dict[int, _Pending] = {}
+    for p, row in saved:
+        if p.ws is not None and p.temp_id is not None:
+            send_json(p.ws, {
+                "type": "ack",
+                "temp_id": p.temp_id,
+                "id": row.id,
+                "room_id": row.room_id,
+                "created_at": row.created_at.isoformat(),
+            })
+        last_in_room[p.room_id] = p
+    await broadcast_chat_messages([(p.room_id, row, p.sender_name) for p, row in saved])
+    for p, row in saved:
+        if not p.future.done():
+            p.future.set_result(row)
+
+    # Пуш ходит во внешний HTTP — не держим им очередь записи
+    _spawn(_push_batch(last_in_room))
+
+
+async def _push_batch(last_in_room: dict[int, _Pending]) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            for room_id, p in last_in_room.items():
+                await push_offline_room_members(
+                    room_id,
+                    p.sender_id,
+                    p.sender_name or "TerraApp",
+                    p.content,
+                    db,
+                )
+    except Exception:
+        logger.exception("chat batch push failed")
@@ -0,0 +1,221 @@
+"""Онлайн-статус пользователей в Redis — общий для всех воркеров API.
+
+Каждое WebSocket-подключение — член ZSET ``presence:{user_id}`` со score = момент
+истечения. Пока сокет жив, фоновый heartbeat продлевает score; если воркер упал,
+записи сами протухают через PRESENCE_TTL_SECONDS. Глобальный ZSET ``presence:users``
+(user_id → момент истечения) нужен для счётчика онлайна в админке.
+
+Подписки на комнаты — так же, в ``presence:room:{room_id}:{user_id}`` (conn_id → момент
+истечения): пуш не отправляется только тем, у кого открыт сокет именно в этой комнате.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+USERS_KEY = "presence:users"
+
+# Идентификатор процесса: у разных воркеров разные conn_id даже при совпадении id(ws)
+_WORKER_ID = uuid.uuid4().hex[:12]
+
+# user_id -> conn_id этого процесса
+_local: dict[int, set[str]] = {}
+
+# conn_id этого процесса -> (user_id, комнаты, на которые подписано подключение)
+_local_rooms: dict[str, tuple[int, set[int]]] = {}
+
+_heartbeat_task: asyncio.Task | None = None
+
+
+def _user_key(user_id: int) -> str:
+    return f"presence:{user_id}"
+
+
+def _room_key(room_id: int, user_id: int) -> str:
+    return f"presence:room:{room_id}:{user_id}"
+
+
+def _expiry() -> float:
+    return time.time() + settings.PRESENCE_TTL_SECONDS
+
+
+async def connect(user_id: int) -> str:
+    """Зарегистрировать новое подключение пользователя; вернуть conn_id для disconnect()."""
+    conn_id = f"{_WORKER_ID}:{uuid.uuid4().hex[:12]}"
+    _local.setdefault(user_id, set()).add(conn_id)
+    try:
+        redis = await get_redis()
+        exp = _expiry()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(_user_key(user_id), {conn_id: exp})
+            pipe.expire(_user_key(user_id), settings.PRESENCE_TTL_SECONDS)
+            pipe.zadd(USERS_KEY, {str(user_id): exp})
+            await pipe.execute()
+    except Exception:
+        logger.warning("presence.connect failed user_id=%s", user_id, exc_info=True)
+    return conn_id
+
+
+async def join_rooms(user_id: int, conn_id: str, room_ids) -> None:
+    """Отметить подписку подключения conn_id на комнаты room_ids."""
+    room_ids = set(room_ids)
+    if not room_ids:
+        return
+    _local_rooms.setdefault(conn_id, (user_id, set()))[1].update(room_ids)
+    try:
+        redis = await get_redis()
+        exp = _expiry()
+        async with redis.pipeline(transaction=False) as pipe:
+            for room_id in room_ids:
+                pipe.zadd(_room_key(room_id, user_id), {conn_id: exp})
+                pipe.expire(_room_key(room_id, user_id), settings.PRESENCE_TTL_SECONDS)
+            await pipe.execute()
+    except Exception:
+        logger.warning("presence.join_rooms failed user_id=%s", user_id, exc_info=True)
+
+
+async def leave_rooms(user_id: int, conn_id: str, room_ids) -> None:
+    room_ids = set(room_ids)
+    entry = _local_rooms.get(conn_id)
+    if entry is not None:
+        entry[1].difference_update(room_ids)
+    if not room_ids:
+        return
+    try:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for room_id in room_ids:
+                pipe.zrem(_room_key(room_id, user_id), conn_id)
+            await pipe.execute()
+    except Exception:
+        logger.warning("presence.leave_rooms failed user_id=%s", user_id, exc_info=True)
+
+
+async def disconnect(user_id: int, conn_id: str) -> None:
+    conns = _local.get(user_id)
+    if conns is not None:
+        conns.discard(conn_id)
+        if not conns:
+            _local.pop(user_id, None)
+    _, rooms = _local_rooms.pop(conn_id, (user_id, set()))
+    try:
+        redis = await get_redis()
+        key = _user_key(user_id)
+        async with redis.pipeline(transaction=False) as pipe:
+            for room_id in rooms:
+                pipe.zrem(_room_key(room_id, user_id), conn_id)
+            pipe.zrem(key, conn_id)
+            pipe.zcount(key, time.time(), "+inf")
+            *_, alive = await pipe.execute()
+        if not alive:
+            await redis.zrem(USERS_KEY, str(user_id))
+    except Exception:
+        logger.warning("presence.disconnect failed user_id=%s", user_id, exc_info=True)
+
+
+async def is_online(user_ids: list[int]) -> set[int]:
+    """Какие из user_ids сейчас подключены хотя бы к одному воркеру. Один round trip в Redis."""
+    ids = list(dict.fromkeys(user_ids))
+    if not ids:
+        return set()
+    try:
+        redis = await get_redis()
+        now = time.time()
+        async with redis.pipeline(transaction=False) as pipe:
+            for uid in ids:
+                pipe.zcount(_user_key(uid), now, "+inf")
+            counts = await pipe.execute()
+        return {uid for uid, n in zip(ids, counts) if n}
+    except Exception:
+        logger.warning("presence.is_online failed, using local connections only", exc_info=True)
+        return {uid for uid in ids if uid in _local}
+
+
+async def in_room(room_id: int, user_ids: list[int]) -> set[int]:
+    """Какие из user_ids подписаны на room_id с живого подключения (на любом воркере).
+
+    Подписка на комнату засчитывается, только если жив и сам пользователь (presence:{id}) —
+    запись комнаты от упавшего воркера не переживёт его подключения. Один round trip в Redis.
+    """
+    ids = list(dict.fromkeys(user_ids))
+    if not ids:
+        return set()
+    try:
+        redis = await get_redis()
+        now = time.time()
+        async with redis.pipeline(transaction=False) as pipe:
+            for uid in ids:
+                pipe.zcount(_room_key(room_id, uid), now, "+inf")
+                pipe.zcount(_user_key(uid), now, "+inf")
+            counts = await pipe.execute()
+        return {uid for uid, in_room_n, online_n in zip(ids, counts[::2], counts[1::2]) if in_room_n and online_n}
+    except Exception:
+        logger.warning("presence.in_room failed, using local subscriptions only", exc_info=True)
+        return {uid for uid, rooms in _local_rooms.values() if room_id in rooms and uid in ids}
+
+
+async def online_count() -> int:
+    try:
+        redis = await get_redis()
+        return int(await redis.zcount(USERS_KEY, time.time(), "+inf"))
+    except Exception:
+        logger.warning("presence.online_count failed, using local connections only", exc_info=True)
+        return len(_local)
+
+
+async def _heartbeat_once() -> None:
+    if not _local:
+        return
+    redis = await get_redis()
+    now = time.time()
+    exp = now + settings.PRESENCE_TTL_SECONDS
+    async with redis.pipeline(transaction=False) as pipe:
+        for uid, conns in list(_local.items()):
+            key = _user_key(uid)
+            pipe.zadd(key, {c: exp for c in conns})
+            pipe.zremrangebyscore(key, "-inf", now)
+            pipe.expire(key, settings.PRESENCE_TTL_SECONDS)
+            pipe.zadd(USERS_KEY, {str(uid): exp})
+        for conn_id, (uid, rooms) in list(_local_rooms.items()):
+            for room_id in rooms:
+                key = _room_key(room_id, uid)
+                pipe.zadd(key, {conn_id: exp})
+                pipe.zremrangebyscore(key, "-inf", now)
+                pipe.expire(key, settings.PRESENCE_TTL_SECONDS)
+        pipe.zremrangebyscore(USERS_KEY, "-inf", now)
+        await pipe.execute()
+
+
+async def _heartbeat_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.PRESENCE_HEARTBEAT_SECONDS)
+        try:
+            await _heartbeat_once()
+        except Exception:
+            logger.warning("presence heartbeat failed", exc_info=True)
+
+
+def start_heartbeat() -> None:
+    global _heartbeat_task
+    if _heartbeat_task is None:
+        _heartbeat_task = asyncio.create_task(_heartbeat_loop())
+
+
+async def stop_heartbeat() -> None:
+    global _heartbeat_task
+    if _heartbeat_task is None:
+        return
+    _heartbeat_task.cancel()
+    try:
+        await _heartbeat_task
+    except asyncio.CancelledError:
+        pass
+    _heartbeat_task = None
@@ -52,6 +52,10 @@ class ChatMessageOut(BaseModel):
 
 
 class WSMessage(BaseModel):
-    type: str  # "message", "typing", "read"
+    type: str  # "message", "typing", "read", "subscribe", "unsubscribe"
     content: str | None = None
     message_id: int | None = None
+    room_id: int | None = None  # для мультиплексного /chat/ws
+    room_ids: list[int] | None = None  # subscribe / unsubscribe
+    temp_id: str | None = None  # клиентский id сообщения, возвращается в "ack"
+    last_seqs: dict[int, int] | None = None  # subscribe: room_id -> последний полученный seq
@@ -55,6 +55,14 @@ class LocationUpdate(BaseModel):
     message: str | None = None
 
 
+class LocationGeometryOut(BaseModel):
+    id: int
+    name: str
+    grp: str
+    geometry: dict
+    model_config = {"from_attributes": True}
+
+
 class MachineKindOut(BaseModel):
     id: int
     title: str
@@ -50,3 +50,14 @@ class FormTemplateOut(BaseModel):
     roles: list[str]
 
     model_config = {"from_attributes": True}
+
+
+class FormTemplateSummaryOut(BaseModel):
+    """Форма без схемы (?fields=summary); schema_version меняется вместе со схемой."""
+
+    id: int
+    name: str
+    title: str
+    is_active: bool
+    roles: list[str]
+    schema_version: str
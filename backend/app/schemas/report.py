@@ -126,3 +126,6 @@ class ReportFeedItemOut(BaseModel):
     crop: str | None = None
     trips: int | None = None
     form_title: str | None = None
+    # Моточасы и часы движения машины за work_date по трекеру (только в админской ленте)
+    telemetry_engine_hours: float | None = None
+    telemetry_motion_hours: float | None = None
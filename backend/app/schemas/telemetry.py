@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+from pydantic import BaseModel, Field
+
+
+class TelemetryIngestOut(BaseModel):
+    accepted: int
+    rejected: int
+
+
+class TelemetryDeviceOut(BaseModel):
+    id: int
+    unique_id: str
+    name: str | None
+    machine_name: str | None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class TelemetryDeviceUpdate(BaseModel):
+    """Название машины как в отчётах (Report.machine_name); пусто — трекер не привязан."""
+    machine_name: str | None = Field(None, max_length=255)
+
+
+class MachineHoursOut(BaseModel):
+    machine_name: str
+    day: date
+    reported_hours: float | None = None
+    engine_hours: float | None = None
+    motion_hours: float | None = None
+
+
+class FieldSuggestionOut(BaseModel):
+    """Подсказка для ОТД по треку машины: поле и моточасы в нём (шаг 0.5 ч)."""
+    location_id: int
+    location: str
+    location_grp: str
+    hours: float
+    motion_hours: float
+    start: datetime
+    end: datetime
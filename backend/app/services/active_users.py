@@ -0,0 +1,84 @@
+"""Множество активных пользователей в Redis.
+
+Лента «Отчётность» — это неявно «все активные пользователи»: вместо строк
+chat_room_members на каждого сотрудника участники ленты берутся отсюда.
+Множество загружается из БД один раз (и перестраивается раз в ACTIVE_USERS_REBUILD_SECONDS
+на случай правок в обход API), а дальше ведётся инкрементально: регистрация —
+mark_active, деактивация — mark_inactive.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_KEY = "users:active"
+READY_KEY = "users:active:ready"
+
+
+async def _load_from_db() -> list[int]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User.id).where(User.is_active == True))
+        return [r[0] for r in result.all()]
+
+
+async def _ensure_loaded(redis) -> None:
+    if await redis.exists(READY_KEY):
+        return
+    ids = await _load_from_db()
+    tmp_key = f"{ACTIVE_KEY}:rebuild"
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(tmp_key)
+        if ids:
+            pipe.sadd(tmp_key, *ids)
+            pipe.rename(tmp_key, ACTIVE_KEY)
+        else:
+            pipe.delete(ACTIVE_KEY)
+        pipe.set(READY_KEY, "1", ex=settings.ACTIVE_USERS_REBUILD_SECONDS)
+        await pipe.execute()
+
+
+async def get_active_user_ids() -> list[int]:
+    try:
+        redis = await get_redis()
+        await _ensure_loaded(redis)
+        return [int(uid) for uid in await redis.smembers(ACTIVE_KEY)]
+    except Exception:
+        logger.warning("active users cache unavailable, reading from DB", exc_info=True)
+        return await _load_from_db()
+
+
+async def count_active_users() -> int:
+    try:
+        redis = await get_redis()
+        await _ensure_loaded(redis)
+        return int(await redis.scard(ACTIVE_KEY))
+    except Exception:
+        logger.warning("active users cache unavailable, reading from DB", exc_info=True)
+        return len(await _load_from_db())
+
+
+async def mark_active(user_id: int) -> None:
+    try:
+        redis = await get_redis()
+        # Пока множество не загружено, его построит _ensure_loaded — писать нечего
+        if await redis.exists(READY_KEY):
+            await redis.sadd(ACTIVE_KEY, user_id)
+    except Exception:
+        logger.warning("active users mark_active failed user_id=%s", user_id, exc_info=True)
+
+
+async def mark_inactive(user_id: int) -> None:
+    try:
+        redis = await get_redis()
+        await redis.srem(ACTIVE_KEY, user_id)
+    except Exception:
+        logger.warning("active users mark_inactive failed user_id=%s", user_id, exc_info=True)
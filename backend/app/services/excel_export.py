@@ -8,6 +8,7 @@ from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils import get_column_letter
 from collections import defaultdict
 from typing import Any
+from app.core.metrics import EXPORT_DURATION
 
 
 THIN = Side(style="thin")
@@ -37,7 +38,8 @@ async def build_accounting_excel(rows: list, date_from: date, date_to: date, fil
     Matches the legacy spreadsheet column layout used for accounting exports.
     """
     loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _build_accounting_sync, rows, date_from, date_to, filepath)
+    with EXPORT_DURATION.labels("accounting").time():
+        await loop.run_in_executor(None, _build_accounting_sync, rows, date_from, date_to, filepath)
 
 
 def _build_accounting_sync(rows, date_from, date_to, filepath):
@@ -91,7 +93,8 @@ def _build_accounting_sync(rows, date_from, date_to, filepath):
 async def build_otd_excel(reports: list, filepath: str):
     """Build full OTD report Excel with all 11 columns."""
     loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _build_otd_sync, reports, filepath)
+    with EXPORT_DURATION.labels("otd").time():
+        await loop.run_in_executor(None, _build_otd_sync, reports, filepath)
 
 
 def _build_otd_sync(reports, filepath):
@@ -0,0 +1,72 @@
+"""Кэш сериализованного списка форм по набору ролей.
+
+Список форм запрашивается при каждом старте приложения и почти никогда не меняется.
+Готовый JSON держится в памяти процесса под ключом (версия, роли, режим); версия —
+счётчик forms:version в Redis, его увеличивают create/update/delete формы, так что
+все воркеры видят правку сразу. ETag — хеш тела: одинаковые списки у разных
+воркеров дают одинаковый ETag, и клиент получает 304 без тела.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "forms:version"
+
+# (роли, режим) -> (тело JSON, ETag); сбрасывается целиком при смене версии
+_cache: dict[tuple[str, str], tuple[bytes, str]] = {}
+_cache_version: str | None = None
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Слабые валидаторы (W/"…") сравниваются по значению — для GET этого достаточно
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def current_version() -> str | None:
+    """Текущая версия форм; None, если Redis недоступен (тогда кэш не используется)."""
+    try:
+        return await (await get_redis()).get(VERSION_KEY) or "0"
+    except Exception:
+        logger.warning("forms version read failed", exc_info=True)
+        return None
+
+
+async def bump_version() -> None:
+    """Вызывать после любого изменения форм или их назначений ролям."""
+    try:
+        await (await get_redis()).incr(VERSION_KEY)
+    except Exception:
+        logger.warning("forms version bump failed", exc_info=True)
+    _cache.clear()
+
+
+def get(version: str | None, roles: str, mode: str) -> tuple[bytes, str] | None:
+    global _cache_version
+    if version is None:
+        return None
+    if version != _cache_version:
+        _cache.clear()
+        _cache_version = version
+        return None
+    return _cache.get((roles, mode))
+
+
+def put(version: str | None, roles: str, mode: str, body: bytes) -> tuple[bytes, str]:
+    entry = (body, make_etag(body))
+    if version is not None and version == _cache_version:
+        _cache[(roles, mode)] = entry
+    return entry
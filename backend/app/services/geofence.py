@@ -0,0 +1,236 @@
+"""Геозоны полей (Location.geometry) и разбиение треков машин на стоянки/работу по полям.
+
+Индекс — равномерная сетка в микроградусах (GEOFENCE_CELL_E6). Для каждой ячейки,
+задевающей поле, заранее известно одно из двух:
+  • ячейка целиком внутри поля — ответ без вычислений;
+  • через ячейку проходит граница — точный тест even-odd, но только по рёбрам,
+    пересекающим горизонтальную полосу этой ячейки (обычно 2–4 ребра).
+Ячейки вне всех полей в словарь не попадают. Поиск точки — один dict.get и
+в худшем случае несколько сравнений, без перебора полей.
+
+PostGIS в стеке нет, поэтому индекс строится в памяти воркера из GeoJSON в
+locations.geometry и перестраивается, когда в Redis меняется geofence:version.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.dictionary import Location
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "geofence:version"
+
+Edge = tuple[int, int, int, int]   # x1, y1, x2, y2 — долгота/широта × 1e6
+
+
+def _key(cx: int, cy: int) -> int:
+    return (cx << 32) | (cy & 0xFFFFFFFF)
+
+
+def _pip(x: int, y: int, edges) -> bool:
+    inside = False
+    for x1, y1, x2, y2 in edges:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def rings_from_geojson(geometry: dict) -> list[list[tuple[int, int]]]:
+    """Polygon / MultiPolygon GeoJSON → кольца в микроградусах. ValueError, если геометрия не та."""
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if gtype == "Polygon":
+        polygons = [coords]
+    elif gtype == "MultiPolygon":
+        polygons = coords
+    else:
+        raise ValueError("geometry must be a GeoJSON Polygon or MultiPolygon")
+    rings = []
+    for polygon in polygons or []:
+        for ring in polygon:
+            points = [(int(round(float(p[0]) * 1_000_000)), int(round(float(p[1]) * 1_000_000))) for p in ring]
+            if len(points) >= 2 and points[0] == points[-1]:
+                points.pop()
+            if len(points) < 3:
+                raise ValueError("polygon ring needs at least 3 points")
+            rings.append(points)
+    if not rings:
+        raise ValueError("empty geometry")
+    return rings
+
+
+class GeofenceIndex:
+    def __init__(self, fields: dict[int, list[list[tuple[int, int]]]], cell: int | None = None):
+        self.cell = cell or settings.GEOFENCE_CELL_E6
+        self.size = len(fields)
+        # ключ ячейки -> [(location_id, рёбра полосы или None, если ячейка целиком внутри)]
+        self._cells: dict[int, list[tuple[int, tuple[Edge, ...] | None]]] = {}
+        by_area = []
+        for location_id, rings in fields.items():
+            xs = [x for ring in rings for x, _ in ring]
+            ys = [y for ring in rings for _, y in ring]
+            by_area.append(((max(xs) - min(xs)) * (max(ys) - min(ys)), location_id, rings))
+        # Вложенные/перекрывающиеся поля: первым проверяется меньшее
+        for _area, location_id, rings in sorted(by_area):
+            self._add(location_id, rings)
+
+    def _add(self, location_id: int, rings: list[list[tuple[int, int]]]) -> None:
+        c = self.cell
+        edges: list[Edge] = []
+        for ring in rings:
+            for i, (x1, y1) in enumerate(ring):
+                x2, y2 = ring[(i + 1) % len(ring)]
+                if y1 != y2 or x1 != x2:
+                    edges.append((x1, y1, x2, y2))
+
+        # Рёбра по горизонтальным полосам ячеек
+        bands: dict[int, list[Edge]] = {}
+        boundary: set[tuple[int, int]] = set()
+        for e in edges:
+            x1, y1, x2, y2 = e
+            cy0, cy1 = min(y1, y2) // c, max(y1, y2) // c
+            cx0, cx1 = min(x1, x2) // c, max(x1, x2) // c
+            for cy in range(cy0, cy1 + 1):
+                bands.setdefault(cy, []).append(e)
+                for cx in range(cx0, cx1 + 1):
+                    boundary.add((cx, cy))
+
+        xs = [e[0] for e in edges]
+        ys = [e[1] for e in edges]
+        frozen = {cy: tuple(es) for cy, es in bands.items()}
+        for cy in range(min(ys) // c, max(ys) // c + 1):
+            for cx in range(min(xs) // c, max(xs) // c + 1):
+                if (cx, cy) in boundary:
+                    entry = (location_id, frozen.get(cy, ()))
+                elif _pip(cx * c + c // 2, cy * c + c // 2, frozen.get(cy, ())):
+                    entry = (location_id, None)
+                else:
+                    continue
+                self._cells.setdefault(_key(cx, cy), []).append(entry)
+
+    def locate(self, lon_e6: int, lat_e6: int) -> int | None:
+        entries = self._cells.get(_key(lon_e6 // self.cell, lat_e6 // self.cell))
+        if entries is None:
+            return None
+        for location_id, edges in entries:
+            if edges is None or _pip(lon_e6, lat_e6, edges):
+                return location_id
+        return None
+
+
+@dataclass(slots=True)
+class DwellSegment:
+    location_id: int
+    start: datetime
+    end: datetime
+    engine_seconds: float = 0.0
+    motion_seconds: float = 0.0
+    points: int = 0
+
+
+class DwellTracker:
+    """Потоковое разбиение трека одной машины на отрезки пребывания в полях.
+
+    Точки подаются по возрастанию времени. Интервал до следующей точки относится к полю
+    предыдущей (как в дневных моточасах); разрыв длиннее max_gap закрывает отрезок.
+    """
+
+    def __init__(self, index: GeofenceIndex, max_gap: int | None = None):
+        self.index = index
+        self.max_gap = max_gap if max_gap is not None else settings.TELEMETRY_MAX_GAP_SECONDS
+        self.segments: list[DwellSegment] = []
+        self._current: DwellSegment | None = None
+        self._prev_time: datetime | None = None
+        self._prev_flags = 0
+
+    def feed(self, fix_time: datetime, lon_e6: int, lat_e6: int, flags: int) -> None:
+        cur = self._current
+        if cur is not None and self._prev_time is not None:
+            dt = (fix_time - self._prev_time).total_seconds()
+            if dt > self.max_gap:
+                self._close()
+                cur = None
+            else:
+                cur.end = fix_time
+                if self._prev_flags & 1:
+                    cur.engine_seconds += dt
+                if self._prev_flags & 2:
+                    cur.motion_seconds += dt
+
+        location_id = self.index.locate(lon_e6, lat_e6)
+        if cur is None or cur.location_id != location_id:
+            self._close()
+            if location_id is not None:
+                self._current = DwellSegment(location_id, fix_time, fix_time)
+        if self._current is not None:
+            self._current.points += 1
+        self._prev_time = fix_time
+        self._prev_flags = flags
+
+    def _close(self) -> None:
+        if self._current is not None:
+            self.segments.append(self._current)
+            self._current = None
+
+    def finish(self, min_dwell: int | None = None) -> list[DwellSegment]:
+        """Закрыть трек: склеить соседние отрезки одного поля (дребезг на границе) и отбросить короткие."""
+        self._close()
+        min_dwell = min_dwell if min_dwell is not None else settings.GEOFENCE_MIN_DWELL_SECONDS
+        merged: list[DwellSegment] = []
+        for seg in self.segments:
+            last = merged[-1] if merged else None
+            if (
+                last is not None
+                and last.location_id == seg.location_id
+                and (seg.start - last.end).total_seconds() <= self.max_gap
+            ):
+                last.end = seg.end
+                last.engine_seconds += seg.engine_seconds
+                last.motion_seconds += seg.motion_seconds
+                last.points += seg.points
+            else:
+                merged.append(seg)
+        return [s for s in merged if (s.end - s.start).total_seconds() >= min_dwell]
+
+
+_index: GeofenceIndex | None = None
+_index_version: str | None = None
+
+
+async def bump_version() -> None:
+    """Вызывать после изменения геометрии полей: воркеры перестроят индекс."""
+    try:
+        redis = await get_redis()
+        await redis.incr(VERSION_KEY)
+    except Exception:
+        logger.warning("geofence version bump failed", exc_info=True)
+
+
+async def get_index(db: AsyncSession) -> GeofenceIndex:
+    global _index, _index_version
+    try:
+        version = await (await get_redis()).get(VERSION_KEY) or "0"
+    except Exception:
+        version = _index_version or "0"
+    if _index is not None and version == _index_version:
+        return _index
+    fields: dict[int, list] = {}
+    rows = await db.execute(select(Location.id, Location.geometry).where(Location.geometry.is_not(None)))
+    for location_id, geometry in rows.all():
+        try:
+            fields[location_id] = rings_from_geojson(geometry)
+        except (ValueError, TypeError, KeyError, IndexError):
+            logger.warning("location %s has invalid geometry, skipped", location_id)
+    _index = GeofenceIndex(fields)
+    _index_version = version
+    logger.info("geofence index built: %d fields, %d cells", len(fields), len(_index._cells))
+    return _index
@@ -0,0 +1,227 @@
+"""Месячные секции больших таблиц и их архив.
+
+Секционированы по месяцам (миграции 007, 010): reports (work_date), form_responses
+(submitted_at), chat_messages (created_at), telemetry_positions (fix_time). Секция
+называется <таблица>_YYYYMM, границы timestamptz — в UTC; всё, что не попало
+ни в одну секцию, лежит в <таблица>_default.
+
+maintain() (ARQ, раз в сутки):
+  • создаёт секции на PARTITION_AHEAD_MONTHS месяцев вперёд — чтобы новые строки не
+    копились в default (если там уже есть строки нужного месяца, они переносятся);
+  • если PARTITION_ARCHIVE_AFTER_MONTHS > 0 — секции таблиц PARTITION_ARCHIVE_TABLES старше
+    этого срока отсоединяются и переезжают в схему archive (из приложения не видны,
+    индексы основной таблицы не растут). При заданном PARTITION_ARCHIVE_PARQUET_DIR секция
+    перед этим выгружается в <каталог>/<таблица>/YYYYMM.parquet (zstd, нужен pyarrow), а при
+    PARTITION_ARCHIVE_DROP_AFTER_DUMP после выгрузки удаляется совсем.
+
+Запросы с границами по ключу секционирования читают только нужные месяцы; для
+timestamptz граница должна сравниваться с самим столбцом (day_start), а не с cast(... AS date).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import date, timedelta
+
+from sqlalchemy import DateTime, cast, literal, text
+from sqlalchemy.types import Date as DateColumn
+
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = "archive"
+
+# таблица -> (ключ секционирования, тип ключа)
+PARTITIONED = {
+    "reports": ("work_date", "date"),
+    "form_responses": ("submitted_at", "timestamptz"),
+    "chat_messages": ("created_at", "timestamptz"),
+    "telemetry_positions": ("fix_time", "timestamptz"),
+}
+
+_MONTH_SUFFIX = re.compile(r"_(\d{4})(\d{2})$")
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def day_start(d: date):
+    """Начало суток d как timestamptz (часовой пояс сессии — как у cast(ts AS date)).
+
+    cast(submitted_at AS date) >= d  ⇔  submitted_at >= day_start(d), но только второе
+    отсекает секции.
+    """
+    return cast(literal(d, DateColumn), DateTime(timezone=True))
+
+
+def _bound(table: str, month: date) -> str:
+    if PARTITIONED[table][1] == "timestamptz":
+        return f"'{month.isoformat()}+00'"
+    return f"'{month.isoformat()}'"
+
+
+def _range_sql(table: str, month: date) -> str:
+    return f"FOR VALUES FROM ({_bound(table, month)}) TO ({_bound(table, next_month(month))})"
+
+
+async def ensure_months(table: str, months) -> None:
+    """Создать секции table под переданные месяцы (первые числа), если их ещё нет."""
+    key = PARTITIONED[table][0]
+    # Отдельная транзакция: DDL не должен жить внутри транзакции записи
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:k))"), {"k": f"{table}_partitions"})
+        for month in sorted(set(months)):
+            name = f"{table}_{month:%Y%m}"
+            exists = await conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": name})
+            if exists.scalar():
+                continue
+            lo, hi = _bound(table, month), _bound(table, next_month(month))
+            stray = await conn.execute(text(
+                f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE {key} >= {lo} AND {key} < {hi})"
+            ))
+            if not stray.scalar():
+                await conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} {_range_sql(table, month)}"))
+                continue
+            # В default уже есть строки этого месяца: CREATE ... PARTITION OF упадёт на проверке
+            # default, поэтому строки переносятся в новую таблицу, и она присоединяется секцией
+            await conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+            moved = await conn.execute(text(
+                f"WITH moved AS (DELETE FROM {table}_default WHERE {key} >= {lo} AND {key} < {hi} RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ))
+            await conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {_range_sql(table, month)}"))
+            logger.info("partition %s created, %d rows moved from default", name, moved.rowcount)
+
+
+async def list_partitions(table: str) -> list[tuple[str, date]]:
+    """Месячные секции table (без default): [(имя, месяц)] по возрастанию."""
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:t AS regclass)"
+            ),
+            {"t": table},
+        )
+        names = result.scalars().all()
+    out = []
+    for name in names:
+        match = _MONTH_SUFFIX.search(name)
+        if match:
+            out.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(out, key=lambda p: p[1])
+
+
+async def archive_partition(table: str, name: str) -> None:
+    """Отсоединить секцию и перенести её в схему archive."""
+    async with engine.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+    logger.info("partition %s detached to %s", name, ARCHIVE_SCHEMA)
+
+
+# Тип столбца Postgres -> тип Arrow; остальное (varchar, text, jsonb, ...) пишется строкой
+_ARROW_TYPES = {
+    "smallint": "int16",
+    "integer": "int32",
+    "bigint": "int64",
+    "double precision": "float64",
+    "real": "float32",
+    "boolean": "bool_",
+    "date": "date32",
+}
+
+
+async def dump_parquet(name: str, path: str, schema_name: str = "public", batch_rows: int = 20000) -> int:
+    """Выгрузить таблицу schema_name.name в Parquet (zstd). Возвращает число строк."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    async with engine.connect() as conn:
+        columns = (await conn.execute(
+            text(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = :s AND table_name = :n ORDER BY ordinal_position"
+            ),
+            {"s": schema_name, "n": name},
+        )).all()
+        fields = []
+        for column, data_type in columns:
+            if data_type == "timestamp with time zone":
+                arrow_type = pa.timestamp("us", tz="UTC")
+            else:
+                arrow_type = getattr(pa, _ARROW_TYPES.get(data_type, "string"))()
+            fields.append(pa.field(column, arrow_type))
+        schema = pa.schema(fields)
+        as_text = [i for i, f in enumerate(fields) if f.type == pa.string()]
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+        total = 0
+        try:
+            result = await conn.stream(text(f"SELECT * FROM {schema_name}.{name}"))
+            async for rows in result.partitions(batch_rows):
+                cols = [list(c) for c in zip(*rows)]
+                for i in as_text:
+                    cols[i] = [
+                        v if v is None or isinstance(v, str)
+                        else json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list))
+                        else str(v)
+                        for v in cols[i]
+                    ]
+                batch = pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(cols, fields)], schema=schema)
+                await asyncio.to_thread(writer.write_table, batch)
+                total += len(rows)
+        finally:
+            writer.close()
+    os.replace(tmp_path, path)
+    return total
+
+
+async def maintain() -> dict:
+    """Секции наперёд и архивирование старых. Возвращает сводку для лога."""
+    today = date.today()
+    ahead = [add_months(month_start(today), i) for i in range(settings.PARTITION_AHEAD_MONTHS + 1)]
+    for table in PARTITIONED:
+        await ensure_months(table, ahead)
+
+    archived = []
+    if settings.PARTITION_ARCHIVE_AFTER_MONTHS > 0:
+        cutoff = add_months(month_start(today), -settings.PARTITION_ARCHIVE_AFTER_MONTHS)
+        for table in settings.PARTITION_ARCHIVE_TABLES:
+            if table not in PARTITIONED:
+                logger.warning("PARTITION_ARCHIVE_TABLES: %s is not partitioned, skipped", table)
+                continue
+            for name, month in await list_partitions(table):
+                if month >= cutoff:
+                    break
+                # Выгрузка до отсоединения: если она упадёт, секция останется на месте
+                # и следующий запуск повторит попытку
+                if settings.PARTITION_ARCHIVE_PARQUET_DIR:
+                    path = os.path.join(settings.PARTITION_ARCHIVE_PARQUET_DIR, table, f"{month:%Y%m}.parquet")
+                    rows = await dump_parquet(name, path)
+                    logger.info("partition %s dumped to %s (%d rows)", name, path, rows)
+                await archive_partition(table, name)
+                archived.append(name)
+                if settings.PARTITION_ARCHIVE_PARQUET_DIR and settings.PARTITION_ARCHIVE_DROP_AFTER_DUMP:
+                    async with engine.begin() as conn:
+                        await conn.execute(text(f"DROP TABLE {ARCHIVE_SCHEMA}.{name}"))
+    return {"months_ahead": len(ahead), "archived": archived}
@@ -1,6 +1,7 @@
 import aiohttp
 import logging
 from app.core.config import settings
+from app.core.metrics import PUSH_MESSAGES
 
 logger = logging.getLogger(__name__)
 
@@ -30,5 +31,12 @@ async def send_push_notifications(tokens: list[str], title: str, body: str, data
             ) as resp:
                 result = await resp.json()
                 logger.info("Push sent to %d tokens: %s", len(tokens), result)
+        tickets = result.get("data") if isinstance(result, dict) else None
+        if isinstance(tickets, list):
+            for ticket in tickets:
+                PUSH_MESSAGES.labels("ok" if ticket.get("status") == "ok" else "error").inc()
+        else:
+            PUSH_MESSAGES.labels("rejected").inc(len(messages))
     except Exception as e:
+        PUSH_MESSAGES.labels("failed").inc(len(messages))
         logger.error("Push notification error: %s", e)
@@ -0,0 +1,137 @@
+"""Хранилище refresh-токенов в Redis: семейства ротации и индекс по пользователю.
+
+Ключи:
+  refresh:{token}          hash {user_id, family}          — действующий токен
+  refresh_used:{token}     family                          — уже обменянный токен (детект повторного использования)
+  refresh_family:{family}  hash {user_id, current}         — цепочка ротаций одного входа
+  refresh_user:{user_id}   set of family                   — все входы пользователя
+
+Ротация, выход и отзыв всех сессий — Lua-скрипты: одна атомарная операция и один
+round trip. Повторное предъявление уже обменянного токена отзывает всё семейство
+(токен утёк или был перехвачен). Токены старого формата (refresh:{token} → user_id
+строкой) принимаются при ротации и превращаются в семейство; в индекс пользователя
+они не попадают и доживают свой TTL.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.security import create_refresh_token
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TTL = settings.JWT_REFRESH_EXPIRE_DAYS * 86400
+
+_ISSUE_LUA = """
+local token, family, uid, ttl = ARGV[1], ARGV[2], ARGV[3], tonumber(ARGV[4])
+redis.call('HSET', 'refresh:' .. token, 'user_id', uid, 'family', family)
+redis.call('EXPIRE', 'refresh:' .. token, ttl)
+redis.call('HSET', 'refresh_family:' .. family, 'user_id', uid, 'current', token)
+redis.call('EXPIRE', 'refresh_family:' .. family, ttl)
+redis.call('SADD', 'refresh_user:' .. uid, family)
+redis.call('EXPIRE', 'refresh_user:' .. uid, ttl)
+return 1
+"""
+
+# Возвращает {1, user_id} — обменян; {0, ''} — неизвестный токен; {-1, user_id} — повтор, семейство отозвано
+_ROTATE_LUA = """
+local old, new, ttl = ARGV[1], ARGV[2], tonumber(ARGV[3])
+local tkey = 'refresh:' .. old
+local t = redis.call('TYPE', tkey)['ok']
+local uid, family
+if t == 'hash' then
+  uid = redis.call('HGET', tkey, 'user_id')
+  family = redis.call('HGET', tkey, 'family')
+elseif t == 'string' then
+  uid = redis.call('GET', tkey)
+  family = old
+else
+  local used = redis.call('GET', 'refresh_used:' .. old)
+  if not used then
+    return {0, ''}
+  end
+  local fkey = 'refresh_family:' .. used
+  local cur = redis.call('HGET', fkey, 'current')
+  local fuid = redis.call('HGET', fkey, 'user_id')
+  if cur then redis.call('DEL', 'refresh:' .. cur) end
+  redis.call('DEL', fkey)
+  if fuid then redis.call('SREM', 'refresh_user:' .. fuid, used) end
+  return {-1, fuid or ''}
+end
+redis.call('DEL', tkey)
+redis.call('SET', 'refresh_used:' .. old, family, 'EX', ttl)
+redis.call('HSET', 'refresh:' .. new, 'user_id', uid, 'family', family)
+redis.call('EXPIRE', 'refresh:' .. new, ttl)
+redis.call('HSET', 'refresh_family:' .. family, 'user_id', uid, 'current', new)
+redis.call('EXPIRE', 'refresh_family:' .. family, ttl)
+redis.call('SADD', 'refresh_user:' .. uid, family)
+redis.call('EXPIRE', 'refresh_user:' .. uid, ttl)
+return {1, uid}
+"""
+
+_REVOKE_LUA = """
+local tkey = 'refresh:' .. ARGV[1]
+if redis.call('TYPE', tkey)['ok'] == 'hash' then
+  local uid = redis.call('HGET', tkey, 'user_id')
+  local family = redis.call('HGET', tkey, 'family')
+  redis.call('DEL', 'refresh_family:' .. family)
+  redis.call('SREM', 'refresh_user:' .. uid, family)
+end
+return redis.call('DEL', tkey)
+"""
+
+_REVOKE_USER_LUA = """
+local ukey = 'refresh_user:' .. ARGV[1]
+local families = redis.call('SMEMBERS', ukey)
+for _, family in ipairs(families) do
+  local fkey = 'refresh_family:' .. family
+  local cur = redis.call('HGET', fkey, 'current')
+  if cur then redis.call('DEL', 'refresh:' .. cur) end
+  redis.call('DEL', fkey)
+end
+redis.call('DEL', ukey)
+return #families
+"""
+
+
+async def _script(source: str):
+    # Script сам кэширует sha и шлёт EVALSHA, при NOSCRIPT — повторяет через EVAL
+    redis = await get_redis()
+    return redis.register_script(source)
+
+
+async def issue(user_id: int) -> str:
+    """Новый вход: новый токен в новом семействе."""
+    token = create_refresh_token()
+    family = uuid.uuid4().hex
+    script = await _script(_ISSUE_LUA)
+    await script(args=[token, family, user_id, REFRESH_TTL])
+    return token
+
+
+async def rotate(token: str) -> tuple[int, str] | None:
+    """Обменять токен на новый. Возвращает (user_id, new_token) или None, если токен недействителен."""
+    new_token = create_refresh_token()
+    script = await _script(_ROTATE_LUA)
+    status, uid = await script(args=[token, new_token, REFRESH_TTL])
+    status = int(status)
+    if status == 1:
+        return int(uid), new_token
+    if status == -1:
+        logger.warning("refresh token reuse detected, family revoked user_id=%s", uid or "?")
+    return None
+
+
+async def revoke(token: str) -> None:
+    script = await _script(_REVOKE_LUA)
+    await script(args=[token])
+
+
+async def revoke_all(user_id: int) -> int:
+    """Отозвать все сессии пользователя. Возвращает число отозванных семейств."""
+    script = await _script(_REVOKE_USER_LUA)
+    return int(await script(args=[user_id]))
@@ -8,8 +8,10 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.realtime.chat_hub import broadcast_chat_message, push_offline_room_members
+from app.services.active_users import get_active_user_ids
+from app.services.tenant_settings import get_tenant_settings, notify_changed
 from app.core.database import AsyncSessionLocal
-from app.models.chat import ChatRoom, ChatRoomMember, ChatMessage
+from app.models.chat import ChatRoom, ChatMessage
 from app.models.form import FormTemplate
 from app.models.report import BrigadierReport, FormResponse, Report
 from app.models.tenant import TenantSettings
@@ -163,14 +165,21 @@ def format_brig_message(r: BrigadierReport, *, edited: bool = False) -> str:
 
 
 async def get_or_create_reports_feed_room(db: AsyncSession) -> int | None:
+    cached = await get_tenant_settings(db)
+    if not cached:
+        logger.warning("tenant_settings id=1 missing")
+        return None
+    # Горячий путь: комната уже есть — ни одного запроса
+    if cached.reports_feed_room_id:
+        return cached.reports_feed_room_id
+
     ts = (await db.execute(select(TenantSettings).where(TenantSettings.id == 1))).scalar_one_or_none()
     if not ts:
-        logger.warning("tenant_settings id=1 missing")
         return None
 
     if ts.reports_feed_room_id:
-        chk = await db.execute(select(ChatRoom.id).where(ChatRoom.id == ts.reports_feed_room_id))
-        if chk.scalar_one_or_none():
+        if await db.get(ChatRoom, ts.reports_feed_room_id):
+            await notify_changed()
             return ts.reports_feed_room_id
 
     existing = await db.execute(
@@ -180,6 +189,7 @@ async def get_or_create_reports_feed_room(db: AsyncSession) -> int | None:
     if ex:
         ts.reports_feed_room_id = ex.id
         await db.commit()
+        await notify_changed()
         return ex.id
 
     first_u = await db.execute(select(User.id).where(User.is_active == True).order_by(User.id.asc()).limit(1))
@@ -187,17 +197,15 @@ async def get_or_create_reports_feed_room(db: AsyncSession) -> int | None:
     if not creator:
         return None
 
+    # Участники ленты — все активные пользователи (см. app.services.active_users), строк membership не храним
     room = ChatRoom(name=REPORTS_FEED_NAME, type="group", created_by=creator)
     db.add(room)
     await db.flush()
 
-    users_res = await db.execute(select(User.id).where(User.is_active == True))
-    for (uid,) in users_res.all():
-        db.add(ChatRoomMember(room_id=room.id, user_id=uid))
-
     ts.reports_feed_room_id = room.id
     await db.commit()
     await db.refresh(room)
+    await notify_changed()
     return room.id
 
 
@@ -215,6 +223,7 @@ async def post_feed_message(db: AsyncSession, room_id: int, sender_id: int, cont
         title=sender_name or "TerraApp",
         body=content,
         db=db,
+        member_ids=await get_active_user_ids(),
     )
 
 
@@ -390,23 +399,3 @@ async def announce_brig_edit(report_id: int, sender_id: int) -> None:
             await post_feed_message(db, room_id, sender_id, text)
     except Exception:
         logger.exception("announce_brig_edit failed report_id=%s", report_id)
-
-
-async def add_user_to_reports_feed_if_exists(db: AsyncSession, user_id: int) -> None:
-    """Вызывать после регистрации: добавить в «Отчётность», если комната уже есть."""
-    try:
-        ts = (await db.execute(select(TenantSettings).where(TenantSettings.id == 1))).scalar_one_or_none()
-        if not ts or not ts.reports_feed_room_id:
-            return
-        rid = ts.reports_feed_room_id
-        exists = await db.execute(
-            select(ChatRoomMember).where(
-                ChatRoomMember.room_id == rid, ChatRoomMember.user_id == user_id
-            )
-        )
-        if exists.scalar_one_or_none():
-            return
-        db.add(ChatRoomMember(room_id=rid, user_id=user_id))
-        await db.commit()
-    except Exception:
-        logger.exception("add_user_to_reports_feed_if_exists user_id=%s", user_id)
@@ -0,0 +1,301 @@
+"""Инкрементальная выгрузка отчётов ОТД и бригадиров в Google Sheets.
+
+Триггеры на reports/brigadier_reports пишут id изменённых строк в sheets_changes.
+Синхронизация читает журнал порциями по возрастанию id, для каждой порции
+отправляет один values:batchUpdate и в одной транзакции сохраняет карту
+«отчёт → строка листа» и удаляет ровно обработанные записи журнала. Курсора по id нет:
+id журнала выдаются внутри транзакций пишущих, и те могут закоммититься не по порядку —
+запись с меньшим id, видимая позже, просто попадёт в следующую порцию.
+
+Новые отчёты пишутся в заранее выбранные строки (sheets_sync_state.next_row), а не
+через values:append: если воркер упадёт после записи в Sheets, но до commit, повтор
+перезапишет те же строки, а не добавит дубликаты. Удалённый отчёт — очищенная строка.
+Запись за пределы сетки листа (у нового листа 1000 строк) API отклоняет, поэтому перед
+такой порцией сетка наращивается с запасом GRID_GROW_ROWS (updateSheetProperties).
+
+Запросы к API проходят через token bucket (SHEETS_WRITES_PER_MINUTE), на 429/5xx —
+повтор с экспоненциальной паузой.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+import aiohttp
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.models.report import BrigadierReport, Report
+from app.models.sheets_sync import SheetsChange, SheetsSyncRow, SheetsSyncState
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+LOCK_KEY = "sheets_sync:lock"
+MAX_ATTEMPTS = 6
+GRID_GROW_ROWS = 5000
+
+# Снять блокировку, только если она всё ещё наша: прогон, переживший TTL, не должен
+# удалить блокировку следующего
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _cell(value) -> str | int | float:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+@dataclass(frozen=True)
+class SheetSpec:
+    model: type
+    spreadsheet_id: Callable[[], str]
+    sheet: Callable[[], str]
+    header: tuple[str, ...]
+    values: Callable[[object], list]
+
+
+KINDS: dict[str, SheetSpec] = {
+    "otd": SheetSpec(
+        model=Report,
+        spreadsheet_id=lambda: settings.SHEETS_OTD_SPREADSHEET_ID,
+        sheet=lambda: settings.SHEETS_OTD_SHEET,
+        header=(
+            "ID", "Дата", "Сотрудник", "Логин", "Локация", "Группа локации", "Вид работ", "Группа работ",
+            "Часы", "Техника", "Машина", "Культура", "Рейсы", "Создан (UTC)",
+        ),
+        values=lambda r: [_cell(v) for v in (
+            r.id, r.work_date, r.reg_name, r.username, r.location, r.location_grp, r.activity, r.activity_grp,
+            r.hours, r.machine_type, r.machine_name, r.crop, r.trips, r.created_at,
+        )],
+    ),
+    "brig": SheetSpec(
+        model=BrigadierReport,
+        spreadsheet_id=lambda: settings.SHEETS_BRIG_SPREADSHEET_ID,
+        sheet=lambda: settings.SHEETS_BRIG_SHEET,
+        header=("ID", "Дата", "Логин", "Вид работ", "Поле", "Смена", "Рядов", "Мешков", "Рабочих", "Создан (UTC)"),
+        values=lambda r: [_cell(v) for v in (
+            r.id, r.work_date, r.username, r.work_type, r.field, r.shift, r.rows, r.bags, r.workers, r.created_at,
+        )],
+    ),
+}
+
+
+class TokenBucket:
+    """rate токенов в минуту, не больше capacity про запас."""
+
+    def __init__(self, rate_per_minute: int, capacity: int | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SheetsClient:
+    def __init__(self, session: aiohttp.ClientSession, bucket: TokenBucket):
+        self.session = session
+        self.bucket = bucket
+        self._credentials = None
+        self.requests = 0
+        self.throttled = 0
+
+    async def _auth_headers(self) -> dict[str, str]:
+        # Без файла сервисного аккаунта запросы идут без авторизации — так работает локальный фейк
+        if not os.path.exists(settings.GOOGLE_SERVICE_ACCOUNT_FILE):
+            return {}
+        if self._credentials is None:
+            from google.oauth2 import service_account
+
+            self._credentials = service_account.Credentials.from_service_account_file(
+                settings.GOOGLE_SERVICE_ACCOUNT_FILE, scopes=SCOPES
+            )
+        if not self._credentials.valid:
+            from google.auth.transport.requests import Request
+
+            await asyncio.to_thread(self._credentials.refresh, Request())
+        return {"Authorization": f"Bearer {self._credentials.token}"}
+
+    async def _request(self, method: str, path: str, body: dict | None = None) -> dict:
+        url = f"{settings.SHEETS_API_BASE_URL}/v4/spreadsheets/{path}"
+        delay = 1.0
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self.bucket.acquire()
+            self.requests += 1
+            async with self.session.request(
+                method, url, json=body, headers=await self._auth_headers(), timeout=aiohttp.ClientTimeout(total=60)
+            ) as resp:
+                if resp.status < 300:
+                    return await resp.json()
+                text = await resp.text()
+                if resp.status != 429 and resp.status < 500:
+                    raise RuntimeError(f"Sheets API {resp.status}: {text[:500]}")
+                if resp.status == 429:
+                    self.throttled += 1
+                retry_after = resp.headers.get("Retry-After")
+            if attempt == MAX_ATTEMPTS:
+                raise RuntimeError(f"Sheets API {resp.status} after {attempt} attempts: {text[:500]}")
+            wait = max(delay, float(retry_after)) if retry_after and retry_after.isdigit() else delay
+            logger.warning("Sheets API %s, retry in %.1fs (attempt %d)", resp.status, wait, attempt)
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, 64.0)
+
+    async def batch_update(self, spreadsheet_id: str, data: list[dict]) -> None:
+        await self._request(
+            "POST", f"{spreadsheet_id}/values:batchUpdate", {"valueInputOption": "RAW", "data": data}
+        )
+
+    async def grid(self, spreadsheet_id: str, sheet: str) -> tuple[int, int]:
+        """(sheetId, число строк сетки) листа sheet."""
+        meta = await self._request(
+            "GET", f"{spreadsheet_id}?fields=sheets.properties(sheetId,title,gridProperties.rowCount)"
+        )
+        for item in meta.get("sheets", []):
+            props = item["properties"]
+            if props["title"] == sheet:
+                return props["sheetId"], props["gridProperties"]["rowCount"]
+        raise RuntimeError(f"sheet {sheet!r} not found in spreadsheet {spreadsheet_id}")
+
+    async def set_row_count(self, spreadsheet_id: str, sheet_id: int, rows: int) -> None:
+        # Абсолютное число строк, а не appendDimension: повтор после таймаута не нарастит сетку дважды
+        await self._request("POST", f"{spreadsheet_id}:batchUpdate", {"requests": [{
+            "updateSheetProperties": {
+                "properties": {"sheetId": sheet_id, "gridProperties": {"rowCount": rows}},
+                "fields": "gridProperties.rowCount",
+            },
+        }]})
+
+
+def _a1(sheet: str, row: int) -> str:
+    return "'{}'!A{}".format(sheet.replace("'", "''"), row)
+
+
+async def sync_kind(db: AsyncSession, client: SheetsClient, kind: str) -> int:
+    """Выгрузить накопившиеся изменения одного вида отчётов. Возвращает число обработанных записей журнала."""
+    spec = KINDS[kind]
+    spreadsheet_id = spec.spreadsheet_id()
+    if not spreadsheet_id:
+        return 0
+    sheet = spec.sheet()
+    blank = [""] * len(spec.header)
+
+    state = await db.get(SheetsSyncState, kind)
+    if state is None:
+        state = SheetsSyncState(kind=kind, next_row=2)
+        db.add(state)
+        await client.batch_update(spreadsheet_id, [{"range": _a1(sheet, 1), "values": [list(spec.header)]}])
+        await db.commit()
+    sheet_id, grid_rows = await client.grid(spreadsheet_id, sheet)
+
+    processed = 0
+    while True:
+        changes = (await db.execute(
+            select(SheetsChange.id, SheetsChange.record_id)
+            .where(SheetsChange.kind == kind)
+            .order_by(SheetsChange.id)
+            .limit(settings.SHEETS_SYNC_BATCH)
+        )).all()
+        if not changes:
+            break
+        record_ids = list(dict.fromkeys(c.record_id for c in changes))
+
+        records = {
+            r.id: r
+            for r in (await db.execute(select(spec.model).where(spec.model.id.in_(record_ids)))).scalars()
+        }
+        rows = dict((await db.execute(
+            select(SheetsSyncRow.record_id, SheetsSyncRow.sheet_row)
+            .where(SheetsSyncRow.kind == kind, SheetsSyncRow.record_id.in_(record_ids))
+        )).all())
+
+        data: list[dict] = []
+        placed: list[dict] = []
+        removed: list[int] = []
+        next_row = state.next_row
+        for record_id in record_ids:
+            record = records.get(record_id)
+            sheet_row = rows.get(record_id)
+            if record is None:
+                if sheet_row is not None:
+                    data.append({"range": _a1(sheet, sheet_row), "values": [blank]})
+                    removed.append(record_id)
+                continue
+            if sheet_row is None:
+                sheet_row = next_row
+                next_row += 1
+                placed.append({"kind": kind, "record_id": record_id, "sheet_row": sheet_row})
+            data.append({"range": _a1(sheet, sheet_row), "values": [spec.values(record)]})
+
+        if next_row - 1 > grid_rows:
+            grid_rows = next_row - 1 + GRID_GROW_ROWS
+            await client.set_row_count(spreadsheet_id, sheet_id, grid_rows)
+        if data:
+            await client.batch_update(spreadsheet_id, data)
+
+        if placed:
+            await db.execute(pg_insert(SheetsSyncRow).values(placed).on_conflict_do_nothing())
+        if removed:
+            await db.execute(
+                delete(SheetsSyncRow).where(SheetsSyncRow.kind == kind, SheetsSyncRow.record_id.in_(removed))
+            )
+        await db.execute(delete(SheetsChange).where(SheetsChange.id.in_([c.id for c in changes])))
+        state.next_row = next_row
+        state.synced_at = datetime.now(timezone.utc)
+        await db.commit()
+        processed += len(changes)
+    return processed
+
+
+async def run_sync() -> dict[str, int]:
+    """Один проход по всем видам. Параллельный запуск (второй воркер, ручной вызов) пропускается."""
+    redis = await get_redis()
+    token = uuid.uuid4().hex
+    if not await redis.set(LOCK_KEY, token, nx=True, ex=3600):
+        logger.info("sheets sync already running, skipped")
+        return {}
+    result: dict[str, int] = {}
+    started = time.perf_counter()
+    try:
+        bucket = TokenBucket(settings.SHEETS_WRITES_PER_MINUTE)
+        async with aiohttp.ClientSession() as session, AsyncSessionLocal() as db:
+            client = SheetsClient(session, bucket)
+            for kind in KINDS:
+                result[kind] = await sync_kind(db, client, kind)
+        logger.info(
+            "sheets sync done in %.1fs: %s, requests=%d throttled=%d",
+            time.perf_counter() - started, result, client.requests, client.throttled,
+        )
+    finally:
+        await redis.register_script(_RELEASE_LUA)(keys=[LOCK_KEY], args=[token])
+    return result
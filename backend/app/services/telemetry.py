@@ -0,0 +1,344 @@
+"""Приём GPS-точек от Traccar и дневные сводки моточасов по машинам.
+
+Traccar пересылает точки (forward.url, forward.json=true) на POST /telemetry/positions;
+допускается и пакет — список таких объектов. Точки пишутся COPY в telemetry_positions
+(секции по месяцам создаются здесь же при первой записи). Затронутые пары
+(устройство, день) копятся в Redis-множестве и пересчитываются воркером
+(rollup_dirty): интервал между соседними точками засчитывается в моточасы/движение
+по флагам предыдущей точки, если он не длиннее TELEMETRY_MAX_GAP_SECONDS.
+Если у полей (Location) заданы контуры, тот же проход по дню раскладывает трек
+на отрезки пребывания в полях (telemetry_dwell) — из них строятся подсказки для ОТД.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.models.dictionary import Location
+from app.models.telemetry import TelemetryDaily, TelemetryDevice, TelemetryDwell, telemetry_positions
+from app.services.geofence import DwellTracker, GeofenceIndex, get_index
+from app.services.partitions import ensure_months, month_start
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = "telemetry:dirty"
+FLAG_IGNITION = 1
+FLAG_MOTION = 2
+KNOTS_TO_DKMH = 18.52          # узлы Traccar → 0.1 км/ч
+MOTION_SPEED_DKMH = 20         # без атрибута motion: движется, если быстрее 2 км/ч
+
+COLUMNS = ["device_id", "fix_time", "lat_e6", "lon_e6", "speed", "course", "flags"]
+
+# unique_id -> telemetry_devices.id
+_device_ids: dict[str, int] = {}
+# "YYYYMM" секций, которые уже точно есть
+_partitions: set[str] = set()
+
+
+@dataclass(slots=True)
+class Position:
+    unique_id: str
+    device_name: str | None
+    fix_time: datetime
+    lat_e6: int
+    lon_e6: int
+    speed: int
+    course: int
+    flags: int
+
+
+def _tz() -> ZoneInfo:
+    return ZoneInfo(settings.TELEMETRY_TIMEZONE)
+
+
+def _parse_time(value) -> datetime:
+    if isinstance(value, (int, float)):
+        # Traccar в некоторых форматах шлёт миллисекунды
+        return datetime.fromtimestamp(value / 1000 if value > 1e11 else value, tz=timezone.utc)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_item(item: dict) -> Position:
+    """Одна точка: формат пересылки Traccar {"position": {...}, "device": {...}} или плоский объект."""
+    pos = item.get("position", item)
+    device = item.get("device") or {}
+    attrs = pos.get("attributes") or {}
+    unique_id = device.get("uniqueId") or pos.get("uniqueId") or pos.get("deviceId")
+    if unique_id is None:
+        raise ValueError("no device id")
+    speed = int(round(float(pos.get("speed") or 0) * KNOTS_TO_DKMH))
+    motion = attrs.get("motion", pos.get("motion"))
+    if motion is None:
+        motion = speed >= MOTION_SPEED_DKMH
+    ignition = attrs.get("ignition", pos.get("ignition"))
+    if ignition is None:
+        ignition = motion
+    return Position(
+        unique_id=str(unique_id)[:64],
+        device_name=device.get("name"),
+        fix_time=_parse_time(pos.get("fixTime") or pos.get("deviceTime") or pos["serverTime"]),
+        lat_e6=int(round(float(pos["latitude"]) * 1_000_000)),
+        lon_e6=int(round(float(pos["longitude"]) * 1_000_000)),
+        speed=min(speed, 32767),
+        course=int(float(pos.get("course") or 0)) % 360,
+        flags=(FLAG_IGNITION if ignition else 0) | (FLAG_MOTION if motion else 0),
+    )
+
+
+def parse_payload(payload) -> tuple[list[Position], int]:
+    """Разобрать тело запроса. Возвращает (точки, число отброшенных)."""
+    if isinstance(payload, dict):
+        items = payload.get("positions", [payload])
+    elif isinstance(payload, list):
+        items = payload
+    else:
+        return [], 1
+    positions: list[Position] = []
+    rejected = 0
+    for item in items:
+        try:
+            positions.append(parse_item(item))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            rejected += 1
+    return positions, rejected
+
+
+async def _resolve_devices(db: AsyncSession, positions: list[Position]) -> None:
+    missing: dict[str, str | None] = {}
+    for p in positions:
+        if p.unique_id not in _device_ids:
+            missing.setdefault(p.unique_id, p.device_name)
+    if not missing:
+        return
+    result = await db.execute(
+        pg_insert(TelemetryDevice)
+        .values([{"unique_id": uid, "name": name, "machine_name": name} for uid, name in missing.items()])
+        .on_conflict_do_update(index_elements=["unique_id"], set_={"unique_id": TelemetryDevice.unique_id})
+        .returning(TelemetryDevice.id, TelemetryDevice.unique_id)
+    )
+    for device_id, unique_id in result.all():
+        _device_ids[unique_id] = device_id
+
+
+async def ensure_partitions(fix_times) -> None:
+    """Создать месячные секции под переданные моменты времени (UTC-границы)."""
+    months = {month_start(t.astimezone(timezone.utc).date()) for t in fix_times}
+    todo = [m for m in months if m.strftime("%Y%m") not in _partitions]
+    if not todo:
+        return
+    await ensure_months("telemetry_positions", todo)
+    _partitions.update(m.strftime("%Y%m") for m in todo)
+
+
+async def ingest(db: AsyncSession, positions: list[Position]) -> int:
+    """Записать точки одним COPY и пометить затронутые дни на пересчёт."""
+    if not positions:
+        return 0
+    await ensure_partitions(p.fix_time for p in positions)
+    await _resolve_devices(db, positions)
+    records = [
+        (_device_ids[p.unique_id], p.fix_time, p.lat_e6, p.lon_e6, p.speed, p.course, p.flags)
+        for p in positions
+    ]
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table("telemetry_positions", records=records, columns=COLUMNS)
+    await db.commit()
+
+    tz = _tz()
+    dirty = {f"{rec[0]}:{rec[1].astimezone(tz).date().isoformat()}" for rec in records}
+    try:
+        redis = await get_redis()
+        await redis.sadd(DIRTY_KEY, *dirty)
+    except Exception:
+        logger.warning("telemetry dirty-days mark failed (%d days)", len(dirty), exc_info=True)
+    return len(records)
+
+
+_ROLLUP_SQL = text(
+    """
+    WITH p AS (
+        SELECT fix_time, flags,
+               EXTRACT(EPOCH FROM lead(fix_time) OVER (ORDER BY fix_time) - fix_time) AS dt
+        FROM telemetry_positions
+        WHERE device_id = :device_id AND fix_time >= :start AND fix_time < :end
+    )
+    INSERT INTO telemetry_daily
+        (device_id, day, engine_seconds, motion_seconds, positions, first_fix, last_fix, updated_at)
+    SELECT :device_id, :day,
+           COALESCE(SUM(dt) FILTER (WHERE flags & 1 = 1 AND dt <= :max_gap), 0)::int,
+           COALESCE(SUM(dt) FILTER (WHERE flags & 2 = 2 AND dt <= :max_gap), 0)::int,
+           COUNT(*), MIN(fix_time), MAX(fix_time), now()
+    FROM p
+    ON CONFLICT (device_id, day) DO UPDATE SET
+        engine_seconds = EXCLUDED.engine_seconds,
+        motion_seconds = EXCLUDED.motion_seconds,
+        positions = EXCLUDED.positions,
+        first_fix = EXCLUDED.first_fix,
+        last_fix = EXCLUDED.last_fix,
+        updated_at = EXCLUDED.updated_at
+    """
+)
+
+
+async def rollup_day(db: AsyncSession, device_id: int, day: date) -> None:
+    start, end = _day_bounds(day)
+    await db.execute(_ROLLUP_SQL, {
+        "device_id": device_id,
+        "day": day,
+        "start": start,
+        "end": end,
+        "max_gap": settings.TELEMETRY_MAX_GAP_SECONDS,
+    })
+
+
+def _day_bounds(day: date) -> tuple[datetime, datetime]:
+    tz = _tz()
+    return (
+        datetime.combine(day, dt_time.min, tzinfo=tz),
+        datetime.combine(day + timedelta(days=1), dt_time.min, tzinfo=tz),
+    )
+
+
+async def dwell_day(db: AsyncSession, index: GeofenceIndex, device_id: int, day: date) -> int:
+    """Пересобрать отрезки пребывания машины в полях за день. Точки читаются потоком."""
+    start, end = _day_bounds(day)
+    tracker = DwellTracker(index)
+    feed = tracker.feed
+    stream = await db.stream(
+        select(
+            telemetry_positions.c.fix_time,
+            telemetry_positions.c.lon_e6,
+            telemetry_positions.c.lat_e6,
+            telemetry_positions.c.flags,
+        )
+        .where(
+            telemetry_positions.c.device_id == device_id,
+            telemetry_positions.c.fix_time >= start,
+            telemetry_positions.c.fix_time < end,
+        )
+        .order_by(telemetry_positions.c.fix_time)
+        .execution_options(yield_per=10000)
+    )
+    async for partition in stream.partitions():
+        for fix_time, lon_e6, lat_e6, flags in partition:
+            feed(fix_time, lon_e6, lat_e6, flags)
+    segments = tracker.finish()
+
+    await db.execute(delete(TelemetryDwell).where(TelemetryDwell.device_id == device_id, TelemetryDwell.day == day))
+    if segments:
+        await db.execute(insert(TelemetryDwell), [
+            {
+                "device_id": device_id,
+                "location_id": s.location_id,
+                "day": day,
+                "start_time": s.start,
+                "end_time": s.end,
+                "engine_seconds": int(s.engine_seconds),
+                "motion_seconds": int(s.motion_seconds),
+            }
+            for s in segments
+        ])
+    return len(segments)
+
+
+async def rollup_dirty(batch: int = 500) -> int:
+    """Пересчитать сводки за все дни, в которые пришли точки. Возвращает число пересчитанных дней."""
+    redis = await get_redis()
+    done = 0
+    while True:
+        members = await redis.spop(DIRTY_KEY, batch)
+        if not members:
+            return done
+        try:
+            async with AsyncSessionLocal() as db:
+                index = await get_index(db)
+                for member in members:
+                    device_id, day = member.split(":", 1)
+                    await rollup_day(db, int(device_id), date.fromisoformat(day))
+                    if index.size:
+                        await dwell_day(db, index, int(device_id), date.fromisoformat(day))
+                await db.commit()
+        except Exception:
+            await redis.sadd(DIRTY_KEY, *members)
+            raise
+        done += len(members)
+
+
+async def machine_hours(
+    db: AsyncSession,
+    machine_names,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> dict[tuple[str, date], tuple[float, float]]:
+    """(machine_name, day) -> (моточасы, часы движения) по всем трекерам машины."""
+    names = {n for n in machine_names if n}
+    if not names:
+        return {}
+    q = (
+        select(TelemetryDevice.machine_name, TelemetryDaily.day, TelemetryDaily.engine_seconds, TelemetryDaily.motion_seconds)
+        .join(TelemetryDaily, TelemetryDaily.device_id == TelemetryDevice.id)
+        .where(TelemetryDevice.machine_name.in_(names))
+    )
+    if date_from:
+        q = q.where(TelemetryDaily.day >= date_from)
+    if date_to:
+        q = q.where(TelemetryDaily.day <= date_to)
+    hours: dict[tuple[str, date], tuple[float, float]] = {}
+    for name, day, engine_s, motion_s in (await db.execute(q)).all():
+        prev_engine, prev_motion = hours.get((name, day), (0.0, 0.0))
+        hours[(name, day)] = (prev_engine + engine_s / 3600, prev_motion + motion_s / 3600)
+    return {k: (round(e, 2), round(m, 2)) for k, (e, m) in hours.items()}
+
+
+async def field_suggestions(db: AsyncSession, machine_name: str, day: date) -> list[dict]:
+    """Подсказка для ОТД: в каких полях и сколько моточасов машина провела за день."""
+    rows = await db.execute(
+        select(
+            Location.id,
+            Location.name,
+            Location.grp,
+            TelemetryDwell.engine_seconds,
+            TelemetryDwell.motion_seconds,
+            TelemetryDwell.start_time,
+            TelemetryDwell.end_time,
+        )
+        .join(TelemetryDevice, TelemetryDevice.id == TelemetryDwell.device_id)
+        .join(Location, Location.id == TelemetryDwell.location_id)
+        .where(TelemetryDevice.machine_name == machine_name, TelemetryDwell.day == day)
+        .order_by(TelemetryDwell.start_time)
+    )
+    by_location: dict[int, dict] = {}
+    for loc_id, name, grp, engine_s, motion_s, start, end in rows.all():
+        item = by_location.setdefault(loc_id, {
+            "location_id": loc_id,
+            "location": name,
+            "location_grp": grp,
+            "engine_seconds": 0,
+            "motion_seconds": 0,
+            "start": start,
+            "end": end,
+        })
+        item["engine_seconds"] += engine_s
+        item["motion_seconds"] += motion_s
+        item["end"] = max(item["end"], end)
+    out = []
+    for item in by_location.values():
+        engine_s = item.pop("engine_seconds")
+        motion_s = item.pop("motion_seconds")
+        # В ОТД часы вводятся с шагом 0.5
+        item["hours"] = round(engine_s / 1800) / 2
+        item["motion_hours"] = round(motion_s / 3600, 2)
+        out.append(item)
+    return sorted(out, key=lambda i: i["hours"], reverse=True)
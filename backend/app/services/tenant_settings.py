@@ -0,0 +1,117 @@
+"""Кэш строки tenant_settings (id=1) в памяти процесса.
+
+Настройки читаются на каждом анонсе отчёта и в списке комнат, а меняются
+единицами раз за всё время жизни компании. Каждый воркер держит копию; после
+изменения вызывается notify_changed(), и все воркеры сбрасывают кэш через
+Redis pub/sub. TENANT_SETTINGS_CACHE_SECONDS — страховка на случай пропущенного
+уведомления (например, правка в обход API).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.models.tenant import TenantSettings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "tenant_settings:changed"
+
+
+@dataclass(frozen=True)
+class TenantSettingsView:
+    company_name: str
+    reports_feed_room_id: int | None
+
+
+# (значение или None, если строки нет; момент протухания)
+_cached: tuple[TenantSettingsView | None, float] | None = None
+_listener_task: asyncio.Task | None = None
+
+
+async def _load(db: AsyncSession) -> TenantSettingsView | None:
+    row = (await db.execute(select(TenantSettings).where(TenantSettings.id == 1))).scalar_one_or_none()
+    if row is None:
+        return None
+    return TenantSettingsView(
+        company_name=row.company_name or "",
+        reports_feed_room_id=row.reports_feed_room_id,
+    )
+
+
+async def get_tenant_settings(db: AsyncSession | None = None) -> TenantSettingsView | None:
+    """Текущие настройки без запроса к БД, пока кэш свежий. None — строки id=1 нет."""
+    global _cached
+    now = time.monotonic()
+    if _cached is not None and _cached[1] > now:
+        return _cached[0]
+    if db is not None:
+        view = await _load(db)
+    else:
+        async with AsyncSessionLocal() as own_db:
+            view = await _load(own_db)
+    _cached = (view, now + settings.TENANT_SETTINGS_CACHE_SECONDS)
+    return view
+
+
+def invalidate() -> None:
+    global _cached
+    _cached = None
+
+
+async def notify_changed() -> None:
+    """Вызывать после commit изменений tenant_settings."""
+    invalidate()
+    try:
+        redis = await get_redis()
+        await redis.publish(CHANNEL, "1")
+    except Exception:
+        logger.warning("tenant settings change publish failed", exc_info=True)
+
+
+async def _listen() -> None:
+    while True:
+        try:
+            redis = await get_redis()
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(CHANNEL)
+            # Пока не были подписаны, могли пропустить изменение
+            invalidate()
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        invalidate()
+            finally:
+                await pubsub.reset()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("tenant settings listener error, reconnecting", exc_info=True)
+            await asyncio.sleep(5)
+
+
+def start_listener() -> None:
+    global _listener_task
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen())
+
+
+async def stop_listener() -> None:
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_task.cancel()
+    try:
+        await _listener_task
+    except asyncio.CancelledError:
+        pass
+    _listener_task = None
@@ -0,0 +1,45 @@
+"""Кэш «user_id → full_name» для подписей к сообщениям чата.
+
+Имена меняются редко, а нужны на каждой странице истории — держим их в памяти процесса
+с TTL и сбрасываем запись при изменении имени (PATCH /users/me, PATCH /users/{id}).
+"""
+
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+
+TTL_SECONDS = 300
+
+# user_id -> (full_name, момент протухания)
+_cache: dict[int, tuple[str | None, float]] = {}
+
+
+async def get_user_names(db: AsyncSession, user_ids) -> dict[int, str | None]:
+    now = time.monotonic()
+    names: dict[int, str | None] = {}
+    missing: list[int] = []
+    for uid in set(user_ids):
+        if uid is None:
+            continue
+        hit = _cache.get(uid)
+        if hit is not None and hit[1] > now:
+            names[uid] = hit[0]
+        else:
+            missing.append(uid)
+
+    if missing:
+        result = await db.execute(select(User.id, User.full_name).where(User.id.in_(missing)))
+        expires = now + TTL_SECONDS
+        for uid, full_name in result.all():
+            names[uid] = full_name
+            _cache[uid] = (full_name, expires)
+    return names
+
+
+def invalidate_user_name(user_id: int) -> None:
+    _cache.pop(user_id, None)
@@ -2,6 +2,8 @@
 import logging
 from datetime import date, timedelta
 from arq import cron
+from arq.connections import RedisSettings
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +33,42 @@ async def daily_export(ctx):
             logger.info("Daily export done: %s (%d reports)", filepath, len(reports))
 
 
+async def sync_sheets(ctx):
+    """Выгрузить изменённые отчёты в Google Sheets (см. app/services/sheets_sync.py)."""
+    from app.services.sheets_sync import run_sync
+
+    await run_sync()
+
+
+async def rollup_telemetry(ctx):
+    """Пересчитать дневные моточасы по дням, в которые пришли новые точки."""
+    from app.services.telemetry import rollup_dirty
+
+    days = await rollup_dirty()
+    if days:
+        logger.info("Telemetry rollup: %d device-days", days)
+
+
+async def maintain_partitions(ctx):
+    """Месячные секции наперёд и архив старых (см. app/services/partitions.py)."""
+    from app.services.partitions import maintain
+
+    summary = await maintain()
+    if summary["archived"]:
+        logger.info("Partitions archived: %s", ", ".join(summary["archived"]))
+
+
 async def startup(ctx):
+    if settings.SQL_STATS_ENABLED:
+        from app.core import query_stats
+        from app.core.database import engine
+
+        query_stats.install(engine)
+    if settings.METRICS_WORKER_PORT:
+        # Длительности выгрузок и прочие метрики воркера — на отдельном порту
+        from prometheus_client import start_http_server
+
+        start_http_server(settings.METRICS_WORKER_PORT)
     logger.info("ARQ worker started")
 
 
@@ -40,10 +77,21 @@ async def shutdown(ctx):
 
 
 class WorkerSettings:
-    functions = [daily_export]
+    functions = [daily_export, sync_sheets, rollup_telemetry, maintain_partitions]
     on_startup = startup
     on_shutdown = shutdown
     cron_jobs = [
-        cron(daily_export, hour=2, minute=0)  # runs daily at 02:00
+        cron(daily_export, hour=2, minute=0),  # runs daily at 02:00
+        cron(
+            sync_sheets,
+            minute=set(range(0, 60, max(1, settings.SHEETS_SYNC_INTERVAL_MINUTES))),
+            timeout=3600,
+        ),
+        cron(
+            rollup_telemetry,
+            minute=set(range(0, 60, max(1, settings.TELEMETRY_ROLLUP_INTERVAL_MINUTES))),
+            timeout=1800,
+        ),
+        cron(maintain_partitions, hour=3, minute=30, timeout=6 * 3600),
     ]
-    redis_settings = None  # set from config at runtime
+    redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
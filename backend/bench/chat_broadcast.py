@@ -0,0 +1,108 @@
+"""Нагрузочный тест рассылки чата с медленными клиентами (без БД и сети).
+
+Запуск из backend/:
+    python -m bench.chat_broadcast --clients 300 --slow 10 --stuck 2 --messages 200
+
+Быстрые клиенты должны получить все сообщения почти сразу, независимо от медленных;
+зависшие клиенты должны быть отключены по переполнению очереди или таймауту.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.realtime import chat_hub
+
+ROOM_ID = 1
+
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0, stuck: bool = False):
+        self.delay = delay
+        self.stuck = stuck
+        self.received = 0
+        self.latencies: list[float] = []
+        self.closed_code: int | None = None
+
+    async def send_text(self, text: str) -> None:
+        if self.stuck:
+            await asyncio.sleep(3600)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        sent_at = json.loads(text)["content"]
+        self.latencies.append(time.perf_counter() - float(sent_at))
+        self.received += 1
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_code = code
+
+
+def _pct(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(args) -> dict:
+    settings.WS_SEND_QUEUE_SIZE = args.queue
+    settings.WS_SEND_TIMEOUT_SECONDS = args.timeout
+
+    fast = [FakeSocket() for _ in range(args.clients - args.slow - args.stuck)]
+    slow = [FakeSocket(delay=args.slow_delay) for _ in range(args.slow)]
+    stuck = [FakeSocket(stuck=True) for _ in range(args.stuck)]
+    for uid, ws in enumerate(fast + slow + stuck, start=1):
+        chat_hub.register_socket(uid, ws)
+        chat_hub.subscribe(uid, ws, [ROOM_ID])
+
+    started = time.perf_counter()
+    for i in range(args.messages):
+        msg = SimpleNamespace(
+            id=i, sender_id=0, content=repr(time.perf_counter()), created_at=datetime.now(timezone.utc),
+        )
+        await chat_hub.broadcast_chat_message(ROOM_ID, msg, "bench")
+        await asyncio.sleep(args.interval)
+    broadcast_s = time.perf_counter() - started
+
+    # Даём быстрым клиентам дочитать очередь
+    deadline = time.perf_counter() + 5
+    while time.perf_counter() < deadline and any(ws.received < args.messages for ws in fast):
+        await asyncio.sleep(0.01)
+
+    fast_lat = [lat for ws in fast for lat in ws.latencies]
+    result = {
+        "clients": args.clients,
+        "messages": args.messages,
+        "broadcast_seconds": round(broadcast_s, 3),
+        "fast_delivered_ratio": round(sum(ws.received for ws in fast) / (len(fast) * args.messages), 4) if fast else None,
+        "fast_latency_ms_p50": round(statistics.median(fast_lat) * 1000, 3) if fast_lat else None,
+        "fast_latency_ms_p99": round(_pct(fast_lat, 0.99) * 1000, 3),
+        "slow_evicted": sum(1 for ws in slow if ws.closed_code is not None),
+        "stuck_evicted": sum(1 for ws in stuck if ws.closed_code is not None),
+        "hub": chat_hub.hub_stats(),
+    }
+    for uid, ws in enumerate(fast + slow + stuck, start=1):
+        chat_hub.unregister_socket(uid, ws)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--slow", type=int, default=10, help="клиенты с задержкой --slow-delay на кадр")
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--stuck", type=int, default=2, help="клиенты, у которых send не завершается")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.001, help="пауза между сообщениями, с")
+    parser.add_argument("--queue", type=int, default=settings.WS_SEND_QUEUE_SIZE)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Бенчмарк записи сообщений чата: по одному (старый путь ws_chat) против пакетного буфера.
+
+Нужен доступный Postgres из .env (DB_*) с применёнными миграциями и хотя бы одним пользователем.
+Запуск из backend/:
+    python -m bench.chat_write --senders 50 --messages 20
+
+Создаёт временную комнату без участников (пушей нет), после прогона удаляет её.
+Выводит JSON: сообщений в секунду и p50/p99 задержки от отправки до фиксации.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import delete, select
+
+from app.core.database import AsyncSessionLocal, engine
+from app.models.chat import ChatMessage, ChatRoom
+from app.models.user import User
+from app.realtime import message_buffer
+from app.realtime.chat_hub import broadcast_chat_message, push_offline_room_members
+
+
+async def _direct(room_id: int, user_id: int, content: str) -> None:
+    """Копия прежнего пути: своя сессия, commit, refresh, рассылка, пуш на каждое сообщение."""
+    async with AsyncSessionLocal() as db:
+        msg = ChatMessage(room_id=room_id, sender_id=user_id, content=content)
+        db.add(msg)
+        await db.commit()
+        await db.refresh(msg)
+        await broadcast_chat_message(room_id, msg, "bench")
+        await push_offline_room_members(room_id, user_id, "bench", content, db)
+
+
+async def _buffered(room_id: int, user_id: int, content: str) -> None:
+    row = await message_buffer.submit(room_id, user_id, "bench", content)
+    if row is None:
+        raise RuntimeError("batch write failed")
+
+
+async def _run_mode(send, room_id: int, user_id: int, senders: int, messages: int) -> dict:
+    latencies: list[float] = []
+
+    async def sender(n: int) -> None:
+        for i in range(messages):
+            t0 = time.perf_counter()
+            await send(room_id, user_id, f"bench {n}/{i}")
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(sender(n) for n in range(senders)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    total = senders * messages
+    return {
+        "messages": total,
+        "seconds": round(elapsed, 3),
+        "messages_per_sec": round(total / elapsed, 1),
+        "latency_ms_p50": round(statistics.median(latencies) * 1000, 2),
+        "latency_ms_p99": round(latencies[min(total - 1, int(total * 0.99))] * 1000, 2),
+    }
+
+
+async def run(args) -> dict:
+    async with AsyncSessionLocal() as db:
+        user_id = (await db.execute(select(User.id).order_by(User.id).limit(1))).scalar_one_or_none()
+        if user_id is None:
+            raise SystemExit("В базе нет пользователей — создайте их (create_admin.py)")
+        room = ChatRoom(name="bench-chat-write", type="group", created_by=user_id)
+        db.add(room)
+        await db.commit()
+        room_id = room.id
+
+    try:
+        result = {
+            "senders": args.senders,
+            "direct": await _run_mode(_direct, room_id, user_id, args.senders, args.messages),
+            "buffered": await _run_mode(_buffered, room_id, user_id, args.senders, args.messages),
+        }
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(ChatMessage).where(ChatMessage.room_id == room_id))
+            await db.execute(delete(ChatRoom).where(ChatRoom.id == room_id))
+            await db.commit()
+        await engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--senders", type=int, default=50, help="одновременных отправителей")
+    parser.add_argument("--messages", type=int, default=20, help="сообщений на отправителя")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
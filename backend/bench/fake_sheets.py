@@ -0,0 +1,174 @@
+"""Локальный фейк Google Sheets API для проверки синхронизации: values:batchUpdate,
+values.get, метаданные листов и spreadsheets:batchUpdate (updateSheetProperties, appendDimension).
+
+Запуск из backend/:
+    python -m bench.fake_sheets --port 8090 --quota 60
+
+и в .env: SHEETS_API_BASE_URL=http://127.0.0.1:8090, SHEETS_OTD_SPREADSHEET_ID=otd,
+SHEETS_BRIG_SPREADSHEET_ID=brig. Таблицы хранятся в памяти. --quota — лимит запросов
+в минуту, сверх него отвечает 429 с Retry-After, как настоящий API. Как и настоящий,
+фейк держит размер сетки листа (--grid-rows строк, по умолчанию 1000 — как у нового листа)
+и отвечает 400 на запись за её пределами или в неизвестный лист.
+Состояние: GET /v4/spreadsheets/{id}/values/{sheet} и GET /_stats.
+"""
+import argparse
+import re
+import time
+from collections import deque
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+_A1 = re.compile(r"^(?:'((?:[^']|'')*)'|([^!]+))!A(\d+)$")
+
+
+def _bad_request(message: str) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"error": {"code": 400, "status": "INVALID_ARGUMENT", "message": message}})
+
+
+def create_app(quota_per_minute: int = 0, sheets: tuple[str, ...] = ("Sheet1",), grid_rows: int = 1000) -> FastAPI:
+    app = FastAPI()
+    # spreadsheet_id -> sheet -> row -> values
+    grids: dict[str, dict[str, dict[int, list]]] = {}
+    # spreadsheet_id -> sheet -> свойства листа (sheetId, rowCount, columnCount);
+    # таблица появляется при первом обращении с листами sheets
+    props: dict[str, dict[str, dict]] = {}
+    calls: deque[float] = deque()
+    stats = {"requests": 0, "throttled": 0, "cells": 0, "grid_updates": 0}
+
+    def _sheets(spreadsheet_id: str) -> dict[str, dict]:
+        if spreadsheet_id not in props:
+            props[spreadsheet_id] = {
+                title: {"sheetId": i, "rowCount": grid_rows, "columnCount": 26} for i, title in enumerate(sheets)
+            }
+        return props[spreadsheet_id]
+
+    def _throttled() -> JSONResponse | None:
+        stats["requests"] += 1
+        retry_after = _retry_after()
+        if not retry_after:
+            return None
+        stats["throttled"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}},
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def _retry_after() -> int:
+        """0 — запрос в пределах квоты, иначе через сколько секунд освободится место."""
+        if not quota_per_minute:
+            return 0
+        now = time.monotonic()
+        while calls and calls[0] < now - 60:
+            calls.popleft()
+        if len(calls) >= quota_per_minute:
+            return max(1, int(calls[0] + 60 - now) + 1)
+        calls.append(now)
+        return 0
+
+    @app.post("/v4/spreadsheets/{spreadsheet_id}/values:batchUpdate")
+    async def batch_update(spreadsheet_id: str, request: Request):
+        if (throttled := _throttled()) is not None:
+            return throttled
+        body = await request.json()
+        sheet_props = _sheets(spreadsheet_id)
+        # Как в API: запрос проверяется целиком до записи
+        for item in body.get("data", []):
+            m = _A1.match(item["range"])
+            if not m:
+                return _bad_request(f"Unable to parse range: {item['range']}")
+            sheet = (m.group(1) or "").replace("''", "'") or m.group(2)
+            if sheet not in sheet_props:
+                return _bad_request(f"Unable to parse range: {item['range']}")
+            last = int(m.group(3)) + len(item["values"]) - 1
+            width = max((len(v) for v in item["values"]), default=0)
+            if last > sheet_props[sheet]["rowCount"] or width > sheet_props[sheet]["columnCount"]:
+                return _bad_request(f"Range ({item['range']}) exceeds grid limits. Max rows: "
+                                    f"{sheet_props[sheet]['rowCount']}, max columns: {sheet_props[sheet]['columnCount']}")
+        spreadsheet = grids.setdefault(spreadsheet_id, {})
+        updated = 0
+        for item in body.get("data", []):
+            m = _A1.match(item["range"])
+            sheet = (m.group(1) or "").replace("''", "'") or m.group(2)
+            start = int(m.group(3))
+            grid = spreadsheet.setdefault(sheet, {})
+            for offset, values in enumerate(item["values"]):
+                grid[start + offset] = list(values)
+                updated += len(values)
+        stats["cells"] += updated
+        return {"spreadsheetId": spreadsheet_id, "totalUpdatedCells": updated}
+
+    @app.post("/v4/spreadsheets/{spreadsheet_id}:batchUpdate")
+    async def spreadsheet_batch_update(spreadsheet_id: str, request: Request):
+        if (throttled := _throttled()) is not None:
+            return throttled
+        body = await request.json()
+        by_id = {p["sheetId"]: p for p in _sheets(spreadsheet_id).values()}
+        for req in body.get("requests", []):
+            if "updateSheetProperties" in req:
+                new = req["updateSheetProperties"]["properties"]
+                target = by_id.get(new.get("sheetId"))
+                rows = new.get("gridProperties", {}).get("rowCount")
+            elif "appendDimension" in req and req["appendDimension"].get("dimension") == "ROWS":
+                target = by_id.get(req["appendDimension"].get("sheetId"))
+                rows = target["rowCount"] + req["appendDimension"]["length"] if target else None
+            else:
+                return _bad_request(f"unsupported request {sorted(req)}")
+            if target is None:
+                return _bad_request("No grid with id")
+            if rows is not None:
+                target["rowCount"] = rows
+        stats["grid_updates"] += 1
+        return {"spreadsheetId": spreadsheet_id, "replies": [{} for _ in body.get("requests", [])]}
+
+    @app.get("/v4/spreadsheets/{spreadsheet_id}")
+    async def get_spreadsheet(spreadsheet_id: str):
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "sheets": [
+                {"properties": {
+                    "sheetId": p["sheetId"],
+                    "title": title,
+                    "gridProperties": {"rowCount": p["rowCount"], "columnCount": p["columnCount"]},
+                }}
+                for title, p in _sheets(spreadsheet_id).items()
+            ],
+        }
+
+    @app.get("/v4/spreadsheets/{spreadsheet_id}/values/{sheet}")
+    async def get_values(spreadsheet_id: str, sheet: str):
+        grid = grids.get(spreadsheet_id, {}).get(sheet, {})
+        last = max(grid, default=0)
+        return {"range": sheet, "values": [grid.get(row, []) for row in range(1, last + 1)]}
+
+    @app.get("/_stats")
+    async def get_stats():
+        return {
+            **stats,
+            "rows": {sid: {s: len(g) for s, g in sheets.items()} for sid, sheets in grids.items()},
+        }
+
+    app.state.grids = grids
+    app.state.props = props
+    app.state.stats = stats
+    return app
+
+
+def main():
+    import uvicorn
+
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--quota", type=int, default=60, help="запросов в минуту, 0 — без лимита")
+    parser.add_argument("--grid-rows", type=int, default=1000, help="строк в сетке нового листа")
+    args = parser.parse_args()
+    app = create_app(args.quota, (settings.SHEETS_OTD_SHEET, settings.SHEETS_BRIG_SHEET), args.grid_rows)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
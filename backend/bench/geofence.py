@@ -0,0 +1,119 @@
+"""Бенчмарк индекса геозон и потокового разбиения треков на отрезки по полям (без БД).
+
+Запуск из backend/:
+    python -m bench.geofence --fields 500 --points 2000000
+
+Генерирует --fields непересекающихся выпуклых полей по --vertices вершин на участке
+~50×50 км и трек, который ходит между полями. Проверяет индекс против полного перебора
+на --check точках и печатает JSON: точек в секунду у поиска и у DwellTracker,
+во сколько раз быстрее перебора всех полей.
+"""
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services.geofence import DwellTracker, GeofenceIndex, _pip
+
+AREA_E6 = 450_000   # ~50 км
+
+
+def _fields(n: int, vertices: int, rnd: random.Random) -> dict[int, list[list[tuple[int, int]]]]:
+    side = math.ceil(math.sqrt(n))
+    step = AREA_E6 // side
+    fields = {}
+    for i in range(n):
+        cx = (i % side) * step + step // 2
+        cy = (i // side) * step + step // 2
+        r = step * 0.45
+        ring = []
+        for k in range(vertices):
+            a = 2 * math.pi * k / vertices
+            rr = r * rnd.uniform(0.8, 1.0)
+            ring.append((int(cx + rr * math.cos(a)), int(cy + rr * 0.9 * math.sin(a))))
+        fields[i + 1] = [ring]
+    return fields
+
+
+def _track(n: int, rnd: random.Random):
+    x, y = AREA_E6 // 2, AREA_E6 // 2
+    for _ in range(n):
+        x = min(max(x + rnd.randint(-60, 60), 0), AREA_E6)
+        y = min(max(y + rnd.randint(-60, 60), 0), AREA_E6)
+        yield x, y
+
+
+def _naive(fields, x, y):
+    for location_id, rings in fields.items():
+        edges = [
+            (ring[i][0], ring[i][1], ring[(i + 1) % len(ring)][0], ring[(i + 1) % len(ring)][1])
+            for ring in rings for i in range(len(ring))
+        ]
+        if _pip(x, y, edges):
+            return location_id
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fields", type=int, default=500)
+    parser.add_argument("--vertices", type=int, default=40)
+    parser.add_argument("--points", type=int, default=2_000_000)
+    parser.add_argument("--check", type=int, default=2000, help="точек для сверки с полным перебором")
+    parser.add_argument("--cell", type=int, default=500, help="шаг сетки, микроградусы")
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    fields = _fields(args.fields, args.vertices, rnd)
+
+    started = time.perf_counter()
+    index = GeofenceIndex(fields, cell=args.cell)
+    build_s = time.perf_counter() - started
+
+    points = list(_track(args.points, rnd))
+
+    mismatches = 0
+    started = time.perf_counter()
+    for x, y in points[: args.check]:
+        if _naive(fields, x, y) != index.locate(x, y):
+            mismatches += 1
+    naive_rate = args.check / (time.perf_counter() - started)
+
+    locate = index.locate
+    started = time.perf_counter()
+    inside = 0
+    for x, y in points:
+        if locate(x, y) is not None:
+            inside += 1
+    locate_s = time.perf_counter() - started
+
+    tracker = DwellTracker(index, max_gap=300)
+    t0 = datetime(2001, 1, 1, tzinfo=timezone.utc)
+    second = timedelta(seconds=1)
+    started = time.perf_counter()
+    t = t0
+    for x, y in points:
+        tracker.feed(t, x, y, 3)
+        t += second
+    segments = tracker.finish(min_dwell=60)
+    track_s = time.perf_counter() - started
+
+    print(json.dumps({
+        "fields": args.fields,
+        "cells": len(index._cells),
+        "build_seconds": round(build_s, 3),
+        "points": args.points,
+        "points_inside": inside,
+        "mismatches_vs_naive": mismatches,
+        "naive_points_per_sec": round(naive_rate),
+        "locate_points_per_sec": round(args.points / locate_s),
+        "tracker_points_per_sec": round(args.points / track_s),
+        "speedup_vs_naive": round(args.points / locate_s / naive_rate, 1),
+        "segments": len(segments),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Нагрузочный прогон основных сценариев API по данным bench.seed.
+
+Нужен запущенный API (локальные Postgres и Redis) и `python -m bench.seed`. Запуск из backend/:
+    python -m bench.load --url http://127.0.0.1:8000 --duration 60 --otd 50 --admin 2 --ws-clients 300
+    python -m bench.load --scenarios otd --otd 200 --duration 120 --out results/$(git rev-parse --short HEAD).json
+
+Сценарии идут одновременно, каждый своим числом виртуальных пользователей:
+  otd   — вход → /dictionaries → /forms?fields=summary (с If-None-Match) → POST /reports → /reports/feed;
+          с --reuse-token вход один раз на пользователя, иначе на каждой итерации, как при старте приложения;
+  admin — /admin/otd-feed за последние 30 дней сезона, раз в --export-every итераций — выгрузки Excel;
+  chat  — --ws-clients сокетов /chat/ws подписаны на bench-room-0, --ws-senders из них пишут
+          сообщение раз в --ws-interval с; задержка доставки меряется по метке времени в тексте.
+
+Итог — JSON: по каждой операции число, ошибки (по кодам), запросов в секунду и задержки
+p50/p90/p99/max в мс, плюс commit и параметры прогона — чтобы сравнивать коммиты и подбирать VPS.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+import websockets
+
+PREFIX = "bench_"
+API = "/api/v1"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, op: str, seconds: float, error: str | None = None) -> None:
+        if error is None:
+            self.latencies[op].append(seconds)
+        else:
+            self.errors[op][error] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        out = {}
+        for op in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[op])
+            errors = self.errors[op]
+
+            def pct(p: float) -> float | None:
+                return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 1) if values else None
+
+            out[op] = {
+                "count": len(values),
+                "errors": sum(errors.values()),
+                "error_kinds": dict(errors),
+                "per_sec": round(len(values) / elapsed, 1) if elapsed else None,
+                "p50_ms": pct(0.50),
+                "p90_ms": pct(0.90),
+                "p99_ms": pct(0.99),
+                "max_ms": round(values[-1] * 1000, 1) if values else None,
+            }
+        return out
+
+
+async def _call(client: httpx.AsyncClient, rec: Recorder, op: str, method: str, path: str,
+                expect=(200,), **kwargs) -> httpx.Response | None:
+    started = time.perf_counter()
+    try:
+        resp = await client.request(method, API + path, **kwargs)
+    except httpx.HTTPError as e:
+        rec.add(op, time.perf_counter() - started, error=type(e).__name__)
+        return None
+    elapsed = time.perf_counter() - started
+    rec.add(op, elapsed, error=None if resp.status_code in expect else str(resp.status_code))
+    return resp if resp.status_code in expect else None
+
+
+async def _login(client, rec, login: str, password: str) -> str | None:
+    resp = await _call(client, rec, "login", "POST", "/auth/login", json={"login": login, "password": password})
+    return resp.json()["access_token"] if resp is not None else None
+
+
+async def otd_user(args, client, rec: Recorder, deadline: float, rnd: random.Random) -> None:
+    login = f"{PREFIX}u{rnd.randrange(args.users)}"
+    token = None
+    forms_etag = None
+    while time.perf_counter() < deadline:
+        if token is None or not args.reuse_token:
+            token = await _login(client, rec, login, args.password)
+            if token is None:
+                await asyncio.sleep(1)
+                continue
+        auth = {"Authorization": f"Bearer {token}"}
+
+        resp = await _call(client, rec, "dictionaries", "GET", "/dictionaries", headers=auth)
+        if resp is None:
+            continue
+        dicts = resp.json()
+
+        headers = {**auth, "If-None-Match": forms_etag} if forms_etag else auth
+        resp = await _call(client, rec, "forms_summary", "GET", "/forms", expect=(200, 304),
+                           params={"fields": "summary"}, headers=headers)
+        if resp is not None:
+            forms_etag = resp.headers.get("etag", forms_etag)
+
+        activity = rnd.choice(dicts["activities"]) if dicts["activities"] else {"name": "bench", "grp": "ручная"}
+        location = rnd.choice(dicts["locations"]) if dicts["locations"] else {"name": "bench", "grp": "поля"}
+        # Даты после сезона seed, чтобы не упираться в лимит 24 ч/день у засеянных дней
+        work_date = date.today() + timedelta(days=rnd.randint(1, 365))
+        await _call(client, rec, "submit_otd", "POST", "/reports", expect=(201,), headers=auth, json={
+            "work_date": work_date.isoformat(),
+            "hours": rnd.choice((1, 2, 3)),
+            "location": location["name"], "location_grp": location["grp"],
+            "activity": activity["name"], "activity_grp": activity["grp"],
+        })
+
+        await _call(client, rec, "feed", "GET", "/reports/feed", params={"limit": 50}, headers=auth)
+        if args.think:
+            await asyncio.sleep(rnd.uniform(0, args.think * 2))
+
+
+async def admin_user(args, client, rec: Recorder, deadline: float, rnd: random.Random) -> None:
+    token = await _login(client, rec, f"{PREFIX}admin", args.password)
+    if token is None:
+        return
+    auth = {"Authorization": f"Bearer {token}"}
+    season_end = date.fromisoformat(args.season_end) if args.season_end else date.today() - timedelta(days=1)
+    iteration = 0
+    while time.perf_counter() < deadline:
+        await _call(client, rec, "admin_otd_feed", "GET", "/admin/otd-feed", headers=auth, params={
+            "date_from": (season_end - timedelta(days=30)).isoformat(),
+            "date_to": season_end.isoformat(),
+            "limit": 500,
+        })
+        iteration += 1
+        if args.export_every and iteration % args.export_every == 0:
+            week = {"date_from": (season_end - timedelta(days=6)).isoformat(), "date_to": season_end.isoformat()}
+            month = {"date_from": (season_end - timedelta(days=29)).isoformat(), "date_to": season_end.isoformat()}
+            await _call(client, rec, "export_otd", "POST", "/export/excel/otd", params=week, headers=auth)
+            await _call(client, rec, "export_accounting", "POST", "/export/excel/accounting", params=month, headers=auth)
+        if args.think:
+            await asyncio.sleep(rnd.uniform(0, args.think * 2))
+
+
+async def _room_id(client, rec, token: str) -> int | None:
+    resp = await _call(client, rec, "chat_rooms", "GET", "/chat/rooms", headers={"Authorization": f"Bearer {token}"})
+    if resp is None:
+        return None
+    return next((r["id"] for r in resp.json() if r["name"] == "bench-room-0"), None)
+
+
+async def chat_scenario(args, client, rec: Recorder, deadline: float) -> dict:
+    """Сокеты слушателей, затем отправители; возвращает счётчики доставки."""
+    sem = asyncio.Semaphore(args.login_concurrency)
+
+    async def login(n: int) -> str | None:
+        async with sem:
+            return await _login(client, rec, f"{PREFIX}u{n}", args.password)
+
+    tokens = [t for t in await asyncio.gather(*(login(n) for n in range(args.ws_clients))) if t]
+    if not tokens:
+        return {"listeners": 0}
+    room_id = await _room_id(client, rec, tokens[0])
+    if room_id is None:
+        return {"listeners": 0, "error": "bench-room-0 not found, run bench.seed"}
+
+    ws_base = args.url.replace("http://", "ws://").replace("https://", "wss://") + API + "/chat/ws"
+    counters = {"sent": 0, "delivered": 0, "listeners": 0}
+    ready = asyncio.Event()
+    connected = 0
+
+    async def listener(token: str, sender: bool, rnd: random.Random) -> None:
+        nonlocal connected
+        started = time.perf_counter()
+        try:
+            async with websockets.connect(f"{ws_base}?token={token}", max_size=None) as ws:
+                await ws.send(json.dumps({"type": "subscribe", "room_ids": [room_id]}))
+                while json.loads(await ws.recv()).get("type") != "subscribed":
+                    pass
+                rec.add("ws_connect", time.perf_counter() - started)
+                counters["listeners"] += 1
+                connected += 1
+                if connected == len(tokens):
+                    ready.set()
+                await asyncio.wait_for(ready.wait(), timeout=60)
+
+                async def send_loop():
+                    while time.perf_counter() < deadline:
+                        await asyncio.sleep(rnd.uniform(0, args.ws_interval * 2))
+                        await ws.send(json.dumps({
+                            "type": "message", "room_id": room_id, "content": f"bench-load {time.time():.6f}",
+                        }))
+                        counters["sent"] += 1
+
+                send_task = asyncio.create_task(send_loop()) if sender else None
+                try:
+                    while True:
+                        remaining = deadline + args.drain - time.perf_counter()
+                        if remaining <= 0:
+                            break
+                        try:
+                            frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=remaining))
+                        except asyncio.TimeoutError:
+                            break
+                        content = frame.get("content") or ""
+                        if frame.get("type") == "message" and content.startswith("bench-load "):
+                            rec.add("ws_delivery", time.time() - float(content.split()[1]))
+                            counters["delivered"] += 1
+                finally:
+                    if send_task is not None:
+                        send_task.cancel()
+        except (OSError, websockets.WebSocketException, asyncio.TimeoutError) as e:
+            rec.add("ws_connect", time.perf_counter() - started, error=type(e).__name__)
+            connected += 1
+            if connected == len(tokens):
+                ready.set()
+
+    rnd = random.Random(args.seed + 1)
+    await asyncio.gather(*(
+        listener(token, i < args.ws_senders, random.Random(rnd.random())) for i, token in enumerate(tokens)
+    ))
+    expected = counters["sent"] * counters["listeners"]
+    return {**counters, "delivered_ratio": round(counters["delivered"] / expected, 4) if expected else None}
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run(args) -> dict:
+    scenarios = {s.strip() for s in args.scenarios.split(",") if s.strip()}
+    rec = Recorder()
+    rnd = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.otd + args.admin + args.login_concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        tasks = []
+        if "otd" in scenarios:
+            tasks += [otd_user(args, client, rec, deadline, random.Random(rnd.random())) for _ in range(args.otd)]
+        if "admin" in scenarios:
+            tasks += [admin_user(args, client, rec, deadline, random.Random(rnd.random())) for _ in range(args.admin)]
+        chat = asyncio.create_task(chat_scenario(args, client, rec, deadline)) if "chat" in scenarios else None
+        await asyncio.gather(*tasks)
+        chat_result = await chat if chat is not None else None
+        elapsed = time.perf_counter() - started
+
+    result = {
+        "commit": _commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "url": args.url,
+        "scenarios": sorted(scenarios),
+        "params": {k: v for k, v in vars(args).items() if k not in ("url", "scenarios", "out", "password")},
+        "elapsed_seconds": round(elapsed, 1),
+        "operations": rec.summary(elapsed),
+    }
+    if chat_result is not None:
+        result["chat"] = chat_result
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default="otd,admin,chat")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--otd", type=int, default=50, help="виртуальных пользователей сценария otd")
+    parser.add_argument("--admin", type=int, default=2, help="виртуальных администраторов")
+    parser.add_argument("--reuse-token", action="store_true", help="otd: входить один раз, а не на каждой итерации")
+    parser.add_argument("--think", type=float, default=0.0, help="средняя пауза между итерациями, с")
+    parser.add_argument("--export-every", type=int, default=10, help="admin: выгрузки раз в N итераций (0 — без)")
+    parser.add_argument("--ws-clients", type=int, default=200, help="сокетов в bench-room-0 (не больше --big-room seed)")
+    parser.add_argument("--ws-senders", type=int, default=10)
+    parser.add_argument("--ws-interval", type=float, default=1.0, help="средний интервал сообщений отправителя, с")
+    parser.add_argument("--drain", type=float, default=3.0, help="ожидание доставки после конца прогона, с")
+    parser.add_argument("--login-concurrency", type=int, default=20, help="параллельных входов при подключении сокетов")
+    parser.add_argument("--users", type=int, default=3000, help="как --users у bench.seed")
+    parser.add_argument("--season-end", default=None, help="как --season-end у bench.seed")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="дополнительно записать JSON в файл")
+    args = parser.parse_args()
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
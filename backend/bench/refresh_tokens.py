@@ -0,0 +1,90 @@
+"""Нагрузочный тест хранилища refresh-токенов (нужен Redis из .env).
+
+Запуск из backend/:
+    python -m bench.refresh_tokens --users 200 --sessions 3 --rotations 20 --concurrency 100
+
+Каждая сессия последовательно ротирует свой токен; сессии идут параллельно.
+В конце для всех пользователей вызывается revoke_all и проверяется, что ни один
+из последних токенов больше не обменивается. Ключи пользователей bench живут
+в диапазоне user_id от --base-user-id и удаляются revoke_all.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.core.redis import close_redis
+from app.services import refresh_tokens
+
+
+def _pct(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(args) -> dict:
+    user_ids = [args.base_user_id + i for i in range(args.users)]
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    started = time.perf_counter()
+    tokens = await asyncio.gather(*(
+        refresh_tokens.issue(uid) for uid in user_ids for _ in range(args.sessions)
+    ))
+    issue_s = time.perf_counter() - started
+
+    async def session(token: str) -> str:
+        nonlocal failures
+        for _ in range(args.rotations):
+            async with sem:
+                t0 = time.perf_counter()
+                rotated = await refresh_tokens.rotate(token)
+                latencies.append(time.perf_counter() - t0)
+            if rotated is None:
+                failures += 1
+                return token
+            token = rotated[1]
+        return token
+
+    started = time.perf_counter()
+    last_tokens = await asyncio.gather(*(session(t) for t in tokens))
+    rotate_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    revoked = await asyncio.gather(*(refresh_tokens.revoke_all(uid) for uid in user_ids))
+    revoke_s = time.perf_counter() - started
+
+    survivors = sum(1 for r in await asyncio.gather(*(refresh_tokens.rotate(t) for t in last_tokens)) if r)
+    await close_redis()
+
+    return {
+        "sessions": len(tokens),
+        "issue_per_sec": round(len(tokens) / issue_s, 1) if issue_s else None,
+        "rotations": len(latencies),
+        "rotate_failures": failures,
+        "rotate_per_sec": round(len(latencies) / rotate_s, 1) if rotate_s else None,
+        "rotate_ms_p50": round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        "rotate_ms_p99": round(_pct(latencies, 0.99) * 1000, 3),
+        "revoke_all_seconds": round(revoke_s, 3),
+        "families_revoked": sum(revoked),
+        "tokens_alive_after_revoke": survivors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=3, help="входов на пользователя")
+    parser.add_argument("--rotations", type=int, default=20, help="ротаций на сессию")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--base-user-id", type=int, default=900_000_000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Набор данных для нагрузочных тестов: пользователи, сезон отчётов ОТД, ответы flow-форм и история чата.
+
+Нужен Postgres из .env с актуальными миграциями. Запуск из backend/:
+    python -m bench.seed --users 3000 --days 180
+    python -m bench.seed --cleanup            # только удалить данные bench
+
+Все логины и username начинаются с bench_ (пароль --password у всех, хэш считается один раз),
+комнаты чата — с «bench-». Администратор bench_admin и бухгалтер bench_accountant создаются
+всегда. Комната bench-room-0 содержит первых --big-room пользователей — её слушает
+сценарий chat в bench.load. Повторный запуск сначала удаляет прежние данные bench.
+
+Сезон — --days дней до --season-end (по умолчанию вчера): каждый пользователь в каждый
+день с вероятностью --work-ratio пишет 1–3 отчёта ОТД на 2–6 часов, доля --form-ratio
+из них идёт ответом flow-формы «otd» (form_responses), как у нового клиента.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from app.core.database import AsyncSessionLocal, engine
+from app.core.security import hash_password
+from app.models.chat import ChatMessage, ChatRoom, ChatRoomMember
+from app.models.dictionary import Activity, Location
+from app.models.form import FormAssignment, FormTemplate
+from app.models.report import FormResponse, Report
+from app.models.user import AuthCredential, User, UserRole
+
+PREFIX = "bench_"
+ROOM_PREFIX = "bench-"
+CHUNK = 5000
+
+_FALLBACK_ACTIVITIES = [("Вспашка", "техника"), ("Культивация", "техника"), ("Посев", "техника"),
+                        ("Прополка", "ручная"), ("Сбор урожая", "ручная"), ("Погрузка", "ручная")]
+_FALLBACK_LOCATIONS = [(f"Поле {n}", "поля") for n in range(1, 41)] + [("Склад 1", "склад"), ("Склад 2", "склад")]
+_MACHINES = [("Трактор", f"МТЗ-{n}") for n in range(1, 21)] + [("КамАЗ", f"КамАЗ-{n}") for n in range(1, 11)]
+_CROPS = ["Пшеница", "Подсолнечник", "Кукуруза", "Соя", "Ячмень"]
+
+
+def _chunks(rows: list, size: int = CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+async def cleanup() -> dict:
+    """Удалить всё, что создаёт seed: отчёты по username, пользователей (каскадом — ответы форм, роли,
+    участие в комнатах) и комнаты bench- (каскадом — сообщения)."""
+    async with engine.begin() as conn:
+        reports = (await conn.execute(delete(Report).where(Report.username.like(f"{PREFIX}%")))).rowcount
+        rooms = (await conn.execute(delete(ChatRoom).where(ChatRoom.name.like(f"{ROOM_PREFIX}%")))).rowcount
+        users = (await conn.execute(delete(User).where(User.username.like(f"{PREFIX}%")))).rowcount
+    return {"deleted_reports": reports, "deleted_rooms": rooms, "deleted_users": users}
+
+
+async def _dictionaries() -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """Справочники для отчётов: существующие, а в пустой базе — создаются небольшие."""
+    async with AsyncSessionLocal() as db:
+        activities = [tuple(r) for r in (await db.execute(select(Activity.name, Activity.grp))).all()]
+        locations = [tuple(r) for r in (await db.execute(select(Location.name, Location.grp))).all()]
+        if not activities:
+            db.add_all(Activity(name=n, grp=g, pos=i) for i, (n, g) in enumerate(_FALLBACK_ACTIVITIES))
+            activities = _FALLBACK_ACTIVITIES
+        if not locations:
+            db.add_all(Location(name=n, grp=g, pos=i) for i, (n, g) in enumerate(_FALLBACK_LOCATIONS))
+            locations = _FALLBACK_LOCATIONS
+        await db.commit()
+    return activities, locations
+
+
+async def _otd_form_id() -> int:
+    async with AsyncSessionLocal() as db:
+        form_id = (await db.execute(select(FormTemplate.id).where(FormTemplate.name == "otd"))).scalar()
+        if form_id is None:
+            from seed_forms import FORMS
+
+            spec = next(f for f in FORMS if f["name"] == "otd")
+            form = FormTemplate(name=spec["name"], title=spec["title"], schema=spec["schema"], is_active=True)
+            db.add(form)
+            await db.flush()
+            db.add_all(FormAssignment(form_id=form.id, role=role) for role in spec["roles"])
+            await db.commit()
+            form_id = form.id
+    return form_id
+
+
+async def _users(args, password_hash: str) -> tuple[list[int], int]:
+    specs = [(f"{PREFIX}admin", "Bench Admin", "admin"), (f"{PREFIX}accountant", "Bench Accountant", "accountant")]
+    for n in range(args.users):
+        role = "brigadier" if n % 20 == 19 else "user"
+        specs.append((f"{PREFIX}u{n}", f"Bench User {n}", role))
+
+    ids: list[int] = []
+    async with engine.begin() as conn:
+        for chunk in _chunks(specs):
+            result = await conn.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [{"username": login, "full_name": name, "tz": "UTC", "is_active": True} for login, name, _ in chunk],
+            )
+            chunk_ids = list(result.scalars())
+            await conn.execute(insert(AuthCredential), [
+                {"user_id": uid, "login": login, "password_hash": password_hash}
+                for uid, (login, _, _) in zip(chunk_ids, chunk)
+            ])
+            await conn.execute(insert(UserRole), [
+                {"user_id": uid, "role": role} for uid, (_, _, role) in zip(chunk_ids, chunk)
+            ])
+            ids.extend(chunk_ids)
+    return ids[2:], ids[0]
+
+
+def _season(args, user_ids, activities, locations, rnd: random.Random):
+    """Отчёты ОТД и ответы формы «otd» за сезон: (user_id, день, строка reports или None, данные формы или None)."""
+    season_end = date.fromisoformat(args.season_end) if args.season_end else date.today() - timedelta(days=1)
+    for d in range(args.days):
+        day = season_end - timedelta(days=args.days - 1 - d)
+        for n, uid in enumerate(user_ids):
+            if rnd.random() >= args.work_ratio:
+                continue
+            for _ in range(rnd.randint(1, 3)):
+                activity, activity_grp = rnd.choice(activities)
+                location, location_grp = rnd.choice(locations)
+                hours = rnd.choice((2, 3, 4, 4.5, 5, 6))
+                crop = rnd.choice(_CROPS)
+                machine_type, machine_name = rnd.choice(_MACHINES) if activity_grp == "техника" else (None, None)
+                if rnd.random() < args.form_ratio:
+                    yield uid, day, None, {
+                        "date": day.isoformat(), "hours": str(hours), "location": location, "crop": crop,
+                        "work_type": "Техника" if machine_type else "Ручная",
+                        "machine_type": machine_type,
+                        ("activity_tech" if machine_type else "activity_hand"): activity,
+                    }
+                else:
+                    yield uid, day, {
+                        "user_id": uid, "reg_name": f"Bench User {n}", "username": f"{PREFIX}u{n}",
+                        "work_date": day, "hours": hours, "location": location, "location_grp": location_grp,
+                        "activity": activity, "activity_grp": activity_grp, "machine_type": machine_type,
+                        "machine_name": machine_name, "crop": crop, "trips": rnd.randint(1, 8) if machine_type else None,
+                    }, None
+
+
+async def _reports(args, user_ids, rnd) -> tuple[int, int]:
+    activities, locations = await _dictionaries()
+    form_id = await _otd_form_id()
+    reports: list[dict] = []
+    forms: list[dict] = []
+    n_reports = n_forms = 0
+    async with engine.begin() as conn:
+        for uid, day, report, form_data in _season(args, user_ids, activities, locations, rnd):
+            submitted = datetime.combine(day, dtime(hour=rnd.randint(15, 21), minute=rnd.randint(0, 59)), timezone.utc)
+            if report is not None:
+                reports.append({**report, "created_at": submitted})
+            else:
+                forms.append({"form_id": form_id, "user_id": uid, "data": form_data, "submitted_at": submitted})
+            if len(reports) >= CHUNK:
+                await conn.execute(insert(Report), reports)
+                n_reports += len(reports)
+                reports = []
+            if len(forms) >= CHUNK:
+                await conn.execute(insert(FormResponse), forms)
+                n_forms += len(forms)
+                forms = []
+        if reports:
+            await conn.execute(insert(Report), reports)
+            n_reports += len(reports)
+        if forms:
+            await conn.execute(insert(FormResponse), forms)
+            n_forms += len(forms)
+    return n_reports, n_forms
+
+
+async def _chat(args, user_ids, admin_id, rnd) -> tuple[int, int]:
+    now = datetime.now(timezone.utc)
+    rooms: list[tuple[int, list[int]]] = []
+    async with engine.begin() as conn:
+        specs = [(f"{ROOM_PREFIX}room-0", user_ids[: args.big_room])]
+        for n in range(1, args.rooms):
+            specs.append((f"{ROOM_PREFIX}room-{n}", rnd.sample(user_ids, min(args.room_size, len(user_ids)))))
+        for name, members in specs:
+            room_id = (await conn.execute(
+                insert(ChatRoom).returning(ChatRoom.id),
+                {"name": name, "type": "group", "created_by": admin_id},
+            )).scalar_one()
+            await conn.execute(insert(ChatRoomMember), [{"room_id": room_id, "user_id": uid} for uid in members])
+            rooms.append((room_id, members))
+
+        messages: list[dict] = []
+        total = 0
+        for room_id, members in rooms:
+            start = now - timedelta(days=args.days)
+            step = timedelta(days=args.days) / max(args.messages, 1)
+            for i in range(args.messages):
+                messages.append({
+                    "room_id": room_id, "sender_id": rnd.choice(members),
+                    "content": f"bench message {i} " + "x" * rnd.randint(0, 120),
+                    "created_at": start + step * i,
+                })
+                if len(messages) >= CHUNK:
+                    await conn.execute(insert(ChatMessage), messages)
+                    total += len(messages)
+                    messages = []
+        if messages:
+            await conn.execute(insert(ChatMessage), messages)
+            total += len(messages)
+    return len(rooms), total
+
+
+async def run(args) -> dict:
+    result = await cleanup()
+    if args.cleanup:
+        await engine.dispose()
+        return result
+
+    rnd = random.Random(args.seed)
+    timings = {}
+
+    started = time.perf_counter()
+    user_ids, admin_id = await _users(args, hash_password(args.password))
+    timings["users_seconds"] = round(time.perf_counter() - started, 1)
+
+    started = time.perf_counter()
+    n_reports, n_forms = await _reports(args, user_ids, rnd)
+    timings["reports_seconds"] = round(time.perf_counter() - started, 1)
+
+    started = time.perf_counter()
+    n_rooms, n_messages = await _chat(args, user_ids, admin_id, rnd)
+    timings["chat_seconds"] = round(time.perf_counter() - started, 1)
+
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("ANALYZE users, reports, form_responses, chat_rooms, chat_room_members, chat_messages")
+    await engine.dispose()
+    return {
+        **result,
+        "users": len(user_ids),
+        "reports": n_reports,
+        "form_responses": n_forms,
+        "rooms": n_rooms,
+        "messages": n_messages,
+        "login_prefix": PREFIX,
+        "password": args.password,
+        **timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=3000)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--season-end", default=None, help="последний день сезона, YYYY-MM-DD (по умолчанию вчера)")
+    parser.add_argument("--work-ratio", type=float, default=0.6, help="доля пользователей, работающих в день")
+    parser.add_argument("--form-ratio", type=float, default=0.3, help="доля отчётов, поданных flow-формой")
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--room-size", type=int, default=30)
+    parser.add_argument("--big-room", type=int, default=1000, help="участников в bench-room-0")
+    parser.add_argument("--messages", type=int, default=2000, help="сообщений в истории каждой комнаты")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cleanup", action="store_true", help="только удалить данные bench")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Микробенчмарк сериализации больших списков (без БД и HTTP).
+
+Запуск из backend/:
+    python -m bench.serialization --rows 2000 --repeat 20
+
+На синтетических строках ORM (в памяти) сравнивает для admin/otd-feed, /reports,
+/chat/rooms/{id}/messages и /dictionaries:
+  • models — как было: Pydantic-модель на строку, затем проверка по response_model
+    и dump_json (текущий FastAPI);
+  • stdlib — то же, но с json.dumps (FastAPI до появления dump_json);
+  • fast — orm_dicts + fast_json (app/core/fast_json.py).
+Печатает JSON: мс на ответ по каждому пути, ускорение fast к models и размер тела —
+как есть, gzip и brotli (если установлен пакет brotli) с уровнями из настроек.
+Заодно проверяет, что fast отдаёт тот же JSON, что и models.
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from pydantic import TypeAdapter
+
+from app.core.compression import brotli
+from app.core.config import settings
+from app.core.fast_json import FastJSONResponse, orm_dicts
+from app.models.chat import ChatMessage
+from app.models.dictionary import Activity, Crop, CustomDict, CustomDictItem, Location, MachineItem, MachineKind
+from app.models.report import Report
+from app.schemas.chat import ChatMessageOut
+from app.schemas.dictionary import (
+    ActivityOut, CropOut, CustomDictItemOut, CustomDictOut, DictionariesOut,
+    LocationOut, MachineItemOut, MachineKindOut,
+)
+from app.schemas.report import ReportFeedItemOut, ReportOut
+
+WORDS = ["Поле", "Северное", "Культивация", "Посев", "Уборка", "Т-150", "МТЗ-82", "пшеница", "ячмень", "свёкла"]
+
+
+def _text(rnd: random.Random, n: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(n))
+
+
+def _reports(n: int, rnd: random.Random) -> list[Report]:
+    start = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    out = []
+    for i in range(n):
+        created = start + timedelta(minutes=37 * i)
+        out.append(Report(
+            id=i + 1, created_at=created, user_id=rnd.randint(1, 300), reg_name=_text(rnd, 3),
+            username=f"user{i % 300}", location=_text(rnd, 2), location_grp="поля",
+            activity=_text(rnd, 2), activity_grp=rnd.choice(["техника", "ручная"]),
+            work_date=created.date(), hours=rnd.choice([4.0, 8.0, 10.5, 12.0]),
+            machine_type=rnd.choice(["трактор", "комбайн", None]), machine_name=_text(rnd, 1),
+            crop=rnd.choice(["пшеница", "ячмень", None]), trips=rnd.choice([None, 3, 12]),
+        ))
+    return out
+
+
+def _messages(n: int, rnd: random.Random) -> list[ChatMessage]:
+    start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    return [
+        ChatMessage(
+            id=i + 1, room_id=1, sender_id=rnd.randint(1, 300), content=_text(rnd, rnd.randint(2, 25)),
+            created_at=start + timedelta(seconds=41 * i), is_deleted=False,
+        )
+        for i in range(n)
+    ]
+
+
+def _dictionaries(rnd: random.Random) -> dict[str, list]:
+    return {
+        "activities": [Activity(id=i, name=_text(rnd, 2), grp="техника", pos=i, mode="choices",
+                                options=[_text(rnd, 1) for _ in range(5)]) for i in range(120)],
+        "locations": [Location(id=i, name=_text(rnd, 2), grp="поля", pos=i) for i in range(400)],
+        "machine_kinds": [MachineKind(id=i, title=_text(rnd, 1), mode="list", pos=i) for i in range(15)],
+        "machine_items": [MachineItem(id=i, kind_id=i % 15, name=_text(rnd, 1), pos=i) for i in range(200)],
+        "crops": [Crop(name=f"{_text(rnd, 1)} {i}", pos=i) for i in range(40)],
+        "custom_dicts": [CustomDict(id=i, name=_text(rnd, 1), pos=i) for i in range(5)],
+        "custom_items": [CustomDictItem(id=i, dict_id=i % 5, value=_text(rnd, 2), pos=i) for i in range(150)],
+    }
+
+
+def _feed_models(rows):
+    return [
+        ReportFeedItemOut(
+            source="otd", id=r.id, created_at=r.created_at, user_id=r.user_id, reg_name=r.reg_name,
+            work_date=r.work_date, hours=r.hours, location=r.location, location_grp=r.location_grp,
+            activity=r.activity, activity_grp=r.activity_grp, machine_type=r.machine_type,
+            machine_name=r.machine_name, crop=r.crop, trips=r.trips, form_title=None,
+        )
+        for r in rows
+    ]
+
+
+def _dict_models(d):
+    items_map: dict[int, list] = {}
+    for ci in d["custom_items"]:
+        items_map.setdefault(ci.dict_id, []).append(ci)
+    return DictionariesOut(
+        activities=d["activities"], locations=d["locations"], machine_kinds=d["machine_kinds"],
+        machine_items=d["machine_items"], crops=d["crops"],
+        custom_dicts=[CustomDictOut(id=c.id, name=c.name, pos=c.pos, items=items_map.get(c.id, [])) for c in d["custom_dicts"]],
+    )
+
+
+def _dict_fast(d):
+    items_map: dict[int, list] = {}
+    for ci in orm_dicts(d["custom_items"], CustomDictItemOut, validate=("options",)):
+        items_map.setdefault(ci["dict_id"], []).append(ci)
+    return {
+        "activities": orm_dicts(d["activities"], ActivityOut, validate=("options",)),
+        "locations": orm_dicts(d["locations"], LocationOut, validate=("options",)),
+        "machine_kinds": orm_dicts(d["machine_kinds"], MachineKindOut, validate=("options",)),
+        "machine_items": orm_dicts(d["machine_items"], MachineItemOut),
+        "crops": orm_dicts(d["crops"], CropOut, validate=("options",)),
+        "custom_dicts": [{"id": c.id, "name": c.name, "pos": c.pos, "items": items_map.get(c.id, [])} for c in d["custom_dicts"]],
+    }
+
+
+def _messages_models(rows, names):
+    return [
+        ChatMessageOut(
+            id=m.id, room_id=m.room_id, sender_id=m.sender_id, sender_name=names.get(m.sender_id),
+            content=m.content, created_at=m.created_at, is_deleted=m.is_deleted,
+        )
+        for m in rows
+    ]
+
+
+def _messages_fast(rows, names):
+    out = orm_dicts(rows, ChatMessageOut)
+    for item in out:
+        item["sender_name"] = names.get(item["sender_id"])
+    return out
+
+
+def _paths(build_models, build_fast, response_type):
+    adapter = TypeAdapter(response_type)
+
+    def models():
+        # FastAPI: проверка по response_model (from_attributes для строк ORM) и dump_json
+        return adapter.dump_json(adapter.validate_python(build_models(), from_attributes=True))
+
+    def stdlib():
+        value = adapter.validate_python(build_models(), from_attributes=True)
+        return json.dumps(adapter.dump_python(value, mode="json"), ensure_ascii=False,
+                          allow_nan=False, separators=(",", ":")).encode()
+
+    def fast():
+        return FastJSONResponse(build_fast()).body
+
+    return {"models": models, "stdlib": stdlib, "fast": fast}
+
+
+def _time_ms(fn, repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def _sizes(body: bytes) -> dict:
+    out = {"raw": len(body), "gzip": len(gzip.compress(body, compresslevel=settings.COMPRESS_GZIP_LEVEL))}
+    if brotli is not None:
+        out["br"] = len(brotli.compress(body, quality=settings.COMPRESS_BROTLI_QUALITY))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="строк в ленте ОТД (и в /reports — min(rows, 200))")
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    reports = _reports(args.rows, rnd)
+    messages = _messages(args.messages, rnd)
+    names = {i: _text(rnd, 2) for i in range(1, 301)}
+    dictionaries = _dictionaries(rnd)
+
+    endpoints = {
+        "admin_otd_feed": _paths(lambda: _feed_models(reports),
+                                 lambda: orm_dicts(reports, ReportFeedItemOut, source="otd"),
+                                 list[ReportFeedItemOut]),
+        "list_reports": _paths(lambda: reports[:200],
+                               lambda: orm_dicts(reports[:200], ReportOut),
+                               list[ReportOut]),
+        "get_messages": _paths(lambda: _messages_models(messages, names),
+                               lambda: _messages_fast(messages, names),
+                               list[ChatMessageOut]),
+        "dictionaries": _paths(lambda: _dict_models(dictionaries),
+                               lambda: _dict_fast(dictionaries),
+                               DictionariesOut),
+    }
+
+    results = {}
+    for name, paths in endpoints.items():
+        reference = paths["models"]()
+        fast_body = paths["fast"]()
+        if json.loads(fast_body) != json.loads(reference):
+            raise SystemExit(f"{name}: fast path JSON differs from response_model output")
+        timings = {path: _time_ms(fn, args.repeat) for path, fn in paths.items()}
+        results[name] = {
+            "ms": timings,
+            "speedup_vs_models": round(timings["models"] / timings["fast"], 2) if timings["fast"] else None,
+            "bytes": _sizes(fast_body),
+        }
+
+    print(json.dumps({
+        "rows": args.rows,
+        "messages": args.messages,
+        "repeat": args.repeat,
+        "brotli": brotli is not None,
+        "endpoints": results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
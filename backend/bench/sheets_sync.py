@@ -0,0 +1,87 @@
+"""Прогон синхронизации отчётов в Google Sheets против локального фейка API.
+
+Нужен Postgres из .env с миграцией 006 и Redis. Фейк (bench/fake_sheets.py) поднимается
+в этом же процессе; реальные настройки SHEETS_* на время прогона подменяются.
+Запуск из backend/:
+    python -m bench.sheets_sync --quota 120 --writes-per-minute 100
+
+Выводит JSON: сколько записей журнала обработано, запросов к API, ответов 429,
+записей в секунду и сходится ли число строк на листах с числом отчётов в БД.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.core.redis import close_redis
+from app.models.report import BrigadierReport, Report
+from app.models.sheets_sync import SheetsSyncRow
+from app.services.sheets_sync import run_sync
+from bench.fake_sheets import create_app
+
+
+async def run(args) -> dict:
+    app = create_app(args.quota, (settings.SHEETS_OTD_SHEET, settings.SHEETS_BRIG_SHEET), args.grid_rows)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    settings.SHEETS_API_BASE_URL = f"http://127.0.0.1:{args.port}"
+    settings.SHEETS_OTD_SPREADSHEET_ID = "otd"
+    settings.SHEETS_BRIG_SPREADSHEET_ID = "brig"
+    settings.SHEETS_WRITES_PER_MINUTE = args.writes_per_minute
+    settings.SHEETS_SYNC_BATCH = args.batch
+    # Без файла сервисного аккаунта клиент не ходит за OAuth-токеном
+    settings.GOOGLE_SERVICE_ACCOUNT_FILE = "/nonexistent"
+
+    try:
+        started = time.perf_counter()
+        processed = await run_sync()
+        elapsed = time.perf_counter() - started
+
+        async with AsyncSessionLocal() as db:
+            db_counts = {
+                "otd": (await db.execute(select(func.count()).select_from(Report))).scalar_one(),
+                "brig": (await db.execute(select(func.count()).select_from(BrigadierReport))).scalar_one(),
+            }
+            mapped = dict((await db.execute(
+                select(SheetsSyncRow.kind, func.count()).group_by(SheetsSyncRow.kind)
+            )).all())
+    finally:
+        server.should_exit = True
+        await serve_task
+        await close_redis()
+        await engine.dispose()
+
+    total = sum(processed.values())
+    return {
+        "processed": processed,
+        "seconds": round(elapsed, 3),
+        "changes_per_sec": round(total / elapsed, 1) if elapsed else None,
+        "api": app.state.stats,
+        "db_reports": db_counts,
+        "mapped_rows": mapped,
+        # После полного прохода на листах ровно по строке на каждый отчёт
+        "consistent": all(mapped.get(k, 0) == db_counts[k] for k in db_counts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--quota", type=int, default=120, help="лимит фейка, запросов в минуту")
+    parser.add_argument("--writes-per-minute", type=int, default=settings.SHEETS_WRITES_PER_MINUTE)
+    parser.add_argument("--batch", type=int, default=settings.SHEETS_SYNC_BATCH)
+    parser.add_argument("--grid-rows", type=int, default=1000, help="строк в сетке листов фейка")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Реплей телеметрии: неделя точек 1 Гц для 100 машин через приём Traccar и пересчёт моточасов.
+
+Нужен Postgres из .env с миграцией 007 и Redis. Запуск из backend/:
+    python -m bench.telemetry_replay --days 7 --machines 100 --workers 4
+    python -m bench.telemetry_replay --url http://127.0.0.1:8000/api/v1 --token $TELEMETRY_INGEST_TOKEN
+
+Без --url точки идут напрямую в services.telemetry.ingest (COPY), с --url — POST
+/telemetry/positions пакетами по --batch. Каждая машина работает с 06:00 до 18:00
+(зажигание, время UTC), движется 70% этого времени, так что при TELEMETRY_TIMEZONE=UTC
+ожидаемые сводки — 12 моточасов и ~8.4 ч движения в день. Данные пишутся в неделю от --start (по умолчанию 2001 год,
+чтобы не смешиваться с реальными); --cleanup удаляет секции и устройства bench.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import delete, select, text
+
+from app.core.database import AsyncSessionLocal, engine
+from app.core.redis import close_redis
+from app.models.telemetry import TelemetryDaily, TelemetryDevice
+from app.services import telemetry
+
+PREFIX = "bench-"
+
+
+def _positions(args):
+    """Пакеты точек в порядке времени: секунда за секундой по всем машинам."""
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc)
+    step = 1.0 / args.hz
+    total_steps = int(args.days * 86400 * args.hz)
+    rnd = random.Random(42)
+    lat = [45_000_000 + rnd.randint(0, 100_000) for _ in range(args.machines)]
+    lon = [39_000_000 + rnd.randint(0, 100_000) for _ in range(args.machines)]
+    batch: list[dict] = []
+    for n in range(total_steps):
+        t = start + timedelta(seconds=n * step)
+        hour = t.hour + t.minute / 60
+        working = 6 <= hour < 18
+        for m in range(args.machines):
+            moving = working and (int(hour * 10) + m) % 10 < 7
+            if moving:
+                lat[m] += rnd.randint(-3, 3)
+                lon[m] += rnd.randint(-3, 3)
+            batch.append({
+                "uniqueId": f"{PREFIX}{m:04d}",
+                "fixTime": t.isoformat(),
+                "latitude": lat[m] / 1_000_000,
+                "longitude": lon[m] / 1_000_000,
+                "speed": 8.0 if moving else 0.0,
+                "course": rnd.randint(0, 359),
+                "attributes": {"ignition": working, "motion": moving},
+            })
+            if len(batch) >= args.batch:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+async def _ingest_direct(queue: asyncio.Queue, stats: dict) -> None:
+    while (batch := await queue.get()) is not None:
+        positions, _ = telemetry.parse_payload(batch)
+        async with AsyncSessionLocal() as db:
+            stats["rows"] += await telemetry.ingest(db, positions)
+
+
+async def _ingest_http(queue: asyncio.Queue, stats: dict, url: str, token: str) -> None:
+    async with httpx.AsyncClient(timeout=120) as client:
+        while (batch := await queue.get()) is not None:
+            resp = await client.post(
+                f"{url}/telemetry/positions",
+                content=json.dumps(batch),
+                headers={"Content-Type": "application/json", "X-Telemetry-Token": token},
+            )
+            resp.raise_for_status()
+            stats["rows"] += resp.json()["accepted"]
+
+
+async def _cleanup(args) -> None:
+    start = datetime.fromisoformat(args.start)
+    months = {(start + timedelta(days=d)).strftime("%Y%m") for d in range(int(args.days) + 1)}
+    async with engine.begin() as conn:
+        for month in sorted(months):
+            await conn.execute(text(f"DROP TABLE IF EXISTS telemetry_positions_{month}"))
+        await conn.execute(delete(TelemetryDevice).where(TelemetryDevice.unique_id.like(f"{PREFIX}%")))
+    telemetry._partitions.clear()
+    telemetry._device_ids.clear()
+
+
+async def run(args) -> dict:
+    if args.cleanup:
+        await _cleanup(args)
+
+    stats = {"rows": 0}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.workers * 2)
+    if args.url:
+        workers = [asyncio.create_task(_ingest_http(queue, stats, args.url, args.token)) for _ in range(args.workers)]
+    else:
+        workers = [asyncio.create_task(_ingest_direct(queue, stats)) for _ in range(args.workers)]
+
+    started = time.perf_counter()
+    last_report = started
+    for batch in _positions(args):
+        await queue.put(batch)
+        now = time.perf_counter()
+        if now - last_report > 5:
+            print(f"  {stats['rows']:,} rows, {stats['rows'] / (now - started):,.0f} rows/s", flush=True)
+            last_report = now
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    ingest_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    days = await telemetry.rollup_dirty()
+    rollup_s = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(TelemetryDaily.engine_seconds, TelemetryDaily.motion_seconds)
+            .join(TelemetryDevice, TelemetryDevice.id == TelemetryDaily.device_id)
+            .where(TelemetryDevice.unique_id.like(f"{PREFIX}%"))
+        )).all()
+
+    await close_redis()
+    await engine.dispose()
+    return {
+        "machines": args.machines,
+        "days": args.days,
+        "hz": args.hz,
+        "rows": stats["rows"],
+        "ingest_seconds": round(ingest_s, 1),
+        "ingest_rows_per_sec": round(stats["rows"] / ingest_s) if ingest_s else None,
+        "rollup_device_days": days,
+        "rollup_seconds": round(rollup_s, 1),
+        "engine_hours_avg": round(sum(r[0] for r in rows) / len(rows) / 3600, 2) if rows else None,
+        "motion_hours_avg": round(sum(r[1] for r in rows) / len(rows) / 3600, 2) if rows else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--machines", type=int, default=100)
+    parser.add_argument("--hz", type=float, default=1.0)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--start", default="2001-01-01")
+    parser.add_argument("--url", default=None, help="базовый URL API (…/api/v1); без него — прямой COPY")
+    parser.add_argument("--token", default="", help="X-Telemetry-Token для --url")
+    parser.add_argument("--cleanup", action="store_true", help="перед прогоном удалить данные прошлых прогонов")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
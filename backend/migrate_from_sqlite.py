@@ -1,157 +1,329 @@
 """
 Migration script: copy data from the existing SQLite (reports.db) into the new PostgreSQL.
-Run once after setting up the new backend:
+Run after setting up the new backend (alembic upgrade head):
     python migrate_from_sqlite.py --sqlite-path ../reports.db
+
+Строки читаются из SQLite порциями по --chunk-size (по rowid) и грузятся в Postgres
+через COPY во временную таблицу + INSERT ... SELECT ... ON CONFLICT DO NOTHING
+(--method insert — многострочным INSERT без COPY). Каждая порция — отдельная
+транзакция; после неё в --state-file записывается последний rowid таблицы, поэтому
+прерванный импорт можно просто запустить ещё раз — он продолжит с места остановки,
+а уже загруженные строки пропустит ON CONFLICT. Пароль по умолчанию хэшируется один раз.
+Отчёты без даты работы получают дату из created_at; если нет и её, строка пропускается
+и попадает в счётчик skipped invalid в итоге по таблице.
 """
 import asyncio
 import sqlite3
 import argparse
+import json
 import os
 import sys
-from datetime import datetime
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable
+
+import asyncpg
 
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app.core.config import settings
-from app.core.database import AsyncSessionLocal
 from app.core.security import hash_password
-from app.models.user import User, AuthCredential, UserRole
-from app.models.report import Report, BrigadierReport
-from app.models.dictionary import Activity, Location, MachineKind, MachineItem, Crop
 
+# asyncpg: не больше 32767 параметров на запрос
+_MAX_PARAMS = 32767
 
-async def migrate(sqlite_path: str, default_password: str):
-    conn = sqlite3.connect(sqlite_path)
-    conn.row_factory = sqlite3.Row
 
-    async with AsyncSessionLocal() as db:
-        # ── Users ──────────────────────────────────────────────────────────────
-        users_rows = conn.execute("SELECT * FROM users").fetchall()
-        print(f"Migrating {len(users_rows)} users...")
-        for row in users_rows:
-            existing = await db.get(User, row["user_id"])
-            if existing:
-                continue
-            user = User(
-                id=row["user_id"],
-                full_name=row.get("full_name"),
-                username=row.get("username"),
-                phone=row.get("phone"),
-                tz=row.get("tz", "UTC"),
-            )
-            db.add(user)
+def _date(value) -> date | None:
+    if value in (None, ""):
+        return None
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for parse in (lambda s: date.fromisoformat(s[:10]), lambda s: datetime.strptime(s, "%d.%m.%Y").date()):
+        try:
+            return parse(text)
+        except ValueError:
+            continue
+    return None
 
-            login = row.get("username") or row.get("phone") or str(row["user_id"])
-            cred = AuthCredential(user_id=row["user_id"], login=login, password_hash=hash_password(default_password))
-            db.add(cred)
 
-        await db.flush()
+def _int(value) -> int | None:
+    if value in (None, ""):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
 
-        # ── Roles ──────────────────────────────────────────────────────────────
-        try:
-            role_rows = conn.execute("SELECT * FROM user_roles").fetchall()
-            print(f"Migrating {len(role_rows)} roles...")
-            for row in role_rows:
-                existing = await db.get(UserRole, row["user_id"])
-                if not existing:
-                    db.add(UserRole(user_id=row["user_id"], role=row["role"]))
-            await db.flush()
-        except Exception as e:
-            print(f"Roles migration skipped: {e}")
-
-        # ── Dictionaries ───────────────────────────────────────────────────────
-        try:
-            acts = conn.execute("SELECT * FROM activities").fetchall()
-            print(f"Migrating {len(acts)} activities...")
-            for row in acts:
-                db.add(Activity(id=row["id"], name=row["name"], grp=row["grp"], pos=row.get("pos", 0)))
-            await db.flush()
-        except Exception as e:
-            print(f"Activities migration skipped: {e}")
 
-        try:
-            locs = conn.execute("SELECT * FROM locations").fetchall()
-            print(f"Migrating {len(locs)} locations...")
-            for row in locs:
-                db.add(Location(id=row["id"], name=row["name"], grp=row["grp"], pos=row.get("pos", 0)))
-            await db.flush()
-        except Exception as e:
-            print(f"Locations migration skipped: {e}")
+def _float(value) -> float | None:
+    if value in (None, ""):
+        return None
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
 
-        try:
-            crops = conn.execute("SELECT * FROM crops").fetchall()
-            print(f"Migrating {len(crops)} crops...")
-            for row in crops:
-                db.add(Crop(name=row["name"], pos=row.get("pos", 0)))
-            await db.flush()
-        except Exception as e:
-            print(f"Crops migration skipped: {e}")
 
-        try:
-            kinds = conn.execute("SELECT * FROM machine_kinds").fetchall()
-            for row in kinds:
-                db.add(MachineKind(id=row["id"], title=row["title"], mode=row.get("mode", "list"), pos=row.get("pos", 0)))
-            await db.flush()
-            items = conn.execute("SELECT * FROM machine_items").fetchall()
-            for row in items:
-                db.add(MachineItem(id=row["id"], kind_id=row["kind_id"], name=row["name"], pos=row.get("pos", 0)))
-            await db.flush()
-        except Exception as e:
-            print(f"Machines migration skipped: {e}")
-
-        # ── Reports ────────────────────────────────────────────────────────────
-        reports_rows = conn.execute("SELECT * FROM reports").fetchall()
-        print(f"Migrating {len(reports_rows)} OTD reports...")
-        for row in reports_rows:
-            db.add(Report(
-                id=row["id"],
-                user_id=row.get("user_id"),
-                reg_name=row.get("reg_name"),
-                username=row.get("username"),
-                location=row.get("location"),
-                location_grp=row.get("location_grp"),
-                activity=row.get("activity"),
-                activity_grp=row.get("activity_grp"),
-                work_date=row.get("work_date"),
-                hours=row.get("hours"),
-                machine_type=row.get("machine_type"),
-                machine_name=row.get("machine_name"),
-                crop=row.get("crop"),
-                trips=row.get("trips"),
-            ))
-        await db.flush()
-
-        # ── Brigadier Reports ──────────────────────────────────────────────────
-        try:
-            brig_rows = conn.execute("SELECT * FROM brigadier_reports").fetchall()
-            print(f"Migrating {len(brig_rows)} brigadier reports...")
-            for row in brig_rows:
-                db.add(BrigadierReport(
-                    id=row["id"],
-                    user_id=row.get("user_id"),
-                    username=row.get("username"),
-                    work_type=row.get("work_type"),
-                    field=row.get("field"),
-                    shift=row.get("shift"),
-                    rows=row.get("rows"),
-                    bags=row.get("bags"),
-                    workers=row.get("workers"),
-                    work_date=row.get("work_date"),
-                ))
-            await db.flush()
-        except Exception as e:
-            print(f"Brigadier reports migration skipped: {e}")
-
-        await db.commit()
-
-    conn.close()
-    print("Migration complete!")
+def _str(value, limit: int) -> str | None:
+    if value is None:
+        return None
+    return str(value)[:limit]
+
+
+@dataclass
+class Target:
+    table: str
+    columns: tuple[str, ...]
+    row: Callable[[dict], tuple | None]
+
+
+@dataclass
+class Source:
+    sqlite_table: str
+    targets: list[Target]
+    required: bool = False
+
+
+def _sources(password_hash: str) -> list[Source]:
+    def user_login(r: dict) -> str:
+        return str(r.get("username") or r.get("phone") or r["user_id"])[:100]
+
+    def report_row(r: dict) -> tuple | None:
+        # reports.work_date — ключ секционирования (миграция 010), NOT NULL: пустую или
+        # нечитаемую дату берём из created_at, как миграция; без обеих строка пропускается
+        work_date = _date(r.get("work_date")) or _date(r.get("created_at"))
+        if work_date is None:
+            return None
+        return (
+            r["id"], r.get("user_id"), _str(r.get("reg_name"), 255), _str(r.get("username"), 100),
+            _str(r.get("location"), 255), _str(r.get("location_grp"), 50), _str(r.get("activity"), 255),
+            _str(r.get("activity_grp"), 50), work_date, _float(r.get("hours")),
+            _str(r.get("machine_type"), 50), _str(r.get("machine_name"), 255), _str(r.get("crop"), 100),
+            _int(r.get("trips")),
+        )
+
+    return [
+        Source("users", [
+            Target("users", ("id", "full_name", "username", "phone", "tz"), lambda r: (
+                r["user_id"], _str(r.get("full_name"), 255), _str(r.get("username"), 100),
+                _str(r.get("phone"), 50), r.get("tz") or "UTC",
+            )),
+            Target("auth_credentials", ("user_id", "login", "password_hash"), lambda r: (
+                r["user_id"], user_login(r), password_hash,
+            )),
+        ], required=True),
+        Source("user_roles", [
+            Target("user_roles", ("user_id", "role"), lambda r: (r["user_id"], r["role"])),
+        ]),
+        Source("activities", [
+            Target("activities", ("id", "name", "grp", "pos"), lambda r: (
+                r["id"], r["name"], r["grp"], _int(r.get("pos")) or 0,
+            )),
+        ]),
+        Source("locations", [
+            Target("locations", ("id", "name", "grp", "pos"), lambda r: (
+                r["id"], r["name"], r["grp"], _int(r.get("pos")) or 0,
+            )),
+        ]),
+        Source("crops", [
+            Target("crops", ("name", "pos"), lambda r: (r["name"], _int(r.get("pos")) or 0)),
+        ]),
+        Source("machine_kinds", [
+            Target("machine_kinds", ("id", "title", "mode", "pos"), lambda r: (
+                r["id"], r["title"], r.get("mode") or "list", _int(r.get("pos")) or 0,
+            )),
+        ]),
+        Source("machine_items", [
+            Target("machine_items", ("id", "kind_id", "name", "pos"), lambda r: (
+                r["id"], r["kind_id"], r["name"], _int(r.get("pos")) or 0,
+            )),
+        ]),
+        Source("reports", [
+            Target("reports", (
+                "id", "user_id", "reg_name", "username", "location", "location_grp", "activity",
+                "activity_grp", "work_date", "hours", "machine_type", "machine_name", "crop", "trips",
+            ), report_row),
+        ], required=True),
+        Source("brigadier_reports", [
+            Target("brigadier_reports", (
+                "id", "user_id", "username", "work_type", "field", "shift", "rows", "bags", "workers", "work_date",
+            ), lambda r: (
+                r["id"], r.get("user_id"), _str(r.get("username"), 100), _str(r.get("work_type"), 255),
+                _str(r.get("field"), 255), _str(r.get("shift"), 50), _int(r.get("rows")), _int(r.get("bags")),
+                _int(r.get("workers")), _date(r.get("work_date")),
+            )),
+        ]),
+    ]
+
+
+# Таблицы с явными id из SQLite — после загрузки двигаем их sequence за максимум
+_SERIAL_TABLES = (
+    "users", "activities", "locations", "machine_kinds", "machine_items", "reports", "brigadier_reports",
+)
+
+
+def _load_state(path: str) -> dict[str, int]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(path: str, state: dict[str, int]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _read_chunks(conn: sqlite3.Connection, table: str, after_rowid: int, chunk_size: int):
+    """Порции строк таблицы по возрастанию rowid, начиная после after_rowid."""
+    last = after_rowid
+    while True:
+        rows = conn.execute(
+            f'SELECT rowid AS "__rowid", * FROM "{table}" WHERE rowid > ? ORDER BY rowid LIMIT ?',
+            (last, chunk_size),
+        ).fetchall()
+        if not rows:
+            return
+        last = rows[-1]["__rowid"]
+        yield last, [dict(r) for r in rows]
+
+
+def _inserted(status: str) -> int:
+    # "INSERT 0 <n>"
+    try:
+        return int(status.rsplit(" ", 1)[-1])
+    except ValueError:
+        return 0
+
+
+async def _copy_target(pg: asyncpg.Connection, target: Target, records: list[tuple]) -> int:
+    stage = f"_stage_{target.table}"
+    cols = ", ".join(target.columns)
+    await pg.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {stage} (LIKE {target.table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+    await pg.copy_records_to_table(stage, records=records, columns=list(target.columns))
+    status = await pg.execute(
+        f"INSERT INTO {target.table} ({cols}) SELECT {cols} FROM {stage} ON CONFLICT DO NOTHING"
+    )
+    return _inserted(status)
+
+
+async def _insert_target(pg: asyncpg.Connection, target: Target, records: list[tuple]) -> int:
+    ncols = len(target.columns)
+    per_stmt = max(1, _MAX_PARAMS // ncols)
+    inserted = 0
+    for start in range(0, len(records), per_stmt):
+        part = records[start:start + per_stmt]
+        values = ", ".join(
+            "(" + ", ".join(f"${i * ncols + j + 1}" for j in range(ncols)) + ")" for i in range(len(part))
+        )
+        status = await pg.execute(
+            f"INSERT INTO {target.table} ({', '.join(target.columns)}) VALUES {values} ON CONFLICT DO NOTHING",
+            *[v for rec in part for v in rec],
+        )
+        inserted += _inserted(status)
+    return inserted
+
+
+async def migrate(
+    sqlite_path: str,
+    default_password: str,
+    chunk_size: int = 5000,
+    method: str = "copy",
+    state_file: str | None = None,
+    restart: bool = False,
+):
+    state_file = state_file or f"{sqlite_path}.migrate-state.json"
+    state = {} if restart else _load_state(state_file)
+    if state:
+        print(f"Resuming from {state_file}: {state}")
+
+    conn = sqlite3.connect(sqlite_path)
+    conn.row_factory = sqlite3.Row
+    pg = await asyncpg.connect(
+        host=settings.DB_HOST, port=settings.DB_PORT, user=settings.DB_USER,
+        password=settings.DB_PASS, database=settings.DB_NAME,
+    )
+    load = _copy_target if method == "copy" else _insert_target
+
+    # Общий пароль для всех перенесённых учёток: один bcrypt вместо одного на пользователя
+    password_hash = hash_password(default_password)
+
+    total_read = 0
+    total_started = time.perf_counter()
+    try:
+        for source in _sources(password_hash):
+            after = int(state.get(source.sqlite_table, 0))
+            read = 0
+            inserted = {t.table: 0 for t in source.targets}
+            skipped = {t.table: 0 for t in source.targets}
+            started = time.perf_counter()
+            try:
+                for last_rowid, rows in _read_chunks(conn, source.sqlite_table, after, chunk_size):
+                    async with pg.transaction():
+                        for target in source.targets:
+                            records = [rec for rec in map(target.row, rows) if rec is not None]
+                            skipped[target.table] += len(rows) - len(records)
+                            if records:
+                                inserted[target.table] += await load(pg, target, records)
+                    state[source.sqlite_table] = last_rowid
+                    _save_state(state_file, state)
+                    read += len(rows)
+                    elapsed = time.perf_counter() - started
+                    print(
+                        f"  {source.sqlite_table}: {read} rows, {read / elapsed:,.0f} rows/s",
+                        end="\r", flush=True,
+                    )
+            except sqlite3.OperationalError as e:
+                if source.required:
+                    raise
+                print(f"{source.sqlite_table} migration skipped: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            total_read += read
+            rate = read / elapsed if elapsed > 0 else 0.0
+            loaded = ", ".join(f"{t}+{n}" for t, n in inserted.items())
+            dropped = ", ".join(f"{t}: {n}" for t, n in skipped.items() if n)
+            print(
+                f"{source.sqlite_table}: read {read} rows in {elapsed:.1f}s ({rate:,.0f} rows/s), inserted {loaded}"
+                + (f", skipped invalid {dropped}" if dropped else "")
+            )
+
+        for table in _SERIAL_TABLES:
+            await pg.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"GREATEST((SELECT COALESCE(MAX(id), 0) FROM {table}), 1))"
+            )
+    finally:
+        await pg.close()
+        conn.close()
+
+    elapsed = time.perf_counter() - total_started
+    rate = total_read / elapsed if elapsed > 0 else 0.0
+    print(f"Migration complete: {total_read} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--sqlite-path", default="../reports.db")
     parser.add_argument("--default-password", default="Change123!")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--method", choices=("copy", "insert"), default="copy",
+                        help="copy — COPY во временную таблицу; insert — многострочный INSERT")
+    parser.add_argument("--state-file", default=None, help="по умолчанию <sqlite-path>.migrate-state.json")
+    parser.add_argument("--restart", action="store_true", help="игнорировать сохранённый прогресс")
     args = parser.parse_args()
 
-    asyncio.run(migrate(args.sqlite_path, args.default_password))
+    asyncio.run(migrate(
+        args.sqlite_path,
+        args.default_password,
+        chunk_size=args.chunk_size,
+        method=args.method,
+        state_file=args.state_file,
+        restart=args.restart,
+    ))